@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from blog_reader import essay_output_path
+from journal import EssayJournal
+from key_scheduler import RunBudget
+from planner import BacklogPlan
+
+log = logging.getLogger(__name__)
+
+POLICIES = ('recency', 'shortest', 'partial')
+# The catalog's own order: newest essays first
+DEFAULT_POLICY = 'recency'
+BACKLOG_FILE = 'backlog.json'
+
+
+def priority_key(policy: str, rank: dict):
+    """Sort key for EssayPlans under `policy`; `rank` is each URL's position in recency order"""
+    if policy == 'recency':
+        return lambda essay: rank[essay.url]
+    if policy == 'shortest':
+        return lambda essay: (essay.pending_chars, rank[essay.url])
+    if policy == 'partial':
+        # Essays with chunks already done, cheapest to finish first, then the rest newest first
+        return lambda essay: ((0, essay.pending_chars, rank[essay.url]) if essay.partially_done
+                              else (1, 0, rank[essay.url]))
+    raise ValueError(f"Unknown priority policy {policy!r} (choose from {', '.join(POLICIES)})")
+
+
+class BacklogQueue:
+    """The essays one run will synthesize, in priority order, and those left for later.
+
+    save() writes backlog.json: the policy, the budget and what was
+    spent of it, and every essay's estimated cost and status (done, partial,
+    pending, deferred or failed) after the run.
+    """
+
+    def __init__(self, policy: str, selected: list, deferred: list, failed: list, budget: RunBudget = None,
+                 output_path=essay_output_path):
+        self.policy = policy
+        # URL -> episode audio path, e.g. Engine.output_path
+        self.output_path = output_path
+        self.selected = selected
+        self.deferred = deferred
+        self.failed = failed
+        self.budget = budget
+
+    @property
+    def urls(self) -> list:
+        return [essay.url for essay in self.selected]
+
+    def status(self, url: str) -> str:
+        output_path = self.output_path(url)
+        if os.path.exists(output_path):
+            return 'done'
+        journal = EssayJournal.load(output_path)
+        if journal is not None and journal.data['chunks'] and len(journal.pending()) < len(journal.data['chunks']):
+            return 'partial'
+        return 'pending'
+
+    def to_dict(self) -> dict:
+        essays = [
+            {'url': essay.url, 'title': essay.title, 'chars': essay.chars, 'pending_chars': essay.pending_chars,
+             'requests': essay.requests, 'status': self.status(essay.url)}
+            for essay in self.selected
+        ]
+        essays += [
+            {'url': essay.url, 'title': essay.title, 'chars': essay.chars, 'pending_chars': essay.pending_chars,
+             'requests': essay.requests, 'status': 'deferred'}
+            for essay in self.deferred
+        ]
+        essays += [{'url': url, 'status': 'failed'} for url in self.failed]
+        budget = None
+        if self.budget is not None:
+            budget = {'max_chars': self.budget.max_chars, 'max_requests': self.budget.max_requests,
+                      'chars': self.budget.chars, 'requests': self.budget.requests}
+        return {
+            'updated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'policy': self.policy,
+            'budget': budget,
+            'essays': essays,
+        }
+
+    def save(self, path: str):
+        data = self.to_dict()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, path)
+        statuses = [essay['status'] for essay in data['essays']]
+        log.info("Backlog: %d done, %d partial, %d deferred, %d failed; state saved to %s",
+                 statuses.count('done'), statuses.count('partial'), statuses.count('deferred'),
+                 statuses.count('failed'), path)
+
+
+def schedule_backlog(plan: BacklogPlan, urls: list, policy: str = DEFAULT_POLICY,
+                     budget: RunBudget = None, output_path=essay_output_path) -> BacklogQueue:
+    """Order planned essays by `policy` and admit those the budget covers.
+
+    `urls` gives recency order. Essays are admitted in priority order while
+    their estimated characters and requests fit what is left of the budget
+    and of the keys' known quota; an essay that does not fit is deferred and
+    smaller ones after it are still considered, so the budget is used as
+    fully as possible without starting essays it cannot finish.
+    """
+    rank = {url: i for i, url in enumerate(urls)}
+    essays = sorted(plan.essays, key=priority_key(policy, rank))
+    chars_left = budget.remaining_chars if budget is not None else None
+    requests_left = budget.remaining_requests if budget is not None else None
+    quota = plan.scheduler.remaining_quota() if plan.scheduler is not None else None
+    if quota is not None:
+        chars_left = quota if chars_left is None else min(chars_left, quota)
+
+    selected = []
+    deferred = []
+    for essay in essays:
+        if ((chars_left is not None and essay.pending_chars > chars_left)
+                or (requests_left is not None and essay.requests > requests_left)):
+            deferred.append(essay)
+            continue
+        selected.append(essay)
+        if chars_left is not None:
+            chars_left -= essay.pending_chars
+        if requests_left is not None:
+            requests_left -= essay.requests
+    log.info("Scheduled %d essays (%d characters) by %s; %d deferred to a later run",
+             len(selected), sum(essay.pending_chars for essay in selected), policy, len(deferred))
+    return BacklogQueue(policy, selected, deferred, plan.failed, budget, output_path)
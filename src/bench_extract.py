@@ -0,0 +1,69 @@
+"""Offline benchmark of the essay extraction backends.
+
+Runs every backend in extract.BACKENDS over pages saved by the crawler's
+HTML cache (or a directory of .html files) and reports time per page and
+whether the extracted text matches the baseline BeautifulSoup backend.
+
+    python3 src/bench_extract.py --html-cache-dir cache/html --repeat 3
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+from extract import BACKENDS, extract
+
+
+def load_pages(html_cache_dir: str = None, pages_dir: str = None) -> list:
+    """Return [(url, body_bytes)] from the crawler cache or a directory of saved pages"""
+    pages = []
+    if html_cache_dir:
+        for meta_path in sorted(glob.glob(os.path.join(html_cache_dir, '*.json'))):
+            body_path = meta_path[:-len('.json')] + '.body'
+            if not os.path.exists(body_path):
+                continue
+            with open(meta_path, 'r') as f:
+                url = json.load(f).get('url', '')
+            with open(body_path, 'rb') as f:
+                pages.append((url, f.read()))
+    if pages_dir:
+        for path in sorted(glob.glob(os.path.join(pages_dir, '*'))):
+            with open(path, 'rb') as f:
+                pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def run(pages: list, repeat: int = 1) -> dict:
+    baseline = {url: extract(body, url, 'soup') for url, body in pages}
+    results = {}
+    for name in BACKENDS:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs = {url: extract(body, url, name) for url, body in pages}
+        elapsed = time.perf_counter() - start
+        mismatches = sum(1 for url in outputs if outputs[url] != baseline[url])
+        results[name] = {
+            'seconds': elapsed / repeat,
+            'ms_per_page': elapsed / repeat / len(pages) * 1000,
+            'mismatches': mismatches,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark essay text extraction backends')
+    parser.add_argument('--html-cache-dir', default='cache/html', help='Crawler HTML cache to read pages from')
+    parser.add_argument('--pages-dir', help='Directory of saved essay pages')
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus per backend')
+    args = parser.parse_args()
+
+    pages = load_pages(args.html_cache_dir, args.pages_dir)
+    if not pages:
+        print("No saved pages found; run blog_reader.py --crawl first")
+    else:
+        total_bytes = sum(len(body) for _, body in pages)
+        print(f"{len(pages)} pages, {total_bytes / 1024 ** 2:.1f} MB, {args.repeat} passes")
+        for name, r in run(pages, args.repeat).items():
+            print(f"{name:10s} {r['seconds']:8.3f}s per pass  {r['ms_per_page']:7.2f} ms/page  "
+                  f"{r['mismatches']} pages differ from soup")
@@ -0,0 +1,66 @@
+"""Benchmark the chunk segmenter over the essay corpus.
+
+Extracts every page saved in the crawler's HTML cache, chunks it with the
+old '. ' splitter and with segmenter.pack_chunks, and reports request
+counts, chunk size distribution and time.
+
+    python3 src/bench_segmenter.py --html-cache-dir cache/html --max-chars 4000
+"""
+import argparse
+import time
+
+from bench_extract import load_pages
+from extract import extract
+from segmenter import chunk_stats, pack_chunks
+
+
+def legacy_split(text: str, max_chars: int) -> list:
+    """The original split_text_into_chunks, kept for comparison"""
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    for sentence in text.split('. '):
+        if current_length + len(sentence) > max_chars:
+            chunks.append('. '.join(current_chunk))
+            current_chunk = [sentence]
+            current_length = len(sentence)
+        else:
+            current_chunk.append(sentence)
+            current_length += len(sentence)
+    if current_chunk:
+        chunks.append('. '.join(current_chunk))
+    return chunks
+
+
+def run(texts: list, max_chars: int) -> dict:
+    results = {}
+    for name, splitter in (('legacy', legacy_split), ('packed', pack_chunks)):
+        start = time.perf_counter()
+        all_chunks = [chunk for text in texts for chunk in splitter(text, max_chars)]
+        elapsed = time.perf_counter() - start
+        stats = chunk_stats(all_chunks, max_chars)
+        stats['seconds'] = elapsed
+        stats['over_limit'] = sum(1 for chunk in all_chunks if len(chunk) > max_chars)
+        results[name] = stats
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark text chunking over the essay corpus')
+    parser.add_argument('--html-cache-dir', default='cache/html', help='Crawler HTML cache to read pages from')
+    parser.add_argument('--pages-dir', help='Directory of saved essay pages')
+    parser.add_argument('--max-chars', type=int, default=4000, help='Characters per TTS request')
+    args = parser.parse_args()
+
+    texts = []
+    for url, body in load_pages(args.html_cache_dir, args.pages_dir):
+        essay = extract(body, url)
+        if essay:
+            texts.append(essay.text)
+    if not texts:
+        print("No saved pages found; run blog_reader.py --crawl first")
+    else:
+        print(f"{len(texts)} essays, {sum(len(t) for t in texts)} characters, limit {args.max_chars}")
+        for name, s in run(texts, args.max_chars).items():
+            print(f"{name:7s} {s['chunks']:5d} requests  median {s['median']:6.0f}  max {s['max']:5d}  "
+                  f"fill {s['fill']:5.1%}  over limit {s['over_limit']}  {s['seconds'] * 1000:.1f} ms")
@@ -0,0 +1,143 @@
+"""Concurrent-client benchmark for serve.py.
+
+Clients on keep-alive connections mix three requests a podcast client or
+browser makes: polling the feed with If-None-Match, seeking in an episode
+with a 64 KB Range request, and fetching the whole feed with gzip. Reports
+requests/s, latency percentiles and bytes transferred per kind. --server
+simple runs the same load against http.server's SimpleHTTPRequestHandler
+for comparison.
+
+    python3 src/bench_serve.py --clients 16 --seconds 10
+    python3 src/bench_serve.py --server simple --json
+"""
+import argparse
+import functools
+import http.client
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from mock_server import percentiles
+from serve import SiteServer
+
+KINDS = ('poll', 'seek', 'feed')
+SEEK_BYTES = 64 * 1024
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def _client(base: tuple, feed_path: str, audio: list, deadline: float, seed: int, results: dict, lock: threading.Lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(*base, timeout=30)
+    etag = None
+    local = {kind: {'latency': [], 'bytes': 0, 'statuses': {}} for kind in KINDS}
+    while time.monotonic() < deadline:
+        kind = rng.choice(KINDS)
+        headers = {'Accept-Encoding': 'gzip'}
+        path = feed_path
+        if kind == 'poll' and etag:
+            headers['If-None-Match'] = etag
+        elif kind == 'seek':
+            path, size = rng.choice(audio)
+            start = rng.randrange(max(1, size - SEEK_BYTES))
+            headers = {'Range': f"bytes={start}-{start + SEEK_BYTES - 1}"}
+        started = time.monotonic()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        body = response.read()
+        elapsed = time.monotonic() - started
+        if kind != 'seek' and response.status == 200:
+            etag = response.getheader('ETag')
+        entry = local[kind]
+        entry['latency'].append(elapsed)
+        # Headers are small and similar for every server; the body is what differs
+        entry['bytes'] += len(body)
+        entry['statuses'][response.status] = entry['statuses'].get(response.status, 0) + 1
+        if response.getheader('Connection', '').lower() == 'close':
+            conn.close()
+    conn.close()
+    with lock:
+        for kind, entry in local.items():
+            results[kind]['latency'] += entry['latency']
+            results[kind]['bytes'] += entry['bytes']
+            for status, count in entry['statuses'].items():
+                results[kind]['statuses'][status] = results[kind]['statuses'].get(status, 0) + count
+
+
+def run(root: str, server: str = 'pgpod', clients: int = 16, seconds: float = 10.0, seed: int = 1) -> dict:
+    """Load the server for `seconds` with `clients` concurrent connections"""
+    if server == 'simple':
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=root))
+    else:
+        httpd = SiteServer(('127.0.0.1', 0), root)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    output = os.path.join(root, 'output')
+    audio = [(f"/output/{name}", os.path.getsize(os.path.join(output, name)))
+             for name in sorted(os.listdir(output)) if name.endswith('.mp3')]
+    results = {kind: {'latency': [], 'bytes': 0, 'statuses': {}} for kind in KINDS}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    threads = [
+        threading.Thread(target=_client, args=(httpd.server_address[:2], '/output/feed.xml', audio, deadline,
+                                               seed + n, results, lock))
+        for n in range(clients)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    httpd.shutdown()
+    httpd.server_close()
+
+    total = sum(len(entry['latency']) for entry in results.values())
+    return {
+        'server': server,
+        'clients': clients,
+        'seconds': elapsed,
+        'requests': total,
+        'requests_per_second': total / elapsed if elapsed else 0.0,
+        'kinds': {
+            kind: {
+                'requests': len(entry['latency']),
+                'bytes_per_request': entry['bytes'] / len(entry['latency']) if entry['latency'] else 0,
+                'statuses': entry['statuses'],
+                'latency': percentiles(sorted(entry['latency'])),
+            }
+            for kind, entry in results.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the preview server with concurrent clients')
+    parser.add_argument('--root', default='.', help='Directory with output/feed.xml and episode MP3s')
+    parser.add_argument('--server', choices=['pgpod', 'simple'], default='pgpod', help="serve.py, or http.server's handler")
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent keep-alive clients')
+    parser.add_argument('--seconds', type=float, default=10.0, help='How long to run')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the request mix')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+    logging.basicConfig(level='WARNING', format='%(message)s')
+
+    results = run(args.root, args.server, args.clients, args.seconds, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\n{results['server']}: {results['requests']} requests from {results['clients']} clients "
+              f"in {results['seconds']:.1f}s = {results['requests_per_second']:.0f} req/s")
+        for kind, entry in results['kinds'].items():
+            lat = entry['latency']
+            print(f"{kind:5} {entry['requests']:6} requests  {entry['bytes_per_request'] / 1024:8.1f} KB/request  "
+                  f"p50 {lat['p50'] * 1000:.1f} ms  p95 {lat['p95'] * 1000:.1f} ms  p99 {lat['p99'] * 1000:.1f} ms  "
+                  f"statuses {entry['statuses']}")
@@ -0,0 +1,133 @@
+"""End-to-end synthesis throughput benchmark against the local mock API.
+
+Starts mock_server.MockElevenLabs, points the pipeline at it and synthesizes
+a synthetic corpus in a scratch directory, either essay by essay through
+generate_audio_for_text (--mode essay) or through the staged CorpusPipeline
+(--mode corpus). Reports essays/min, characters/s, chunk latency
+percentiles, status mix, per-key utilization and peak RSS. No quota is spent.
+
+    python3 src/bench_synthesis.py --essays 20 --keys 3 --per-key-concurrency 5 --latency-ms 800
+    python3 src/bench_synthesis.py --mode essay --rate-429 0.05 --rate-5xx 0.02 --json
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import tempfile
+import time
+
+import blog_reader
+import key_scheduler
+import metrics
+from engine import Engine
+from mock_server import MockElevenLabs
+from mp3 import inspect
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if os.uname().sysname == 'Darwin' else rss / 1024
+
+
+def run(mock: MockElevenLabs, essays: int, keys: int, per_key_concurrency: int, mode: str,
+        essays_in_flight: int = 4, fetch_workers: int = 4) -> dict:
+    """Synthesize `essays` mock essays in a scratch directory and return the measurements"""
+    blog_reader.ELEVENLABS_TTS_URL = mock.base_url + "/v1/text-to-speech/{voice_id}"
+    key_scheduler.SUBSCRIPTION_URL = mock.base_url + "/v1/user/subscription"
+    metrics.get_metrics().reset()
+    workdir = tempfile.mkdtemp(prefix='pgpod-bench-')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        os.makedirs('output')
+        urls = [mock.essay_url(n) for n in range(essays)]
+        with open('blog_posts.json', 'w') as f:
+            json.dump({'blog_posts': [{'url': url} for url in urls]}, f)
+
+        api_keys = [f"bench-key-{n}" for n in range(keys)]
+        engine = Engine(api_keys, use_cache=False, per_key_concurrency=per_key_concurrency,
+                        essays_in_flight=essays_in_flight, fetch_workers=fetch_workers)
+        started = time.monotonic()
+        with engine:
+            if mode == 'corpus':
+                engine.run_backlog(urls)
+            else:
+                for url in urls:
+                    title, text = engine.fetch_essay(url)
+                    engine.synthesize(text, engine.output_path(url), url)
+        elapsed = time.monotonic() - started
+
+        outputs = [engine.output_path(url) for url in urls if os.path.exists(engine.output_path(url))]
+        audio_seconds = sum(inspect(path)['duration'] for path in outputs)
+        server = mock.stats()
+        run_metrics = metrics.get_metrics().snapshot()
+        utilization = {
+            state.label: state.busy_seconds / (elapsed * state.max_concurrency) if elapsed else 0.0
+            for state in engine.scheduler.keys
+        }
+        return {
+            'mode': mode,
+            'essays': essays,
+            'completed': len(outputs),
+            'seconds': elapsed,
+            'essays_per_min': len(outputs) / elapsed * 60 if elapsed else 0.0,
+            'chars_per_second': server['chars'] / elapsed if elapsed else 0.0,
+            'audio_seconds': audio_seconds,
+            'requests': server['requests'],
+            'statuses': server['statuses'],
+            'chunk_latency': server['latency'],
+            'key_utilization': utilization,
+            'stages': run_metrics['stages'],
+            'counters': run_metrics['counters'],
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark synthesis throughput against a local mock API')
+    parser.add_argument('--mode', choices=['corpus', 'essay'], default='corpus',
+                        help='CorpusPipeline over all essays, or generate_audio_for_text one essay at a time')
+    parser.add_argument('--essays', type=int, default=20, help='Number of synthetic essays')
+    parser.add_argument('--essay-chars', type=int, default=20000, help='Characters per essay')
+    parser.add_argument('--keys', type=int, default=3, help='Number of API keys')
+    parser.add_argument('--per-key-concurrency', type=int, default=5, help='Maximum concurrent requests per key')
+    parser.add_argument('--essays-in-flight', type=int, default=4, help='Essays synthesized concurrently (corpus mode)')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='Concurrent page downloads (corpus mode)')
+    parser.add_argument('--latency-ms', type=float, default=500.0, help='Mean mock latency per request')
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--ms-per-char', type=float, default=0.0, help='Extra mock latency per character')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='Fraction of requests answered with a 5xx')
+    parser.add_argument('--quota-chars', type=int, help='Character quota per key')
+    parser.add_argument('--max-concurrent', type=int, help='Concurrent requests the mock allows per key')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for latency and error injection')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging verbosity')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+
+    with MockElevenLabs(latency_ms=args.latency_ms, latency_dist=args.latency_dist, ms_per_char=args.ms_per_char,
+                        rate_429=args.rate_429, rate_5xx=args.rate_5xx, quota_chars=args.quota_chars,
+                        max_concurrent=args.max_concurrent, essay_chars=args.essay_chars, seed=args.seed) as mock:
+        results = run(mock, args.essays, args.keys, args.per_key_concurrency, args.mode,
+                      args.essays_in_flight, args.fetch_workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        lat = results['chunk_latency']
+        print(f"\n{results['mode']}: {results['completed']}/{results['essays']} essays in {results['seconds']:.1f}s "
+              f"= {results['essays_per_min']:.1f} essays/min, {results['chars_per_second']:.0f} chars/s")
+        print(f"chunk latency p50 {lat['p50'] * 1000:.0f} ms  p95 {lat['p95'] * 1000:.0f} ms  "
+              f"p99 {lat['p99'] * 1000:.0f} ms  max {lat['max'] * 1000:.0f} ms")
+        print(f"{results['requests']} requests, statuses {results['statuses']}")
+        for label, used in results['key_utilization'].items():
+            print(f"key {label}: {used:.0%} utilized")
+        print("stages: " + ', '.join(f"{stage} {entry['seconds']:.2f}s/{entry['calls']}"
+                                     for stage, entry in results['stages'].items()))
+        print("counters: " + ', '.join(f"{name} {value}" for name, value in sorted(results['counters'].items())))
+        print(f"peak RSS {results['peak_rss_mb']:.0f} MB")
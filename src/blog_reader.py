@@ -1,556 +1,380 @@
-import requests
-from bs4 import BeautifulSoup
-from elevenlabs import generate, save, set_api_key, voices
 import os
 from dotenv import load_dotenv
-from datetime import datetime
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from datetime import datetime, timezone
+from email.utils import format_datetime
 import argparse
-import hashlib
-from pydub import AudioSegment
 import time
 import concurrent.futures
-import json
+import logging
+from chunk_cache import ChunkCache
+import http_pool
+from mp3 import concat_mp3
+from key_scheduler import BudgetExhausted, KeyScheduler, RunBudget
+from manifest import AUDIO_BASE_URL, EpisodeManifest
+from feed_writer import DEFAULT_PAGE_SIZE, write_paged_feed
+from crawler import Crawler
+from extract import extract
+from normalize import DEFAULT_NORMALIZER, FOOTNOTE_MODES, NormalizeRules, Normalizer
+from segmenter import CHUNKING, DEFAULT_CHUNKING, chunk_stats
+from journal import EssayJournal
+from catalog import slug_for
+from renditions import RENDITIONS, RenditionIndex
+from site_writer import DEFAULT_EPISODES_PER_PAGE
+import metrics
 
-# List of Paul Graham's essays to process
-ESSAY_URLS = [
-    # New Essays
-    "https://paulgraham.com/do.html",
-    "https://paulgraham.com/woke.html",
-    "https://paulgraham.com/writes.html",
-    "https://paulgraham.com/when.html",
-    "https://paulgraham.com/foundermode.html",
-    "https://paulgraham.com/persistence.html",
-    "https://paulgraham.com/reddits.html",
-    "https://paulgraham.com/google.html",
-    "https://paulgraham.com/best.html",
-    
-    # Original Essays
-    "http://www.paulgraham.com/superlinear.html",
-    "http://www.paulgraham.com/greatwork.html",
-    "http://www.paulgraham.com/getideas.html",
-    "http://www.paulgraham.com/read.html",
-    "http://www.paulgraham.com/want.html",
-    "http://www.paulgraham.com/alien.html",
-    "http://www.paulgraham.com/users.html",
-    "http://www.paulgraham.com/heresy.html",
-    "http://www.paulgraham.com/words.html",
-    "http://www.paulgraham.com/goodtaste.html",
-    "http://www.paulgraham.com/smart.html",
-    "http://www.paulgraham.com/weird.html",
-    "http://www.paulgraham.com/hwh.html",
-    "http://www.paulgraham.com/own.html",
-    "http://www.paulgraham.com/fn.html",
-    "http://www.paulgraham.com/newideas.html",
-    "http://www.paulgraham.com/nft.html",
-    "http://www.paulgraham.com/real.html",
-    "http://www.paulgraham.com/richnow.html",
-    "http://www.paulgraham.com/simply.html",
-    "http://www.paulgraham.com/donate.html",
-    "http://www.paulgraham.com/worked.html",
-    "http://www.paulgraham.com/earnest.html",
-    "http://www.paulgraham.com/ace.html",
-    "http://www.paulgraham.com/airbnbs.html",
-    "http://www.paulgraham.com/think.html",
-    "http://www.paulgraham.com/early.html",
-    "http://www.paulgraham.com/wtax.html",
-    "http://www.paulgraham.com/conformism.html",
-    "http://www.paulgraham.com/orth.html",
-    "http://www.paulgraham.com/cred.html",
-    "http://www.paulgraham.com/useful.html",
-    "http://www.paulgraham.com/noob.html",
-    "http://www.paulgraham.com/fh.html",
-    "http://www.paulgraham.com/mod.html",
-    "http://www.paulgraham.com/fp.html",
-    "http://www.paulgraham.com/kids.html",
-    "http://www.paulgraham.com/lesson.html",
-    "http://www.paulgraham.com/nov.html",
-    "http://www.paulgraham.com/genius.html",
-    "http://www.paulgraham.com/sun.html",
-    "http://www.paulgraham.com/pow.html",
-    "http://www.paulgraham.com/disc.html",
-    "http://www.paulgraham.com/pgh.html",
-    "http://www.paulgraham.com/vb.html",
-    "http://www.paulgraham.com/ineq.html",
-    "http://www.paulgraham.com/re.html",
-    "http://www.paulgraham.com/jessica.html",
-    "http://www.paulgraham.com/bias.html",
-    "http://www.paulgraham.com/talk.html",
-    "http://www.paulgraham.com/aord.html",
-    "http://www.paulgraham.com/safe.html",
-    "http://www.paulgraham.com/name.html",
-    "http://www.paulgraham.com/altair.html",
-    "http://www.paulgraham.com/ronco.html",
-    "http://www.paulgraham.com/work.html",
-    "http://www.paulgraham.com/corpdev.html",
-    "http://www.paulgraham.com/95.html",
-    "http://www.paulgraham.com/ecw.html",
-    "http://www.paulgraham.com/know.html",
-    "http://www.paulgraham.com/pinch.html",
-    "http://www.paulgraham.com/mean.html",
-    "http://www.paulgraham.com/before.html",
-    "http://www.paulgraham.com/fr.html",
-    "http://www.paulgraham.com/herd.html",
-    "http://www.paulgraham.com/convince.html",
-    "http://www.paulgraham.com/ds.html",
-    "http://www.paulgraham.com/invtrend.html",
-    "http://www.paulgraham.com/startupideas.html",
-    "http://www.paulgraham.com/hw.html",
-    "http://www.paulgraham.com/growth.html",
-    "http://www.paulgraham.com/swan.html",
-    "http://www.paulgraham.com/todo.html",
-    "http://www.paulgraham.com/speak.html",
-    "http://www.paulgraham.com/ycstart.html",
-    "http://www.paulgraham.com/property.html",
-    "http://www.paulgraham.com/ambitious.html",
-    "http://www.paulgraham.com/word.html",
-    "http://www.paulgraham.com/schlep.html",
-    "http://www.paulgraham.com/vw.html",
-    "http://www.paulgraham.com/hubs.html",
-    "http://www.paulgraham.com/patentpledge.html",
-    "http://www.paulgraham.com/airbnb.html",
-    "http://www.paulgraham.com/control.html",
-    "http://www.paulgraham.com/tablets.html",
-    "http://www.paulgraham.com/founders.html",
-    "http://www.paulgraham.com/superangels.html",
-    "http://www.paulgraham.com/seesv.html",
-    "http://www.paulgraham.com/hiresfund.html",
-    "http://www.paulgraham.com/yahoo.html",
-    "http://www.paulgraham.com/future.html",
-    "http://www.paulgraham.com/addiction.html",
-    "http://www.paulgraham.com/top.html",
-    "http://www.paulgraham.com/selfindulgence.html",
-    "http://www.paulgraham.com/organic.html",
-    "http://www.paulgraham.com/apple.html",
-    "http://www.paulgraham.com/really.html",
-    "http://www.paulgraham.com/discover.html",
-    "http://www.paulgraham.com/publishing.html",
-    "http://www.paulgraham.com/nthings.html",
-    "http://www.paulgraham.com/determination.html",
-    "http://www.paulgraham.com/kate.html",
-    "http://www.paulgraham.com/segway.html",
-    "http://www.paulgraham.com/ramenprofitable.html",
-    "http://www.paulgraham.com/makersschedule.html",
-    "http://www.paulgraham.com/revolution.html",
-    "http://www.paulgraham.com/twitter.html",
-    "http://www.paulgraham.com/foundervisa.html",
-    "http://www.paulgraham.com/5founders.html",
-    "http://www.paulgraham.com/relres.html",
-    "http://www.paulgraham.com/angelinvesting.html",
-    "http://www.paulgraham.com/convergence.html",
-    "http://www.paulgraham.com/maybe.html",
-    "http://www.paulgraham.com/hackernews.html",
-    "http://www.paulgraham.com/13sentences.html",
-    "http://www.paulgraham.com/identity.html",
-    "http://www.paulgraham.com/credentials.html",
-    "http://www.paulgraham.com/divergence.html",
-    "http://www.paulgraham.com/highres.html",
-    "http://www.paulgraham.com/artistsship.html",
-    "http://www.paulgraham.com/badeconomy.html",
-    "http://www.paulgraham.com/fundraising.html",
-    "http://www.paulgraham.com/prcmc.html",
-    "http://www.paulgraham.com/cities.html",
-    "http://www.paulgraham.com/distraction.html",
-    "http://www.paulgraham.com/lies.html",
-    "http://www.paulgraham.com/good.html",
-    "http://www.paulgraham.com/googles.html",
-    "http://www.paulgraham.com/heroes.html",
-    "http://www.paulgraham.com/disagree.html",
-    "http://www.paulgraham.com/boss.html",
-    "http://www.paulgraham.com/ycombinator.html",
-    "http://www.paulgraham.com/trolls.html",
-    "http://www.paulgraham.com/newthings.html",
-    "http://www.paulgraham.com/startuphubs.html",
-    "http://www.paulgraham.com/webstartups.html",
-    "http://www.paulgraham.com/philosophy.html",
-    "http://www.paulgraham.com/colleges.html",
-    "http://www.paulgraham.com/die.html",
-    "http://www.paulgraham.com/head.html",
-    "http://www.paulgraham.com/stuff.html",
-    "http://www.paulgraham.com/equity.html",
-    "http://www.paulgraham.com/unions.html",
-    "http://www.paulgraham.com/guidetoinvestors.html",
-    "http://www.paulgraham.com/judgement.html",
-    "http://www.paulgraham.com/microsoft.html",
-    "http://www.paulgraham.com/notnot.html",
-    "http://www.paulgraham.com/wisdom.html",
-    "http://www.paulgraham.com/foundersatwork.html",
-    "http://www.paulgraham.com/goodart.html",
-    "http://www.paulgraham.com/startupmistakes.html",
-    "http://www.paulgraham.com/mit.html",
-    "http://www.paulgraham.com/investors.html",
-    "http://www.paulgraham.com/copy.html",
-    "http://www.paulgraham.com/island.html",
-    "http://www.paulgraham.com/marginal.html",
-    "http://www.paulgraham.com/america.html",
-    "http://www.paulgraham.com/siliconvalley.html",
-    "http://www.paulgraham.com/startuplessons.html",
-    "http://www.paulgraham.com/randomness.html",
-    "http://www.paulgraham.com/softwarepatents.html",
-    "http://www.paulgraham.com/6631327.html",
-    "http://www.paulgraham.com/whyyc.html",
-    "http://www.paulgraham.com/love.html",
-    "http://www.paulgraham.com/procrastination.html",
-    "http://www.paulgraham.com/web20.html",
-    "http://www.paulgraham.com/startupfunding.html",
-    "http://www.paulgraham.com/vcsqueeze.html",
-    "http://www.paulgraham.com/ideas.html",
-    "http://www.paulgraham.com/sfp.html",
-    "http://www.paulgraham.com/inequality.html",
-    "http://www.paulgraham.com/ladder.html",
-    "http://www.paulgraham.com/opensource.html",
-    "http://www.paulgraham.com/hiring.html",
-    "http://www.paulgraham.com/submarine.html",
-    "http://www.paulgraham.com/bronze.html",
-    "http://www.paulgraham.com/mac.html",
-    "http://www.paulgraham.com/writing44.html",
-    "http://www.paulgraham.com/college.html",
-    "http://www.paulgraham.com/venturecapital.html",
-    "http://www.paulgraham.com/start.html",
-    "http://www.paulgraham.com/hs.html",
-    "http://www.paulgraham.com/usa.html",
-    "http://www.paulgraham.com/charisma.html",
-    "http://www.paulgraham.com/polls.html",
-    "http://www.paulgraham.com/laundry.html",
-    "http://www.paulgraham.com/bubble.html",
-    "http://www.paulgraham.com/essay.html",
-    "http://www.paulgraham.com/pypar.html",
-    "http://www.paulgraham.com/gh.html",
-    "http://www.paulgraham.com/gap.html",
-    "http://www.paulgraham.com/wealth.html",
-    "http://www.paulgraham.com/gba.html",
-    "http://www.paulgraham.com/say.html",
-    "http://www.paulgraham.com/ffb.html",
-    "http://www.paulgraham.com/hp.html",
-    "http://www.paulgraham.com/iflisp.html",
-    "http://www.paulgraham.com/hundred.html",
-    "http://www.paulgraham.com/nerds.html",
-    "http://www.paulgraham.com/better.html",
-    "http://www.paulgraham.com/desres.html",
-    "http://www.paulgraham.com/spam.html",
-    "http://www.paulgraham.com/icad.html",
-    "http://www.paulgraham.com/power.html",
-    "http://www.paulgraham.com/fix.html",
-    "http://www.paulgraham.com/taste.html",
-    "http://www.paulgraham.com/noop.html",
-    "http://www.paulgraham.com/diff.html",
-    "http://www.paulgraham.com/road.html",
-    "http://www.paulgraham.com/rootsoflisp.html",
-    "http://www.paulgraham.com/langdes.html",
-    "http://www.paulgraham.com/popular.html",
-    "http://www.paulgraham.com/javacover.html",
-    "http://www.paulgraham.com/avg.html",
-    "http://www.paulgraham.com/lwba.html",
-    "http://www.paulgraham.com/acl1.txt",
-    "http://www.paulgraham.com/acl2.txt",
-    "http://www.paulgraham.com/progbot.html",
-    "http://www.paulgraham.com/prop62.html"
-]
+log = logging.getLogger(__name__)
+
+# Override to point at a local stand-in such as mock_server.py
+ELEVENLABS_API_BASE = os.getenv('ELEVENLABS_API_BASE', "https://api.elevenlabs.io")
+ELEVENLABS_TTS_URL = ELEVENLABS_API_BASE + "/v1/text-to-speech/{voice_id}"
+# Rachel, the voice of every episode unless another is chosen
+VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
+MODEL_ID = "eleven_monolingual_v1"
+VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.5
+}
+MAX_WORKERS = 10
+FEED_CHANNEL = {
+    'title': "Paul Graham Essays",
+    'description': "Audio versions of Paul Graham's essays",
+    'link': 'https://paulgraham.com',
+    'language': 'en-us',
+    'author': 'Paul Graham',
+}
+# Characters per TTS request
+MAX_CHUNK_CHARS = 4000
+# How many times a chunk is re-routed to another key after a 429 or failure
+MAX_CHUNK_ATTEMPTS = 6
 
 def get_essay_filename(url: str, title: str) -> str:
     """Generate a filename based on the URL title"""
-    # Get the exact title from the URL and convert to filename format
-    url_title = url.split('/')[-1].replace('.html', '')
-    return f"{url_title}.mp3"
+    return f"{slug_for(url)}.mp3"
 
 def find_audio_file(output_dir: str, expected_filename: str) -> str:
     """Find an audio file in the output directory, case-insensitive"""
+    exact = os.path.join(output_dir, expected_filename)
+    if os.path.exists(exact):
+        return exact
     expected_name = expected_filename.lower()
-    print(f"Looking for file matching: {expected_name}")
-    
     for filename in os.listdir(output_dir):
-        print(f"Checking file: {filename}")
         if filename.lower() == expected_name:
-            full_path = os.path.join(output_dir, filename)
-            print(f"Found matching file: {full_path}")
-            return full_path
-    
-    print(f"No matching file found for {expected_name}")
+            return os.path.join(output_dir, filename)
     return None
 
-def split_text_into_chunks(text: str, max_chars: int = 4000) -> list:
-    """Split text into chunks that are safe for the API"""
-    chunks = []
-    current_chunk = []
-    current_length = 0
+def split_text_into_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS, chunking: str = DEFAULT_CHUNKING) -> list:
+    """Split text into chunks that are safe for the API.
     
-    # Split by sentences to avoid cutting mid-sentence
-    sentences = text.split('. ')
+    'packed' fills every chunk as close to the request limit as possible;
+    'anchored' picks content-defined boundaries so an edited essay only
+    re-synthesizes the chunks around the edit."""
+    with metrics.timer('chunk'):
+        return CHUNKING[chunking](text, max_chars)
+
+def generate_audio_for_text(text: str, output_path: str, api_keys: list, voice: str = VOICE_ID, cache: ChunkCache = None,
+                            scheduler: KeyScheduler = None, url: str = None,
+                            executor: concurrent.futures.Executor = None, chunking: str = DEFAULT_CHUNKING,
+                            model_id: str = MODEL_ID):
+    """Generate audio for text, handling it in chunks if necessary.
     
-    for sentence in sentences:
-        sentence_length = len(sentence)
-        if current_length + sentence_length > max_chars:
-            chunks.append('. '.join(current_chunk))
-            current_chunk = [sentence]
-            current_length = sentence_length
-        else:
-            current_chunk.append(sentence)
-            current_length += sentence_length
+    `voice` is a voice id; resolve names with voices.VoiceRegistry first.
+    Chunks run on `executor` when given, otherwise on a pool created for this essay.
+    If output_path is a published episode of an earlier version of the text,
+    only the chunks that changed are synthesized."""
+    log.info("Generating audio for text (length: %d characters)...", len(text))
     
-    if current_chunk:
-        chunks.append('. '.join(current_chunk))
+    # Split text into chunks if it's too long
+    chunks = split_text_into_chunks(text, chunking=chunking)
+    stats = chunk_stats(chunks, MAX_CHUNK_CHARS)
+    log.info("Split text into %d chunks (min %d, median %.0f, max %d chars, %.0f%% full)",
+             stats['chunks'], stats['min'], stats['median'], stats['max'], stats['fill'] * 100)
     
-    return chunks
-
-def process_chunk(chunk, chunk_index, output_path, api_keys):
-    """Process a single chunk of text"""
+    # Resume from the journal of an earlier, interrupted run
+    journal = EssayJournal.open(output_path, url, text, chunks, chunking, f"{voice}/{model_id}")
+    pending = journal.pending()
+    if journal.reused:
+        log.info("Reusing %d of %d chunks from the published episode", journal.reused, len(chunks))
+        metrics.incr('chunks_reused', journal.reused)
+    elif len(pending) < len(chunks):
+        log.info("Resuming: %d of %d chunks already synthesized", len(chunks) - len(pending), len(chunks))
+    
+    # Route every chunk to whichever key has the most headroom
+    if scheduler is None:
+        scheduler = KeyScheduler(api_keys)
+    workers = max(1, min(len(chunks), scheduler.total_concurrency))
+    
+    # Generate audio for each chunk in parallel
+    # Size the shared connection pool so every worker keeps its own connection alive
+    http_pool.get_session(max(MAX_WORKERS, scheduler.total_concurrency))
+    pool = executor or concurrent.futures.ThreadPoolExecutor(max_workers=workers)
     try:
-        # Round-robin API key assignment
-        api_key = api_keys[chunk_index % len(api_keys)]
+        futures = {
+            index: pool.submit(synthesize_chunk, journal, index, chunks[index], voice, cache, scheduler, model_id)
+            for index in pending
+        }
         
-        # Create temporary file for this chunk
-        chunk_path = f"{output_path}.chunk{chunk_index}.mp3"
+        # Stitch in reading order while later chunks are still being synthesized.
+        # A failed chunk aborts the essay; its journal lets a rerun resume.
+        def completed_chunks():
+            for index, chunk_path in enumerate(journal.paths()):
+                if index in futures and not futures[index].result():
+                    raise RuntimeError(f"Chunk {index + 1} of {len(chunks)} failed; rerun to resume")
+                yield chunk_path
         
-        # Generate audio for this chunk
-        response = requests.post(
-            "https://api.elevenlabs.io/v1/text-to-speech/21m00Tcm4TlvDq8ikWAM",
-            headers={
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": api_key
-            },
-            json={
-                "text": chunk,
-                "model_id": "eleven_monolingual_v1",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.5
-                }
-            }
-        )
-        
-        if response.status_code == 200:
-            with open(chunk_path, 'wb') as f:
-                f.write(response.content)
-            return chunk_path
-        else:
-            print(f"Error generating audio for chunk {chunk_index}: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        print(f"Error processing chunk {chunk_index}: {str(e)}")
-        return None
+        info = combine_chunks(completed_chunks(), output_path)
+    finally:
+        if pool is not executor:
+            pool.shutdown()
+    journal.finalize(output_path, info['spans'])
+
+def synthesize_chunk(journal: EssayJournal, index: int, chunk: str, voice: str = VOICE_ID, cache: ChunkCache = None,
+                     scheduler: KeyScheduler = None, model_id: str = MODEL_ID):
+    """Synthesize one journaled chunk and record the outcome"""
+    journal.start(index)
+    result = generate_chunk_audio(chunk, journal.chunk_path(index), None, voice, cache, scheduler, model_id)
+    if result:
+        journal.mark_done(index)
+    else:
+        journal.mark_failed(index, "synthesis failed")
+    return result
 
-def generate_audio_for_text(text: str, output_path: str, api_keys: list, voice: str = "Sarah"):
-    """Generate audio for text, handling it in chunks if necessary"""
-    print(f"Generating audio for text (length: {len(text)} characters)...")
+def combine_chunks(chunk_paths, output_path: str):
+    """Stitch chunk files into output_path in order and remove the chunks.
     
-    # Split text into chunks if it's too long
-    chunks = split_text_into_chunks(text)
-    print(f"Split text into {len(chunks)} chunks")
+    chunk_paths may be a generator that yields chunks as they land. Returns
+    concat_mp3's summary, including each chunk's byte span in the output."""
+    used_paths = []
+    def track(paths):
+        for path in paths:
+            used_paths.append(path)
+            yield path
     
-    # Generate audio for each chunk in parallel
-    audio_segments = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_chunk = {}
-        for i, chunk in enumerate(chunks, 1):
-            chunk_path = f"{output_path}.part{i}"
-            # Round-robin API key assignment
-            api_key = api_keys[(i-1) % len(api_keys)]
-            future = executor.submit(generate_chunk_audio, chunk, chunk_path, api_key, voice)
-            future_to_chunk[future] = chunk_path
-        
-        # Collect results as they complete
-        for future in concurrent.futures.as_completed(future_to_chunk):
-            chunk_path = future_to_chunk[future]
-            try:
-                result = future.result()
-                if result:
-                    audio_segments.append(result)
-                    print(f"Generated audio for chunk: {chunk_path}")
-            except Exception as e:
-                print(f"Error processing chunk {chunk_path}: {str(e)}")
+    log.debug("Combining audio chunks into %s...", output_path)
+    try:
+        # Copy MP3 frames straight through; no decode or re-encode
+        with metrics.timer('stitch'):
+            info = concat_mp3(track(chunk_paths), output_path)
+        log.info("Combined %d chunks into %s (%d frames, %.1fs)",
+                 len(used_paths), output_path, info['frames'], info['duration'])
+    except Exception as e:
+        log.error("Error combining audio chunks: %s; keeping temporary chunk files for debugging", e)
+        raise
     
-    # Combine all chunks into one file
-    if len(audio_segments) > 1:
-        print(f"\nCombining {len(audio_segments)} audio chunks...")
-        try:
-            # Load the first chunk
-            print(f"Loading first chunk: {audio_segments[0]}")
-            combined = AudioSegment.from_mp3(audio_segments[0])
-            
-            # Add the rest of the chunks
-            for i, segment_path in enumerate(audio_segments[1:], 1):
-                print(f"Adding chunk {i+1}: {segment_path}")
-                segment = AudioSegment.from_mp3(segment_path)
-                combined += segment
-            
-            # Export the combined audio
-            print(f"Exporting combined audio to: {output_path}")
-            combined.export(output_path, format="mp3")
-            print(f"Successfully combined audio saved to {output_path}")
-            
-            # Clean up temporary chunk files
-            print("Cleaning up temporary chunk files...")
-            for segment_path in audio_segments:
-                try:
-                    os.remove(segment_path)
-                    print(f"Removed temporary file: {segment_path}")
-                except Exception as e:
-                    print(f"Warning: Could not remove temporary file {segment_path}: {str(e)}")
-            
-        except Exception as e:
-            print(f"Error combining audio chunks: {str(e)}")
-            print("Keeping temporary chunk files for debugging")
-            raise
-    else:
-        # If there's only one chunk, just rename it
+    # Clean up temporary chunk files
+    for segment_path in used_paths:
         try:
-            print(f"Only one chunk, renaming {audio_segments[0]} to {output_path}")
-            os.rename(audio_segments[0], output_path)
-            print(f"Audio saved to {output_path}")
+            os.remove(segment_path)
+            log.debug("Removed temporary file: %s", segment_path)
         except Exception as e:
-            print(f"Error renaming single chunk: {str(e)}")
-            raise
+            log.warning("Could not remove temporary file %s: %s", segment_path, e)
+    return info
 
-def generate_chunk_audio(chunk: str, chunk_path: str, api_key: str, voice: str = "Sarah"):
-    """Generate audio for a single chunk using a specific API key"""
+def generate_chunk_audio(chunk: str, chunk_path: str, api_key: str = None, voice: str = VOICE_ID, cache: ChunkCache = None,
+                         scheduler: KeyScheduler = None, model_id: str = MODEL_ID):
+    """Generate audio for a single chunk with voice id `voice`, using a specific API key or a key scheduler"""
     try:
-        # Make direct API call to ElevenLabs
-        response = requests.post(
-            "https://api.elevenlabs.io/v1/text-to-speech/21m00Tcm4TlvDq8ikWAM",
-            headers={
-                "Accept": "audio/mpeg",
-                "Content-Type": "application/json",
-                "xi-api-key": api_key
-            },
-            json={
-                "text": chunk,
-                "model_id": "eleven_monolingual_v1",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.5
+        with metrics.timer('synthesize'):
+            return _synthesize_chunk_audio(chunk, chunk_path, api_key, voice, cache, scheduler, model_id)
+    except BudgetExhausted as e:
+        log.info("Not synthesizing chunk: %s", e)
+        return None
+    except Exception as e:
+        log.error("Error generating audio for chunk: %s", e)
+        return None
+
+def _synthesize_chunk_audio(chunk: str, chunk_path: str, api_key: str, voice: str, cache: ChunkCache,
+                            scheduler: KeyScheduler, model_id: str = MODEL_ID):
+    """Cache lookup, then route the chunk through the scheduler until a key succeeds"""
+    # Reuse previously synthesized audio for identical chunks
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.key_for(chunk, voice, model_id, VOICE_SETTINGS)
+        if cache.fetch(cache_key, chunk_path):
+            metrics.incr('cache_hits')
+            return chunk_path
+        metrics.incr('cache_misses')
+    
+    if scheduler is None:
+        scheduler = KeyScheduler([api_key])
+    
+    for attempt in range(MAX_CHUNK_ATTEMPTS):
+        key = scheduler.acquire(len(chunk))
+        started = time.monotonic()
+        metrics.incr('requests')
+        metrics.incr('chars_sent', len(chunk))
+        response = None
+        try:
+            # Make direct API call to ElevenLabs. Rate limits are handled by
+            # the scheduler (another key can take the chunk), so only server
+            # errors are retried on the same key.
+            response = http_pool.post(
+                ELEVENLABS_TTS_URL.format(voice_id=voice),
+                retry_statuses=http_pool.SERVER_ERROR_STATUSES,
+                stream=True,
+                headers={
+                    "Accept": "audio/mpeg",
+                    "Content-Type": "application/json",
+                    "xi-api-key": key.api_key
+                },
+                json={
+                    "text": chunk,
+                    "model_id": model_id,
+                    "voice_settings": VOICE_SETTINGS
                 }
-            }
-        )
+            )
+            if response.status_code == 200:
+                # Stream straight to disk; the chunk only appears once complete
+                http_pool.save_response(response, chunk_path)
+        except Exception as e:
+            # A 200 is billed even if streaming its body then failed
+            status_code = 200 if response is not None and response.status_code == 200 else None
+            scheduler.release(key, len(chunk), status_code, elapsed=time.monotonic() - started)
+            metrics.incr('request_errors')
+            log.warning("Error generating audio for chunk with key %s: %s", key.label, e)
+            continue
         
+        elapsed = time.monotonic() - started
+        metrics.observe_key_latency(key.label, elapsed)
         if response.status_code == 200:
-            with open(chunk_path, 'wb') as f:
-                f.write(response.content)
+            scheduler.release(key, len(chunk), 200, elapsed=elapsed)
+            metrics.incr('bytes_received', os.path.getsize(chunk_path))
+            if cache is not None:
+                cache.store(cache_key, chunk_path)
             return chunk_path
-        else:
-            print(f"Error generating audio for chunk: {response.status_code} - {response.text}")
+        
+        scheduler.release(key, len(chunk), response.status_code,
+                          http_pool.parse_retry_after(response.headers.get('Retry-After')),
+                          response.text, elapsed=elapsed)
+        if response.status_code == 429:
+            metrics.incr('rate_limited')
+        if response.status_code not in (401, 429) and response.status_code not in http_pool.SERVER_ERROR_STATUSES:
+            log.error("Error generating audio for chunk: %s - %s", response.status_code, response.text)
+            metrics.incr('chunks_failed')
             return None
-    except Exception as e:
-        print(f"Error generating audio for chunk: {str(e)}")
-        return None
+        metrics.incr('chunk_retries')
+        log.debug("Key %s returned %s, retrying chunk (attempt %d)", key.label, response.status_code, attempt + 1)
+    
+    log.warning("Giving up on chunk after %d attempts", MAX_CHUNK_ATTEMPTS)
+    metrics.incr('chunks_failed')
+    return None
+
+def create_rss_feed(essays: list, page_size: int = DEFAULT_PAGE_SIZE, rendition: str = None,
+                    output_dir: str = 'output'):
+    """Write feed.xml in output_dir with the latest page_size episodes, plus archive pages.
 
-def create_rss_feed(essays: list):
+    With a rendition name, enclosures point at that rendition for episodes
+    that have one built (see renditions.py) and at the original otherwise.
+    """
     try:
-        print("\nCreating RSS feed...")
-        # Create the RSS feed structure
-        rss = ET.Element('rss')
-        rss.set('version', '2.0')
-        rss.set('xmlns:itunes', 'http://www.itunes.com/dtds/podcast-1.0.dtd')
-        
-        channel = ET.SubElement(rss, 'channel')
-        
-        # Add podcast metadata
-        ET.SubElement(channel, 'title').text = "Paul Graham Essays"
-        ET.SubElement(channel, 'description').text = "Audio versions of Paul Graham's essays"
-        ET.SubElement(channel, 'link').text = 'https://paulgraham.com'
-        ET.SubElement(channel, 'language').text = 'en-us'
-        ET.SubElement(channel, 'pubDate').text = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S %z')
-        
-        # Add iTunes-specific tags
-        ET.SubElement(channel, 'itunes:title').text = "Paul Graham Essays"
-        ET.SubElement(channel, 'itunes:author').text = 'Paul Graham'
-        ET.SubElement(channel, 'itunes:summary').text = "Audio versions of Paul Graham's essays"
-        ET.SubElement(channel, 'itunes:type').text = 'episodic'
-        ET.SubElement(channel, 'itunes:explicit').text = 'no'
-        
-        # Add each essay as an episode
+        log.debug("Creating RSS feed...")
+        index = RenditionIndex(os.path.join(output_dir, 'renditions')) if rendition else None
+        episodes = []
         for essay in essays:
-            item = ET.SubElement(channel, 'item')
-            ET.SubElement(item, 'title').text = essay['title']
-            ET.SubElement(item, 'description').text = essay['description']
-            ET.SubElement(item, 'pubDate').text = essay['pub_date']
-            
-            # Add iTunes-specific tags for the episode
-            ET.SubElement(item, 'itunes:title').text = essay['title']
-            ET.SubElement(item, 'itunes:author').text = 'Paul Graham'
-            ET.SubElement(item, 'itunes:summary').text = essay['description']
-            ET.SubElement(item, 'itunes:episodeType').text = 'full'
-            ET.SubElement(item, 'itunes:explicit').text = 'no'
-            
-            # Add audio file enclosure
-            enclosure = ET.SubElement(item, 'enclosure')
-            enclosure.set('url', essay['audio_url'])
-            enclosure.set('type', 'audio/mpeg')
-            # Get file size from local file
-            local_path = os.path.join('output', os.path.basename(essay['audio_url']))
-            if os.path.exists(local_path):
-                enclosure.set('length', str(os.path.getsize(local_path)))
+            audio_file = os.path.basename(essay['audio_url'])
+            built = index.get(rendition, audio_file) if index else None
+            if built:
+                essay = dict(essay, audio_url=AUDIO_BASE_URL + built['file'], audio_size=built['size'],
+                             duration=built['duration'] or essay.get('duration'), mime_type=built['mime_type'])
+            # Use the recorded size when available, otherwise the local file
+            elif essay.get('audio_size') is None:
+                local_path = os.path.join(output_dir, audio_file)
+                if os.path.exists(local_path):
+                    essay = dict(essay, audio_size=os.path.getsize(local_path))
+            episodes.append(essay)
         
-        # Create the XML file
-        xmlstr = minidom.parseString(ET.tostring(rss)).toprettyxml(indent="   ")
-        
-        # Save the RSS feed
-        rss_path = os.path.join('output', 'feed.xml')
-        print(f"Saving RSS feed to: {rss_path}")
-        with open(rss_path, 'w') as f:
-            f.write(xmlstr)
-        
-        print(f"RSS feed saved successfully")
+        with metrics.timer('feed'):
+            paths = write_paged_feed(episodes, output_dir, AUDIO_BASE_URL, FEED_CHANNEL, page_size)
+        log.info("RSS feed saved to: %s", ', '.join(paths))
         
     except Exception as e:
-        print(f"Error creating RSS feed: {str(e)}")
+        log.error("Error creating RSS feed: %s", e)
         raise
 
-def fetch_content(url: str, generate_audio: bool = False, api_keys: list = None):
-    try:
-        print(f"\nFetching {url}...")
-        response = requests.get(url)
+def fetch_page(url: str, crawler: Crawler = None):
+    """Download an essay page, through the crawler's HTML cache when given"""
+    with metrics.timer('fetch'):
+        if crawler is not None:
+            return crawler.fetch(url)
+        response = http_pool.get(url)
         response.raise_for_status()
-        
-        # Parse the HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract the title
-        title = soup.find('title').text.strip()
-        
-        # Find the main content table
-        content_table = soup.find('table', width="435")
-        if not content_table:
-            print(f"Could not find content table in {url}")
+        return response.text
+
+def extract_essay(html, url: str, normalizer: Normalizer = DEFAULT_NORMALIZER):
+    """Return (title, text) for an essay page, or None if it has no content table.
+
+    The text is what gets synthesized: notes, acknowledgements, footnote
+    markers and typographic noise are removed by `normalizer`.
+    """
+    with metrics.timer('extract'):
+        essay = extract(html, url)
+    if essay is None:
+        log.warning("Could not find content table in %s", url)
+        return None
+    with metrics.timer('normalize'):
+        text = normalizer.normalize(essay.paragraphs)
+    # Counted in and out rather than as a difference, which expanded footnotes can make negative
+    metrics.incr('chars_extracted', len(essay.text))
+    metrics.incr('chars_normalized', len(text))
+    log.debug("Normalized %s: %d -> %d characters", url, len(essay.text), len(text))
+    return essay.title, text
+
+def essay_output_path(url: str, title: str = None, output_dir: str = 'output') -> str:
+    """Local path of the episode audio for an essay"""
+    return os.path.join(output_dir, get_essay_filename(url, title))
+
+def essay_entry(url: str, title: str, text: str, episode: dict = None) -> dict:
+    """Feed entry for an essay whose audio exists.
+
+    The audio URL and pub_date come from the essay's manifest record, so they
+    stay the same from run to run; without one, the entry is dated now.
+    """
+    episode = episode or {}
+    return {
+        'title': title,
+        'url': url,
+        'audio_url': episode.get('audio_url') or AUDIO_BASE_URL + get_essay_filename(url, title),
+        'pub_date': episode.get('pub_date') or format_datetime(datetime.now(timezone.utc)),
+        'description': text[:500] + '...' if len(text) > 500 else text
+    }
+
+def fetch_content(url: str, generate_audio: bool = False, api_keys: list = None, cache: ChunkCache = None,
+                  scheduler: KeyScheduler = None, manifest: EpisodeManifest = None):
+    try:
+        log.info("Fetching %s...", url)
+        essay = extract_essay(fetch_page(url), url)
+        if not essay:
             return None
-        
-        # Get all text from the table
-        text = content_table.get_text(separator='\n').strip()
+        title, text = essay
         
         # Generate filename from URL
-        filename = get_essay_filename(url, title)
-        output_path = os.path.join('output', filename)
+        output_path = essay_output_path(url, title)
         
         # Check if audio file already exists
         existing_file = os.path.exists(output_path)
         
         # Generate audio only if requested and file doesn't exist
         if generate_audio and not existing_file:
-            print(f"\nGenerating audio for {title}...")
+            log.info("Generating audio for %s...", title)
             if not api_keys:
                 raise ValueError("No API keys provided")
             
             # Generate audio for the entire essay
-            generate_audio_for_text(text, output_path, api_keys)
-            print(f"\nAudio saved to: {output_path}")
+            generate_audio_for_text(text, output_path, api_keys, cache=cache, scheduler=scheduler, url=url)
+            log.info("Audio saved to: %s", output_path)
+            if manifest is not None:
+                manifest.record(url, title, text, output_path)
             existing_file = True  # Update flag since we just generated the file
         
         # Only return essay data if audio file exists
         if existing_file:
-            return {
-                'title': title,
-                'url': url,
-                'audio_url': f"https://raw.githubusercontent.com/victorlazarte/pgpod/main/output/{filename}",
-                'pub_date': datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z'),
-                'description': text[:500] + '...' if len(text) > 500 else text
-            }
+            episode = manifest.get(os.path.basename(output_path)) if manifest is not None else None
+            return essay_entry(url, title, text, episode)
         else:
-            print(f"No audio file exists for {title}, skipping from RSS feed")
+            log.info("No audio file exists for %s, skipping from RSS feed", title)
             return None
         
     except Exception as e:
-        print(f"Error processing {url}: {str(e)}")
+        log.error("Error processing %s: %s", url, e)
         return None
 
 def load_api_keys():
@@ -563,7 +387,7 @@ def load_api_keys():
         if not key:
             break
         api_keys.append(key)
-        print(f"Loaded API key {i}: {key[:5]}...{key[-5:]}")
+        log.debug("Loaded API key %d: %s...%s", i, key[:5], key[-5:])
         i += 1
     
     # Fallback to single API key if no numbered keys found
@@ -571,92 +395,168 @@ def load_api_keys():
         key = os.getenv('ELEVENLABS_API_KEY')
         if key:
             api_keys.append(key)
-            print(f"Loaded single API key: {key[:5]}...{key[-5:]}")
+            log.debug("Loaded single API key: %s...%s", key[:5], key[-5:])
     
     if not api_keys:
-        print("No API keys found in environment variables")
+        log.warning("No API keys found in environment variables")
     else:
-        print(f"Total API keys loaded: {len(api_keys)}")
+        log.info("Total API keys loaded: %d", len(api_keys))
     
     return api_keys
 
 def recombine_chunks(output_path: str):
     """Recombine existing audio chunks into a single file"""
     try:
-        # Find all chunk files
-        chunk_files = []
-        i = 1
-        while True:
-            chunk_path = f"{output_path}.chunk{i}"
-            if not os.path.exists(chunk_path):
-                break
-            chunk_files.append(chunk_path)
-            i += 1
+        journal = EssayJournal.load(output_path)
+        if journal is not None:
+            if not journal.complete:
+                log.warning("%d chunks of %s are still missing; rerun generation to resume",
+                            len(journal.pending()), output_path)
+                return False
+            chunk_files = journal.paths()
+        else:
+            # Find all chunk files
+            chunk_files = []
+            i = 1
+            while True:
+                chunk_path = f"{output_path}.part{i}"
+                if not os.path.exists(chunk_path):
+                    break
+                chunk_files.append(chunk_path)
+                i += 1
         
         if not chunk_files:
-            print(f"No chunk files found for {output_path}")
+            log.info("No chunk files found for %s", output_path)
             return False
             
-        print(f"\nFound {len(chunk_files)} chunk files to combine")
-        
-        # Load the first chunk
-        print(f"Loading first chunk: {chunk_files[0]}")
-        combined = AudioSegment.from_mp3(chunk_files[0])
-        
-        # Add the rest of the chunks
-        for i, segment_path in enumerate(chunk_files[1:], 1):
-            print(f"Adding chunk {i+1}: {segment_path}")
-            segment = AudioSegment.from_mp3(segment_path)
-            combined += segment
-        
-        # Export the combined audio
-        print(f"Exporting combined audio to: {output_path}")
-        combined.export(output_path, format="mp3")
-        print(f"Successfully combined audio saved to {output_path}")
-        
-        # Clean up temporary chunk files
-        print("Cleaning up temporary chunk files...")
-        for segment_path in chunk_files:
-            try:
-                os.remove(segment_path)
-                print(f"Removed temporary file: {segment_path}")
-            except Exception as e:
-                print(f"Warning: Could not remove temporary file {segment_path}: {str(e)}")
+        log.info("Found %d chunk files to combine", len(chunk_files))
+        info = combine_chunks(chunk_files, output_path)
+        if journal is not None:
+            journal.finalize(output_path, info['spans'])
         
         return True
         
     except Exception as e:
-        print(f"Error combining audio chunks: {str(e)}")
-        print("Keeping temporary chunk files for debugging")
+        log.error("Error recombining %s: %s", output_path, e)
         return False
 
 if __name__ == "__main__":
+    from backlog import DEFAULT_POLICY, POLICIES
+    
     parser = argparse.ArgumentParser(description='Generate podcast from Paul Graham essays')
     parser.add_argument('--generate-audio', action='store_true', help='Generate audio files')
     parser.add_argument('--recombine', action='store_true', help='Recombine existing audio chunks')
+    parser.add_argument('--cache-dir', default='cache/chunks', help='Directory for cached audio chunks')
+    parser.add_argument('--cache-max-mb', type=int, default=2048, help='Maximum size of the chunk cache in MB')
+    parser.add_argument('--no-cache', action='store_true', help='Always call the API, even for cached chunks')
+    parser.add_argument('--per-key-concurrency', type=int, default=5, help='Maximum concurrent requests per API key')
+    parser.add_argument('--requests-per-minute', type=float, help='Request rate limit per API key')
+    parser.add_argument('--chars-per-minute', type=float, help='Character rate limit per API key')
+    parser.add_argument('--check-quota', action='store_true', help='Fetch remaining character quota for each key before starting')
+    parser.add_argument('--essays-in-flight', type=int, default=4, help='Essays synthesized concurrently')
+    parser.add_argument('--fetch-workers', type=int, default=4, help='Concurrent essay page downloads')
+    parser.add_argument('--html-cache-dir', default='cache/html', help='Directory for cached essay pages')
+    parser.add_argument('--crawl', action='store_true', help='Refresh the cached page of every essay')
+    parser.add_argument('--catalog', default='blog_posts.json', help='JSON catalog of essays')
+    parser.add_argument('--discover', action='store_true', help="Add essays from paulgraham.com's articles index to the catalog")
+    parser.add_argument('--feed-page-size', type=int, default=DEFAULT_PAGE_SIZE, help='Episodes in feed.xml; older ones go to archive pages (0 for a single feed)')
+    parser.add_argument('--voice', default=VOICE_ID, help='Voice of the podcast: an ElevenLabs voice name or id, optionally with ":<model id>"')
+    parser.add_argument('--extra-voices', default='',
+                        help='Comma-separated voices ("name[:model]") to also synthesize each essay in, under output/voices/')
+    parser.add_argument('--chunking', choices=list(CHUNKING), default=DEFAULT_CHUNKING, help='Fill chunks to the limit, or anchor boundaries to content so edits re-synthesize only nearby chunks')
+    parser.add_argument('--plan', action='store_true',
+                        help='Estimate characters, requests, quota and ETA for pending essays without calling the TTS API')
+    parser.add_argument('--priority', choices=POLICIES, default=DEFAULT_POLICY,
+                        help='Order pending essays newest first, shortest first, or partially done first')
+    parser.add_argument('--max-chars', type=int, help='Hard limit on characters sent to the TTS API this run, across all keys')
+    parser.add_argument('--max-requests', type=int, help='Hard limit on TTS requests this run, across all keys')
+    parser.add_argument('--update-changed', action='store_true', help='Re-synthesize the changed chunks of published essays whose text changed')
+    parser.add_argument('--keep-notes', action='store_true', help='Read the Notes section aloud')
+    parser.add_argument('--keep-thanks', action='store_true', help='Read the acknowledgements aloud')
+    parser.add_argument('--footnotes', choices=FOOTNOTE_MODES, default='drop', help='Drop footnote markers, read the note in place, or keep them')
+    parser.add_argument('--keep-quotes', action='store_true', help='Leave curly quotes as they are')
+    parser.add_argument('--renditions', help=f"Comma-separated renditions to build with ffmpeg ({', '.join(RENDITIONS)})")
+    parser.add_argument('--render-workers', type=int, help='Concurrent ffmpeg encodes (default: one per core)')
+    parser.add_argument('--no-loudnorm', action='store_true', help='Skip loudness normalization when building renditions')
+    parser.add_argument('--feed-rendition', choices=list(RENDITIONS), help='Publish this rendition in the feed instead of the original MP3s')
+    parser.add_argument('--site-page-size', type=int, default=DEFAULT_EPISODES_PER_PAGE, help='Episodes per page of index.html (0 for a single page)')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging verbosity')
+    parser.add_argument('--metrics-report', help='Append a JSON-lines run report to this file')
+    parser.add_argument('--prometheus-textfile', help='Write run metrics in Prometheus textfile format to this path')
     args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s')
     
-    # Load API keys (only needed if generating audio)
-    api_keys = load_api_keys() if args.generate_audio else []
+    # Imported here because the engine builds on this module
+    from engine import Engine
     
-    # Process only existing audio files
-    processed_essays = []
-    output_dir = "output"
-    
-    # Get all .mp3 files in the output directory
-    for filename in os.listdir(output_dir):
-        if filename.endswith('.mp3'):
-            # Extract the essay name from the filename
-            essay_name = filename.replace('.mp3', '')
-            # Find the corresponding URL in ESSAY_URLS
-            for url in ESSAY_URLS:
-                if essay_name in url:
-                    print(f"\nProcessing existing audio file: {filename}")
-                    essay_data = fetch_content(url, False, api_keys)  # Don't generate audio, just get metadata
-                    if essay_data:
-                        processed_essays.append(essay_data)
-                    break
-    
-    # Create RSS feed with all processed essays
-    if processed_essays:
-        create_rss_feed(processed_essays) 
\ No newline at end of file
+    # API keys are only needed if generating audio or projecting per-key load
+    engine = Engine(
+        load_api_keys() if args.generate_audio or args.plan else [],
+        catalog_path=args.catalog,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024,
+        use_cache=not args.no_cache,
+        html_cache_dir=args.html_cache_dir,
+        per_key_concurrency=args.per_key_concurrency,
+        requests_per_minute=args.requests_per_minute,
+        chars_per_minute=args.chars_per_minute,
+        essays_in_flight=args.essays_in_flight,
+        fetch_workers=args.fetch_workers,
+        normalizer=Normalizer(NormalizeRules(
+            strip_notes=not args.keep_notes,
+            strip_thanks=not args.keep_thanks,
+            footnotes=args.footnotes,
+            quotes=not args.keep_quotes,
+        )),
+        chunking=args.chunking,
+        voice=args.voice,
+        extra_voices=[spec for spec in args.extra_voices.split(',') if spec.strip()],
+    )
+    with engine:
+        if args.plan:
+            # Dry run: report what synthesis would cost and touch nothing else
+            if args.check_quota and engine.scheduler:
+                engine.scheduler.refresh_quota()
+            engine.plan(report_path=args.metrics_report).print_report()
+        else:
+            if args.recombine:
+                engine.recombine()
+        
+            # Seed the manifest from the published feed the first time, so existing
+            # episodes keep their original dates
+            imported = engine.seed_manifest()
+            if imported:
+                log.info("Imported %d episodes from the existing feed", imported)
+        
+            if args.discover:
+                new_essays = engine.discover()
+                for essay in new_essays:
+                    log.info("New essay: %s (%s)", essay['title'], essay['url'])
+                log.info("Found %d new essays; catalog has %d", len(new_essays), len(engine.catalog))
+        
+            if args.crawl:
+                engine.crawl()
+        
+            # Generate audio for any essays that don't have it yet
+            if args.generate_audio:
+                if args.check_quota:
+                    engine.scheduler.refresh_quota()
+                # One budget covers both the backlog and any updates
+                budget = None
+                if args.max_chars is not None or args.max_requests is not None:
+                    budget = RunBudget(args.max_chars, args.max_requests)
+                engine.run_backlog(policy=args.priority, budget=budget)
+                if args.update_changed:
+                    engine.run_backlog(engine.changed(), update=True, budget=budget)
+        
+            # Only fetch metadata for audio files the manifest doesn't know about yet
+            engine.record_existing()
+            if args.renditions:
+                try:
+                    engine.render(args.renditions.split(','), args.render_workers, not args.no_loudnorm)
+                except (RuntimeError, ValueError) as e:
+                    log.error("Skipping renditions: %s", e)
+            engine.write_feed(args.feed_page_size, args.feed_rendition)
+            engine.write_site(args.site_page_size)
+            engine.print_stats()
+            engine.write_metrics(args.metrics_report, args.prometheus_textfile)
@@ -0,0 +1,126 @@
+import json
+import os
+from urllib.parse import urljoin, urlparse
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+DEFAULT_CATALOG_PATH = 'blog_posts.json'
+ARTICLES_INDEX_URL = 'https://paulgraham.com/articles.html'
+# Site navigation pages linked from articles.html that are not essays
+NON_ESSAY_SLUGS = {
+    'index', 'articles', 'bio', 'books', 'arc', 'bel', 'lisp', 'antispam', 'spam', 'kedrosky',
+    'faq', 'raq', 'quo', 'rss', 'ind', 'info', 'resources', 'links', 'responses',
+}
+
+
+def slug_for(url: str) -> str:
+    """Essay slug from its URL: http://www.paulgraham.com/acl1.txt -> acl1"""
+    return os.path.splitext(urlparse(url).path.rsplit('/', 1)[-1])[0]
+
+
+class Catalog:
+    """The list of essays to publish, loaded once per run.
+
+    blog_posts.json is the single source of truth (in publication order,
+    newest first). Lookups by slug, URL and audio file name are dictionary
+    lookups, and the output directory is listed once when the catalog is
+    built.
+    """
+
+    def __init__(self, entries: list, path: str = DEFAULT_CATALOG_PATH, output_dir: str = 'output'):
+        self.path = path
+        self.output_dir = output_dir
+        self.entries = []
+        self.by_slug = {}
+        for entry in entries:
+            self._index(entry)
+        self.refresh_artifacts()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_CATALOG_PATH, output_dir: str = 'output') -> 'Catalog':
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get('blog_posts', []), path, output_dir)
+
+    def _index(self, entry: dict, position: int = None) -> bool:
+        slug = slug_for(entry['url'])
+        if slug in self.by_slug:
+            return False
+        if position is None:
+            self.entries.append(entry)
+        else:
+            self.entries.insert(position, entry)
+        self.by_slug[slug] = entry
+        return True
+
+    def refresh_artifacts(self):
+        """Re-list the output directory (lower-cased name -> actual name)"""
+        try:
+            names = os.listdir(self.output_dir)
+        except FileNotFoundError:
+            names = []
+        self.artifacts = {name.lower(): name for name in names}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def urls(self) -> list:
+        return [entry['url'] for entry in self.entries]
+
+    def get(self, slug: str) -> dict:
+        return self.by_slug.get(slug)
+
+    def for_url(self, url: str) -> dict:
+        return self.by_slug.get(slug_for(url))
+
+    def for_audio_file(self, filename: str) -> dict:
+        """Catalog entry for an episode file name such as read.mp3"""
+        return self.by_slug.get(os.path.splitext(filename)[0])
+
+    def audio_filename(self, slug: str) -> str:
+        return f"{slug}.mp3"
+
+    def artifact_path(self, slug: str) -> str:
+        """Path of the episode audio for slug, matched case-insensitively, or None"""
+        name = self.artifacts.get(self.audio_filename(slug).lower())
+        return os.path.join(self.output_dir, name) if name else None
+
+    def pending(self) -> list:
+        """URLs of essays without episode audio"""
+        return [entry['url'] for entry in self.entries if not self.artifact_path(slug_for(entry['url']))]
+
+    def add(self, url: str, title: str = None, position: int = None) -> bool:
+        """Add an essay at `position` in the catalog (default: the end)"""
+        entry = {'url': url}
+        if title:
+            entry['title'] = title
+        return self._index(entry, position)
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'blog_posts': self.entries}, f, indent=4, ensure_ascii=False)
+            f.write('\n')
+        os.replace(tmp_path, self.path)
+
+    def diff_index(self, html, index_url: str = ARTICLES_INDEX_URL) -> list:
+        """Essays linked from the site's articles index that are not in the catalog.
+
+        Returns [{'url': ..., 'title': ...}] in index order.
+        """
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('a'))
+        host = urlparse(index_url).netloc.replace('www.', '')
+        new = []
+        seen = set()
+        for link in soup.find_all('a', href=True):
+            url = urljoin(index_url, link['href'])
+            parsed = urlparse(url)
+            slug = slug_for(url)
+            if parsed.netloc.replace('www.', '') != host or not parsed.path.endswith(('.html', '.txt')):
+                continue
+            if slug in NON_ESSAY_SLUGS or slug in self.by_slug or slug in seen:
+                continue
+            seen.add(slug)
+            new.append({'url': url, 'title': ' '.join(link.get_text().split())})
+        return new
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+# Eviction trims the cache to this share of max_bytes, so a full cache is
+# scanned once per ~10% of churn rather than on every store
+LOW_WATER = 0.9
+
+
+class ChunkCache:
+    """Persistent on-disk cache of synthesized audio chunks.
+
+    Entries are keyed by a hash of everything that affects the audio (text,
+    voice id, model id and voice settings), so an unchanged chunk is never
+    sent to the API twice. The cache is bounded by total size and evicts the
+    least recently used entries first; a hit refreshes the file's mtime.
+    """
+
+    def __init__(self, cache_dir: str = 'cache/chunks', max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        # Held while evicting, so concurrent stores over budget don't each rescan the cache
+        self._evict_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._total_bytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key_for(text: str, voice_id: str, model_id: str, voice_settings: dict) -> str:
+        """Return the content hash identifying a chunk's audio"""
+        payload = json.dumps({
+            'text': text,
+            'voice_id': voice_id,
+            'model_id': model_id,
+            'voice_settings': voice_settings,
+        }, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.mp3")
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached file"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.mp3'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def contains(self, key: str) -> bool:
+        """True if the chunk is cached; doesn't count as a hit or refresh it"""
+        return os.path.exists(self._path(key))
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """Copy a cached chunk to dest_path. Returns True on a hit."""
+        path = self._path(key)
+        tmp_path = f"{dest_path}.tmp"
+        try:
+            shutil.copyfile(path, tmp_path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        os.replace(tmp_path, dest_path)
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += os.path.getsize(dest_path)
+        return True
+
+    def store(self, key: str, src_path: str):
+        """Add a freshly synthesized chunk to the cache"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, tmp_path)
+        size = os.path.getsize(tmp_path)
+        existing = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.stores += 1
+            self._total_bytes += size - existing
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is down to LOW_WATER of max_bytes.
+
+        The directory scan and deletions run outside the lock fetch and
+        store take, so lookups carry on meanwhile; if another thread is
+        already evicting, this returns at once.
+        """
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                tracked = self._total_bytes
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            target = int(self.max_bytes * LOW_WATER)
+            evicted = 0
+            for path, size, _ in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                total -= size
+                evicted += 1
+            with self._lock:
+                # Resync with the scan, keeping what was stored while it ran
+                self._total_bytes = total + self._total_bytes - tracked
+                self.evictions += evicted
+        finally:
+            self._evict_lock.release()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'bytes_saved': self.bytes_saved,
+                'size_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"Chunk cache: {s['hits']} hits, {s['misses']} misses "
+              f"({s['hit_rate']:.0%} hit rate), {s['stores']} stored, {s['evictions']} evicted, "
+              f"{s['size_bytes'] / 1024 ** 2:.1f} MB of {s['max_bytes'] / 1024 ** 2:.0f} MB used")
@@ -0,0 +1,164 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import http_pool
+
+log = logging.getLogger(__name__)
+
+
+class HtmlCache:
+    """Raw page bodies on disk, keyed by URL, with their HTTP validators"""
+
+    def __init__(self, cache_dir: str = 'cache/html'):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _base(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def meta(self, url: str) -> dict:
+        try:
+            with open(self._base(url) + '.json', 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def body(self, url: str) -> bytes:
+        try:
+            with open(self._base(url) + '.body', 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store(self, url: str, body: bytes, meta: dict):
+        base = self._base(url)
+        if body is not None:
+            with open(base + '.body.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(base + '.body.tmp', base + '.body')
+        with open(base + '.json.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(base + '.json.tmp', base + '.json')
+
+
+class Crawler:
+    """Concurrent essay downloader with revalidation against an on-disk cache.
+
+    Every fetch sends If-None-Match / If-Modified-Since when a cached copy
+    exists, so an unchanged page costs a 304 and no body. Concurrency is
+    bounded overall (max_workers) and per host (per_host), with an optional
+    minimum interval between requests to the same host. Pages checked within
+    max_age seconds are served from disk without any request.
+    """
+
+    def __init__(self, cache_dir: str = 'cache/html', max_workers: int = 8, per_host: int = 4,
+                 min_interval: float = 0.0, max_age: float = 0.0):
+        self.cache = HtmlCache(cache_dir)
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.max_age = max_age
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self.stats = {'fetched': 0, 'not_modified': 0, 'fresh': 0, 'errors': 0, 'bytes_downloaded': 0}
+
+    def _host_slot(self, url: str) -> dict:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = {'semaphore': threading.Semaphore(self.per_host), 'next_at': 0.0,
+                                     'lock': threading.Lock()}
+            return self._hosts[host]
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def cached(self, url: str) -> bytes:
+        """Cached body for url without touching the network, or None"""
+        return self.cache.body(url)
+
+    def fetch(self, url: str) -> bytes:
+        """Return the current body of url, revalidating any cached copy"""
+        meta = self.cache.meta(url)
+        if meta and self.max_age and time.time() - meta.get('checked_at', 0) < self.max_age:
+            body = self.cache.body(url)
+            if body is not None:
+                self._count('fresh')
+                return body
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        slot = self._host_slot(url)
+        with slot['semaphore']:
+            if self.min_interval:
+                with slot['lock']:
+                    wait = slot['next_at'] - time.monotonic()
+                    slot['next_at'] = max(slot['next_at'], time.monotonic()) + self.min_interval
+                if wait > 0:
+                    time.sleep(wait)
+            try:
+                response = http_pool.get(url, headers=headers)
+            except Exception:
+                self._count('errors')
+                raise
+
+        if response.status_code == 304 and meta:
+            body = self.cache.body(url)
+            if body is not None:
+                meta['checked_at'] = time.time()
+                meta['last_status'] = 304
+                meta['not_modified_count'] = meta.get('not_modified_count', 0) + 1
+                self.cache.store(url, None, meta)
+                self._count('not_modified')
+                return body
+            # Cached body went missing; fetch it unconditionally
+            response = http_pool.get(url)
+
+        if response.status_code != 200:
+            self._count('errors')
+            response.raise_for_status()
+        body = response.content
+        self.cache.store(url, body, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'checked_at': time.time(),
+            'fetched_at': time.time(),
+            'last_status': 200,
+            'not_modified_count': 0,
+        })
+        self._count('fetched')
+        self._count('bytes_downloaded', len(body))
+        return body
+
+    def fetch_all(self, urls: list) -> dict:
+        """Fetch every URL concurrently; returns {url: body} for successful fetches"""
+        http_pool.get_session(self.max_workers)
+        results = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_url = {executor.submit(self.fetch, url): url for url in urls}
+            for future in concurrent.futures.as_completed(future_to_url):
+                url = future_to_url[future]
+                try:
+                    results[url] = future.result()
+                except Exception as e:
+                    log.warning("Error fetching %s: %s", url, e)
+        return results
+
+    def print_stats(self):
+        s = self.stats
+        print(f"Crawler: {s['fetched']} fetched, {s['not_modified']} not modified, {s['fresh']} fresh in cache, "
+              f"{s['errors']} errors, {s['bytes_downloaded'] / 1024:.0f} KB downloaded")
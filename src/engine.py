@@ -0,0 +1,293 @@
+import concurrent.futures
+import logging
+import os
+
+import http_pool
+import metrics
+from backlog import BACKLOG_FILE, DEFAULT_POLICY, schedule_backlog
+from blog_reader import (
+    MAX_WORKERS,
+    VOICE_ID,
+    create_rss_feed,
+    essay_output_path,
+    extract_essay,
+    fetch_page,
+    generate_audio_for_text,
+    get_essay_filename,
+    load_api_keys,
+    recombine_chunks,
+)
+from catalog import ARTICLES_INDEX_URL, DEFAULT_CATALOG_PATH, Catalog
+from chunk_cache import ChunkCache
+from crawler import Crawler
+from feed_writer import DEFAULT_PAGE_SIZE
+from key_scheduler import DEFAULT_CONCURRENCY, KeyScheduler, RunBudget
+from journal import load_chunk_map, text_changed
+from manifest import EpisodeManifest
+from normalize import DEFAULT_NORMALIZER, Normalizer
+from pipeline import CorpusPipeline
+from planner import BacklogPlan, plan_backlog
+from renditions import render_all
+from segmenter import DEFAULT_CHUNKING
+from site_writer import DEFAULT_EPISODES_PER_PAGE, write_site
+from voices import DEFAULT_VOICE_CACHE, Voice, VoiceRegistry, parse_voice_spec
+
+log = logging.getLogger(__name__)
+
+
+class Engine:
+    """Long-lived state shared by every essay in a process.
+
+    Builds the pooled HTTP session, key scheduler, chunk cache, HTML crawler,
+    episode manifest, catalog and synthesis thread pool once. The command-line
+    front-ends (blog_reader.py and main.py) and any embedding code go through
+    it, so setup is paid once per run and the hot path has one implementation.
+    Use as a context manager, or call close() to shut the worker pool down.
+    """
+
+    def __init__(self, api_keys: list = None, voice: str = VOICE_ID, catalog_path: str = DEFAULT_CATALOG_PATH,
+                 manifest_path: str = None, output_dir: str = 'output',
+                 cache_dir: str = 'cache/chunks', cache_max_bytes: int = 2 * 1024 ** 3, use_cache: bool = True,
+                 html_cache_dir: str = 'cache/html', per_key_concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: float = None, chars_per_minute: float = None,
+                 essays_in_flight: int = 4, fetch_workers: int = 4, normalizer: Normalizer = DEFAULT_NORMALIZER,
+                 chunking: str = DEFAULT_CHUNKING, extra_voices: list = None,
+                 voice_cache: str = DEFAULT_VOICE_CACHE):
+        self.api_keys = api_keys or []
+        self.voice = voice
+        self.extra_voices = list(extra_voices or [])
+        self.voice_registry = VoiceRegistry(self.api_keys[0] if self.api_keys else None, voice_cache)
+        self._voices = None
+        self.output_dir = output_dir
+        self.essays_in_flight = essays_in_flight
+        self.fetch_workers = fetch_workers
+        self.normalizer = normalizer
+        self.chunking = chunking
+        self.manifest = EpisodeManifest(manifest_path or os.path.join(output_dir, 'episodes.json'))
+        self.catalog = Catalog.load(catalog_path, output_dir)
+        self.crawler = Crawler(html_cache_dir, per_host=fetch_workers)
+        self.cache = None
+        self.scheduler = None
+        if self.api_keys:
+            if use_cache:
+                self.cache = ChunkCache(cache_dir, cache_max_bytes)
+            self.scheduler = KeyScheduler(self.api_keys, per_key_concurrency, requests_per_minute, chars_per_minute)
+        workers = self.scheduler.total_concurrency if self.scheduler else 0
+        # One connection per synthesis worker and page fetcher, kept alive for the whole run
+        self.session = http_pool.get_session(max(MAX_WORKERS, workers + fetch_workers))
+        self._executor = None
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'Engine':
+        """Engine using the API keys from the environment / .env"""
+        return cls(load_api_keys(), **kwargs)
+
+    @property
+    def executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Synthesis pool sized to the key scheduler, created on first use"""
+        if self._executor is None:
+            self._require_keys()
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, self.scheduler.total_concurrency), thread_name_prefix='synth')
+        return self._executor
+
+    @property
+    def voices(self) -> list:
+        """The podcast's voice, then any extra voices, resolved to ids on first use.
+
+        Voices are given as "name[:model]" or a voice id.
+        """
+        if self._voices is None:
+            name, model = parse_voice_spec(self.voice)
+            self._voices = [Voice(self.voice_registry.resolve(name), model)]
+            self._voices += [self.voice_registry.voice(spec) for spec in self.extra_voices]
+        return self._voices
+
+    def _require_keys(self):
+        if self.scheduler is None:
+            raise ValueError("No API keys provided")
+
+    def output_path(self, url: str) -> str:
+        return essay_output_path(url, None, self.output_dir)
+
+    def fetch_essay(self, url: str):
+        """(title, text) of an essay, through the HTML cache"""
+        return extract_essay(fetch_page(url, self.crawler), url, self.normalizer)
+
+    def pending(self) -> list:
+        """Catalog essays without audio in the podcast's voice or in any extra voice"""
+        missing = set(self.catalog.pending())
+        extra = self.voices[1:] if self.extra_voices else []
+        return [url for url in self.catalog.urls
+                if url in missing or any(not os.path.exists(voice.output_path(url, self.output_dir)) for voice in extra)]
+
+    def synthesize(self, text: str, output_path: str, url: str = None) -> bool:
+        """Synthesize one text to output_path on the shared pool"""
+        self._require_keys()
+        try:
+            voice = self.voices[0]
+            generate_audio_for_text(text, output_path, self.api_keys, voice.voice_id, self.cache, self.scheduler,
+                                    url, executor=self.executor, chunking=self.chunking, model_id=voice.model_id)
+            return True
+        except Exception as e:
+            log.error("Error generating audio for %s: %s", output_path, e)
+            return False
+
+    def run_backlog(self, urls: list = None, update: bool = False, policy: str = DEFAULT_POLICY,
+                    budget: RunBudget = None) -> list:
+        """Synthesize every catalog essay (or just `urls`) that has no audio yet, or with update, `urls` regardless.
+
+        With a priority policy other than catalog order or a budget, the
+        essays are planned first (see plan()), ordered by the policy and cut
+        to what the budget covers, and the backlog state is saved to
+        backlog.json in the output directory. The budget is enforced on every request, so the
+        run stops cleanly at it; unfinished essays keep their journals.
+        """
+        self._require_keys()
+        urls = self.pending() if urls is None else urls
+        queue = None
+        if policy != DEFAULT_POLICY or budget is not None:
+            queue = schedule_backlog(self.plan(urls), urls, policy, budget, self.output_path)
+            urls = queue.urls
+        pipeline = CorpusPipeline(self.scheduler, self.cache, self.voices, self.essays_in_flight, self.fetch_workers,
+                                  self.manifest, self.crawler, self.executor, self.normalizer, self.chunking,
+                                  self.output_dir)
+        self.scheduler.budget = budget
+        try:
+            entries = pipeline.run(urls, update)
+        finally:
+            self.scheduler.budget = None
+        self.catalog.refresh_artifacts()
+        # Updates re-synthesize published essays; the backlog file tracks the essays still to publish
+        if queue is not None and not update:
+            queue.save(os.path.join(self.output_dir, BACKLOG_FILE))
+        return entries
+
+    def plan(self, urls: list = None, report_path: str = None) -> BacklogPlan:
+        """Dry run over every pending essay (or `urls`): costs, per-key load, quota and ETA, no TTS calls"""
+        return plan_backlog(self.pending() if urls is None else urls, self.crawler, self.normalizer,
+                            self.chunking, self.cache, self.scheduler, report_path, self.fetch_workers, self.voices,
+                            self.output_dir)
+
+    def changed(self) -> list:
+        """URLs of published essays whose text no longer matches their audio.
+
+        Only episodes with a chunk map are considered, since those are the
+        ones an update can patch chunk by chunk; pages come from the HTML
+        cache, so crawl first to see the site's current text.
+        """
+        urls = []
+        for episode in list(self.manifest.episodes.values()):
+            output_path = os.path.join(self.output_dir, episode['audio_file'])
+            if load_chunk_map(output_path) is None:
+                continue
+            try:
+                essay = self.fetch_essay(episode['url'])
+            except Exception as e:
+                log.error("Error processing %s: %s", episode['url'], e)
+                continue
+            if essay and text_changed(output_path, essay[1]):
+                log.info("Text changed: %s", essay[0])
+                urls.append(episode['url'])
+        return urls
+
+    def recombine(self) -> int:
+        """Finish essays whose chunks were all synthesized before an interruption"""
+        finished = 0
+        for filename in os.listdir(self.output_dir):
+            if filename.endswith('.journal.json'):
+                finished += bool(recombine_chunks(os.path.join(self.output_dir, filename[:-len('.journal.json')])))
+        self.catalog.refresh_artifacts()
+        return finished
+
+    def seed_manifest(self) -> int:
+        """Import the published feed into an empty manifest, keeping original dates"""
+        if self.manifest.episodes:
+            return 0
+        urls = {get_essay_filename(url, None): url for url in self.catalog.urls}
+        return self.manifest.import_feed(os.path.join(self.output_dir, 'feed.xml'), self.output_dir, urls)
+
+    def discover(self) -> list:
+        """Add essays from the site's articles index to the front of the catalog, keeping it newest first"""
+        new_essays = self.catalog.diff_index(fetch_page(ARTICLES_INDEX_URL, self.crawler))
+        for position, essay in enumerate(new_essays):
+            self.catalog.add(essay['url'], essay['title'], position)
+        if new_essays:
+            self.catalog.save()
+        return new_essays
+
+    def crawl(self):
+        self.crawler.fetch_all(self.catalog.urls)
+
+    def record_existing(self) -> int:
+        """Add audio files the manifest doesn't know about yet"""
+        recorded = 0
+        for filename in self.catalog.artifacts.values():
+            if not filename.endswith('.mp3') or filename in self.manifest:
+                continue
+            entry = self.catalog.for_audio_file(filename)
+            if entry is None:
+                continue
+            url = entry['url']
+            log.info("Recording existing audio file: %s", filename)
+            try:
+                essay = self.fetch_essay(url)
+            except Exception as e:
+                log.error("Error processing %s: %s", url, e)
+                essay = None
+            if essay:
+                self.manifest.record(url, essay[0], essay[1], os.path.join(self.output_dir, filename))
+                recorded += 1
+        return recorded
+
+    def render(self, renditions: list, workers: int = None, normalize: bool = True) -> dict:
+        """Build renditions of every recorded episode whose audio changed since the last build"""
+        sources = [os.path.join(self.output_dir, filename) for filename in self.manifest.episodes]
+        counts = render_all([path for path in sources if os.path.exists(path)], renditions,
+                            os.path.join(self.output_dir, 'renditions'), workers, normalize)
+        log.info("Renditions: %(rendered)d built, %(skipped)d up to date, %(failed)d failed", counts)
+        return counts
+
+    def write_feed(self, page_size: int = DEFAULT_PAGE_SIZE, rendition: str = None):
+        """Build the RSS feed from the manifest; no network needed"""
+        episodes = self.manifest.feed_entries()
+        if episodes:
+            create_rss_feed(episodes, page_size, rendition, self.output_dir)
+
+    def write_site(self, page_size: int = DEFAULT_EPISODES_PER_PAGE) -> list:
+        """Build index.html (and its pages) next to the output directory from the manifest"""
+        episodes = self.manifest.feed_entries()
+        output_dir = os.path.normpath(self.output_dir)
+        with metrics.timer('site'):
+            paths = write_site(episodes, os.path.dirname(output_dir) or '.', audio_prefix=os.path.basename(output_dir) + '/',
+                               feed_url=os.path.basename(output_dir) + '/feed.xml', page_size=page_size)
+        log.info("Site saved to: %s", ', '.join(paths))
+        return paths
+
+    def print_stats(self):
+        self.crawler.print_stats()
+        if self.cache is not None:
+            self.cache.print_stats()
+        if self.scheduler is not None:
+            self.scheduler.print_stats()
+        metrics.get_metrics().print_summary()
+
+    def write_metrics(self, report_path: str = None, textfile_path: str = None):
+        """Append the run report and/or write the Prometheus textfile"""
+        run = metrics.get_metrics()
+        if report_path:
+            run.write_report(report_path, episodes=len(self.manifest.episodes), catalog=len(self.catalog),
+                             concurrency=self.scheduler.total_concurrency if self.scheduler else 0)
+        if textfile_path:
+            run.write_prometheus(textfile_path)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'Engine':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
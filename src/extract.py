@@ -0,0 +1,115 @@
+import re
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.html
+except ImportError:  # lxml is optional; the SoupStrainer path is the fallback
+    lxml = None
+
+CONTENT_TABLE_WIDTH = "435"
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t\r\xa0]*\n')
+
+
+class Essay(NamedTuple):
+    title: str
+    paragraphs: list
+
+    @property
+    def text(self) -> str:
+        return '\n\n'.join(self.paragraphs)
+
+
+def _essay_parts(name, attrs=None) -> bool:
+    """SoupStrainer filter: keep only <title> and the essay table"""
+    # bs4 passes (name, attrs) while parsing and the Tag when matching; from
+    # 4.13 it passes the name alone, so every table is kept and the content
+    # table is picked out afterwards
+    if hasattr(name, 'attrs'):
+        name, attrs = name.name, name.attrs
+    if name == 'title':
+        return True
+    return name == 'table' and (attrs is None or dict(attrs).get('width') == CONTENT_TABLE_WIDTH)
+
+
+def _paragraphs(raw: str) -> list:
+    """Split text on blank lines and collapse whitespace inside each paragraph"""
+    paragraphs = []
+    for block in _PARAGRAPH_BREAK.split(raw):
+        paragraph = ' '.join(block.split())
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
+def _soup_essay(soup: BeautifulSoup) -> Essay:
+    title_tag = soup.find('title')
+    table = soup.find('table', width=CONTENT_TABLE_WIDTH)
+    if table is None:
+        return None
+    # <br> is the only line/paragraph structure on these pages; every other
+    # tag (links, <font>, <i>) is inline and must not break the text
+    for br in table.find_all('br'):
+        br.replace_with('\n')
+    title = title_tag.get_text().strip() if title_tag else ''
+    return Essay(title, _paragraphs(table.get_text()))
+
+
+def extract_soup(html) -> Essay:
+    """Baseline: full html.parser tree, as the original scraper did"""
+    return _soup_essay(BeautifulSoup(html, 'html.parser'))
+
+
+def extract_strainer(html) -> Essay:
+    """html.parser, but only the title and essay table are built into a tree"""
+    return _soup_essay(BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(_essay_parts)))
+
+
+def extract_lxml(html) -> Essay:
+    """lxml's C parser and XPath; no BeautifulSoup tree at all"""
+    doc = lxml.html.document_fromstring(html)
+    tables = doc.xpath(f'//table[@width="{CONTENT_TABLE_WIDTH}"]')
+    if not tables:
+        return None
+    table = tables[0]
+    for br in table.iter('br'):
+        br.tail = '\n' + (br.tail or '')
+    titles = doc.xpath('//title')
+    title = titles[0].text_content().strip() if titles else ''
+    return Essay(title, _paragraphs(table.text_content()))
+
+
+def extract_text_file(data, url: str) -> Essay:
+    """Plain-text essays (acl1.txt, acl2.txt): first line is the title"""
+    if isinstance(data, bytes):
+        try:
+            data = data.decode('utf-8')
+        except UnicodeDecodeError:
+            data = data.decode('latin-1')
+    paragraphs = _paragraphs(data.replace('\r\n', '\n'))
+    if not paragraphs:
+        return None
+    title = paragraphs[0] if len(paragraphs[0]) < 120 else url.rsplit('/', 1)[-1]
+    return Essay(title, paragraphs)
+
+
+BACKENDS = {
+    'soup': extract_soup,
+    'strainer': extract_strainer,
+}
+if lxml is not None:
+    BACKENDS['lxml'] = extract_lxml
+DEFAULT_BACKEND = 'lxml' if lxml is not None else 'strainer'
+
+
+def extract(html, url: str = '', backend: str = DEFAULT_BACKEND) -> Essay:
+    """Extract title and paragraphs from an essay page.
+
+    html may be str or the raw bytes from the HTML cache; bytes are handed
+    straight to the parser so they are only decoded once. Returns None when
+    the page has no essay table.
+    """
+    if url.endswith('.txt'):
+        return extract_text_file(html, url)
+    return BACKENDS[backend](html)
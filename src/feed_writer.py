@@ -0,0 +1,162 @@
+import glob
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape, quoteattr
+
+from mp3 import format_duration
+
+ITUNES_NS = 'http://www.itunes.com/dtds/podcast-1.0.dtd'
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+DEFAULT_PAGE_SIZE = 50
+
+# Characters that are not allowed anywhere in an XML 1.0 document
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def _text(value) -> str:
+    return escape(_INVALID_XML.sub('', str(value)))
+
+
+def _attr(value) -> str:
+    return quoteattr(_INVALID_XML.sub('', str(value)))
+
+
+class RssWriter:
+    """Write an RSS 2.0 podcast feed to disk one item at a time.
+
+    Only the current item is ever held in memory. The document is written to
+    `<path>.tmp` and renamed into place by close(), so readers never see a
+    half-written feed. Use as a context manager; on error the temporary file
+    is removed and the old feed is left untouched.
+    """
+
+    def __init__(self, path: str, title: str, description: str, link: str, language: str = 'en-us',
+                 author: str = None, links: dict = None, pub_date: str = None):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.author = author
+        self.items = 0
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self._write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self._write(f'<rss version="2.0" xmlns:itunes={_attr(ITUNES_NS)} xmlns:atom={_attr(ATOM_NS)}>\n')
+        self._write('  <channel>\n')
+        self._element('title', title)
+        self._element('description', description)
+        self._element('link', link)
+        self._element('language', language)
+        self._element('pubDate', pub_date or format_datetime(datetime.now(timezone.utc)))
+        # RFC 5005 paging links: self, first, last, previous, next
+        for rel, href in (links or {}).items():
+            self._write(f'    <atom:link rel={_attr(rel)} href={_attr(href)} type="application/rss+xml"/>\n')
+        self._element('itunes:title', title)
+        if author:
+            self._element('itunes:author', author)
+        self._element('itunes:summary', description)
+        self._element('itunes:type', 'episodic')
+        self._element('itunes:explicit', 'no')
+
+    def _write(self, data: str):
+        self._file.write(data)
+
+    def _element(self, name: str, text, indent: int = 4):
+        if text is None:
+            return
+        self._write(f"{' ' * indent}<{name}>{_text(text)}</{name}>\n")
+
+    def add_item(self, title: str, description: str, audio_url: str, pub_date: str = None,
+                 length: int = None, duration: float = None, mime_type: str = 'audio/mpeg'):
+        """Append one episode to the feed"""
+        self._write('    <item>\n')
+        self._element('title', title, 6)
+        self._element('description', description, 6)
+        self._element('pubDate', pub_date, 6)
+        self._element('itunes:title', title, 6)
+        if self.author:
+            self._element('itunes:author', self.author, 6)
+        self._element('itunes:summary', description, 6)
+        self._element('itunes:episodeType', 'full', 6)
+        self._element('itunes:explicit', 'no', 6)
+        if duration:
+            self._element('itunes:duration', format_duration(duration), 6)
+        self._write(f'      <enclosure url={_attr(audio_url)} length={_attr(length or 0)} type={_attr(mime_type)}/>\n')
+        self._write('    </item>\n')
+        self.items += 1
+
+    def close(self):
+        self._write('  </channel>\n</rss>\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> 'RssWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def page_filename(filename: str, page: int) -> str:
+    """feed.xml, feed-page2.xml, feed-page3.xml, ..."""
+    if page == 1:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}-page{page}{ext}"
+
+
+def write_paged_feed(episodes: list, output_dir: str, base_url: str, channel: dict,
+                     page_size: int = DEFAULT_PAGE_SIZE, filename: str = 'feed.xml') -> list:
+    """Write episodes as an RFC 5005 paged feed and return the page paths.
+
+    The first page (`filename`) holds the latest `page_size` episodes, which
+    is all a podcast client has to download on each poll; older episodes are
+    reachable through `next` links to archive pages. A page_size of 0 writes
+    a single complete feed. `episodes` is a sequence of dicts in feed order
+    (newest first) with title, description, audio_url and optionally
+    pub_date, audio_size, duration and mime_type.
+    """
+    total = len(episodes)
+    page_count = max(1, -(-total // page_size)) if page_size else 1
+    per_page = page_size or max(total, 1)
+    paths = []
+    for page in range(1, page_count + 1):
+        links = {'self': base_url + page_filename(filename, page)}
+        if page_count > 1:
+            links['first'] = base_url + filename
+            links['last'] = base_url + page_filename(filename, page_count)
+            if page > 1:
+                links['previous'] = base_url + page_filename(filename, page - 1)
+            if page < page_count:
+                links['next'] = base_url + page_filename(filename, page + 1)
+        path = os.path.join(output_dir, page_filename(filename, page))
+        with RssWriter(path, links=links, **channel) as writer:
+            for episode in episodes[(page - 1) * per_page:page * per_page]:
+                writer.add_item(
+                    title=episode['title'],
+                    description=episode.get('description'),
+                    audio_url=episode['audio_url'],
+                    pub_date=episode.get('pub_date'),
+                    length=episode.get('audio_size'),
+                    duration=episode.get('duration'),
+                    mime_type=episode.get('mime_type', 'audio/mpeg'),
+                )
+        paths.append(path)
+
+    # Drop archive pages left over from a run with more pages
+    stem, ext = os.path.splitext(filename)
+    for stale in glob.glob(os.path.join(output_dir, f"{stem}-page*{ext}")):
+        if stale not in paths:
+            os.remove(stale)
+    return paths
@@ -0,0 +1,148 @@
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+log = logging.getLogger(__name__)
+
+# (connect, read) timeouts in seconds. TTS responses for a 4000 character
+# chunk can take well over a minute, so the read timeout is generous.
+DEFAULT_TIMEOUT = (10, 180)
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+RETRY_STATUSES = {429} | SERVER_ERROR_STATUSES
+DEFAULT_POOL_SIZE = 10
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def _mount_adapter(session: requests.Session, pool_size: int):
+    # pool_maxsize is per host; pool_block caps concurrent connections to a
+    # host at that size instead of opening (and discarding) extra ones.
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+
+def get_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """Return the shared keep-alive session, growing its pool if needed.
+
+    Growing mounts a larger adapter on the same session rather than
+    replacing it: requests in flight on other threads finish on the old
+    adapter's connections, which are dropped once nothing uses them.
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            _mount_adapter(_session, pool_size)
+            _session_pool_size = pool_size
+        return _session
+
+
+def parse_retry_after(value: str) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff for the given 0-based attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def request(method: str, url: str, session: requests.Session = None, max_retries: int = 5,
+            backoff_base: float = 1.0, backoff_max: float = 60.0, timeout=DEFAULT_TIMEOUT,
+            retry_statuses: set = RETRY_STATUSES, **kwargs) -> requests.Response:
+    """Send a request over the shared session, retrying transient failures.
+
+    Connection errors, timeouts and 429/5xx responses are retried with jittered
+    exponential backoff; a Retry-After header overrides the computed delay.
+    The last response is returned once retries are exhausted, so callers still
+    see the final status code. Callers that handle rate limits themselves can
+    narrow retry_statuses.
+    """
+    session = session or get_session()
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, backoff_base, backoff_max)
+            metrics.incr('http_retries')
+            log.debug("%s %s failed (%s), retrying in %.1fs", method, url, e.__class__.__name__, delay)
+            time.sleep(delay)
+            continue
+
+        if response.status_code not in retry_statuses or attempt == max_retries:
+            return response
+
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            delay = backoff_delay(attempt, backoff_base, backoff_max)
+        delay = min(delay, backoff_max)
+        metrics.incr('http_retries')
+        log.debug("%s %s returned %s, retrying in %.1fs", method, url, response.status_code, delay)
+        # Release the connection back to the pool before sleeping
+        response.close()
+        time.sleep(delay)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request('POST', url, **kwargs)
+
+
+def save_response(response: requests.Response, path: str, block_size: int = 64 * 1024) -> int:
+    """Stream a response body to path and atomically move it into place.
+
+    The body is written to a temporary file in block_size pieces, checked
+    against Content-Length, fsynced and renamed, so path only ever holds a
+    complete body. Pass responses requested with stream=True. Returns the
+    number of bytes written.
+    """
+    tmp_path = f"{path}.tmp"
+    # Content-Length counts encoded bytes; iter_content yields decoded ones
+    expected = None if response.headers.get('Content-Encoding') else response.headers.get('Content-Length')
+    written = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            for block in response.iter_content(chunk_size=block_size):
+                f.write(block)
+                written += len(block)
+            f.flush()
+            os.fsync(f.fileno())
+        if expected is not None and written != int(expected):
+            raise IOError(f"Incomplete response body: got {written} of {expected} bytes")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        response.close()
+    return written
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def chunk_map_path(output_path: str) -> str:
+    return f"{output_path}.chunks.json"
+
+
+def load_chunk_map(output_path: str) -> dict:
+    """Chunk map of a published episode, or None if it has none"""
+    try:
+        with open(chunk_map_path(output_path), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _same_voice(recorded: str, voice: str) -> bool:
+    # Records from before voices were tracked were all made with the default voice
+    return recorded is None or voice is None or recorded == voice
+
+
+def text_changed(output_path: str, text: str) -> bool:
+    """True if the episode was published from different text than `text`"""
+    chunk_map = load_chunk_map(output_path)
+    return chunk_map is not None and chunk_map['text_hash'] != _hash(text)
+
+
+class EssayJournal:
+    """Durable per-essay record of chunk synthesis progress.
+
+    Stored as `<output_path>.journal.json` next to the chunk files. Each chunk
+    has its text hash, size, status, attempt count and output path. Reopening
+    the journal for the same chunks keeps every chunk whose file is still on
+    disk, so a rerun only synthesizes what is missing or failed. If the text,
+    chunking or voice changed, the journal starts over.
+
+    Once the episode is stitched, finalize() replaces the journal with a
+    chunk map (`<output_path>.chunks.json`): every chunk's text hash and the
+    byte span of its frames in the episode MP3. A new journal for edited
+    text takes the audio of every unchanged chunk straight out of the
+    published episode, so only the changed chunks are synthesized again.
+    """
+
+    def __init__(self, path: str, data: dict):
+        self.path = path
+        self.data = data
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def journal_path(cls, output_path: str) -> str:
+        return f"{output_path}.journal.json"
+
+    @classmethod
+    def load(cls, output_path: str) -> 'EssayJournal':
+        """Existing journal for output_path, or None"""
+        path = cls.journal_path(output_path)
+        try:
+            with open(path, 'r') as f:
+                return cls(path, json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, output_path: str, url: str, text: str, chunks: list, chunking: str = None,
+             voice: str = None) -> 'EssayJournal':
+        """Resume the journal for these chunks, or start a new one.
+
+        `voice` identifies the voice and model ("<voice id>/<model id>"), so
+        audio in one voice is never resumed or reused for another.
+        """
+        chunk_hashes = [_hash(chunk) for chunk in chunks]
+        journal = cls.load(output_path)
+        if (journal is not None and [c['text_hash'] for c in journal.data['chunks']] == chunk_hashes
+                and _same_voice(journal.data.get('voice'), voice)):
+            for chunk in journal.data['chunks']:
+                if chunk['status'] == DONE and not os.path.exists(chunk['path']):
+                    chunk['status'] = PENDING
+            journal.save()
+            return journal
+
+        data = {
+            'url': url,
+            'output_path': output_path,
+            'text_hash': _hash(text),
+            'chunking': chunking,
+            'voice': voice,
+            'created': time.time(),
+            'chunks': [
+                {
+                    'index': i,
+                    'chars': len(chunk),
+                    'text_hash': chunk_hash,
+                    'status': PENDING,
+                    'attempts': 0,
+                    'path': f"{output_path}.part{i + 1}",
+                    'error': None,
+                }
+                for i, (chunk, chunk_hash) in enumerate(zip(chunks, chunk_hashes))
+            ],
+        }
+        journal = cls(cls.journal_path(output_path), data)
+        journal.reused = journal._reuse_published(output_path)
+        journal.save()
+        return journal
+
+    @classmethod
+    def done_chunks(cls, output_path: str, chunks: list, voice: str = None) -> set:
+        """Indexes of these chunks an existing journal already has audio for; reads only"""
+        journal = cls.load(output_path)
+        if (journal is None or [c['text_hash'] for c in journal.chunks] != [_hash(chunk) for chunk in chunks]
+                or not _same_voice(journal.data.get('voice'), voice)):
+            return set()
+        return {c['index'] for c in journal.chunks if c['status'] == DONE and os.path.exists(c['path'])}
+
+    def _reuse_published(self, output_path: str) -> int:
+        """Mark done every chunk whose audio the published episode already has"""
+        chunk_map = load_chunk_map(output_path)
+        # A map that doesn't match the file on disk is stale; don't trust its spans
+        if chunk_map is None or not os.path.exists(output_path) or os.path.getsize(output_path) != chunk_map['audio_bytes']:
+            return 0
+        if not _same_voice(chunk_map.get('voice'), self.data.get('voice')):
+            return 0
+        spans = {chunk['text_hash']: (chunk['offset'], chunk['length']) for chunk in chunk_map['chunks']}
+        reused = 0
+        with open(output_path, 'rb') as episode:
+            for chunk in self.chunks:
+                span = spans.get(chunk['text_hash'])
+                if span is None:
+                    continue
+                episode.seek(span[0])
+                tmp_path = f"{chunk['path']}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(episode.read(span[1]))
+                os.replace(tmp_path, chunk['path'])
+                chunk['status'] = DONE
+                reused += 1
+        return reused
+
+    def save(self):
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f, indent=1)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    @property
+    def chunks(self) -> list:
+        return self.data['chunks']
+
+    def pending(self) -> list:
+        """Indexes of chunks that still need audio"""
+        return [chunk['index'] for chunk in self.chunks if chunk['status'] != DONE]
+
+    def chunk_path(self, index: int) -> str:
+        return self.chunks[index]['path']
+
+    def start(self, index: int):
+        with self._lock:
+            self.chunks[index]['attempts'] += 1
+        self.save()
+
+    def mark_done(self, index: int):
+        with self._lock:
+            self.chunks[index]['status'] = DONE
+            self.chunks[index]['error'] = None
+        self.save()
+
+    def mark_failed(self, index: int, error: str = None):
+        with self._lock:
+            self.chunks[index]['status'] = FAILED
+            self.chunks[index]['error'] = error
+        self.save()
+
+    @property
+    def complete(self) -> bool:
+        return all(chunk['status'] == DONE for chunk in self.chunks)
+
+    def paths(self) -> list:
+        """Chunk files in reading order"""
+        return [chunk['path'] for chunk in self.chunks]
+
+    def finalize(self, output_path: str, spans: list):
+        """Replace the journal with the chunk map of the episode just stitched from it"""
+        data = {
+            'url': self.data['url'],
+            'text_hash': self.data['text_hash'],
+            'chunking': self.data.get('chunking'),
+            'voice': self.data.get('voice'),
+            'audio_bytes': os.path.getsize(output_path),
+            'chunks': [
+                {'text_hash': chunk['text_hash'], 'chars': chunk['chars'], 'offset': offset, 'length': length}
+                for chunk, (offset, length) in zip(self.chunks, spans)
+            ],
+        }
+        path = chunk_map_path(output_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, path)
+        self.discard()
+
+    def discard(self):
+        """Remove the journal once the episode has been finalized"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,264 @@
+import logging
+import os
+import random
+import threading
+import time
+
+import http_pool
+
+SUBSCRIPTION_URL = os.getenv('ELEVENLABS_API_BASE', "https://api.elevenlabs.io") + "/v1/user/subscription"
+DEFAULT_CONCURRENCY = 5
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill(now)
+        # A request larger than the bucket can only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class BudgetExhausted(RuntimeError):
+    """The run's character or request budget cannot cover another request"""
+
+
+class RunBudget:
+    """Hard cap on the characters and requests one run may send, across all keys.
+
+    Characters are reserved when a key is acquired and handed back if the
+    request is not billed (any non-200 outcome); requests count every
+    attempt. None means no limit.
+    """
+
+    def __init__(self, max_chars: int = None, max_requests: int = None):
+        self.max_chars = max_chars
+        self.max_requests = max_requests
+        self.chars = 0
+        self.requests = 0
+
+    def allows(self, chars: int) -> bool:
+        return ((self.max_chars is None or self.chars + chars <= self.max_chars)
+                and (self.max_requests is None or self.requests < self.max_requests))
+
+    @property
+    def exhausted(self) -> bool:
+        return not self.allows(1)
+
+    @property
+    def remaining_chars(self) -> int:
+        return None if self.max_chars is None else max(0, self.max_chars - self.chars)
+
+    @property
+    def remaining_requests(self) -> int:
+        return None if self.max_requests is None else max(0, self.max_requests - self.requests)
+
+
+class KeyState:
+    """Scheduling state for one API key"""
+
+    def __init__(self, api_key: str, max_concurrency: int, requests_per_minute: float = None,
+                 chars_per_minute: float = None):
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        # Concurrency limit shrinks on 429s and grows back on success (AIMD)
+        self.concurrency_limit = max_concurrency
+        self.in_flight = 0
+        self.request_bucket = TokenBucket(requests_per_minute / 60, requests_per_minute) if requests_per_minute else None
+        self.char_bucket = TokenBucket(chars_per_minute / 60, chars_per_minute) if chars_per_minute else None
+        self.remaining_chars = None  # unknown until refresh_quota()
+        self.backoff_until = 0.0
+        self.consecutive_failures = 0
+        self.disabled = False
+        self.requests = 0
+        self.chars_sent = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def label(self) -> str:
+        return f"{self.api_key[:5]}...{self.api_key[-5:]}"
+
+    def has_quota(self, chars: int) -> bool:
+        return self.remaining_chars is None or self.remaining_chars >= chars
+
+    def wait_time(self, chars: int, now: float) -> float:
+        """Seconds until this key could take a chunk of `chars`, None if never"""
+        if self.disabled or not self.has_quota(chars):
+            return None
+        waits = [self.backoff_until - now]
+        if self.request_bucket:
+            waits.append(self.request_bucket.wait_time(1, now))
+        if self.char_bucket:
+            waits.append(self.char_bucket.wait_time(chars, now))
+        return max(0.0, *waits)
+
+    def headroom(self) -> tuple:
+        """Sort key: prefer keys with the most free slots, then the most quota,
+        then the least used so far"""
+        free_slots = self.concurrency_limit - self.in_flight
+        quota = float('inf') if self.remaining_chars is None else self.remaining_chars
+        return (free_slots / self.concurrency_limit, quota, -self.chars_sent)
+
+
+class KeyScheduler:
+    """Routes TTS requests across several API keys.
+
+    Each key has its own concurrency cap, optional request and character
+    token buckets, and tracked remaining character quota. Keys that return
+    429 are backed off with jittered exponential delay and have their
+    concurrency limit halved; keys that run out of quota or are rejected stop
+    receiving work. acquire() blocks until some key has headroom and always
+    picks the one with the most. An optional RunBudget caps what the whole
+    run may send; acquire() raises BudgetExhausted rather than exceed it.
+    """
+
+    def __init__(self, api_keys: list, max_concurrency: int = DEFAULT_CONCURRENCY,
+                 requests_per_minute: float = None, chars_per_minute: float = None):
+        if not api_keys:
+            raise ValueError("No API keys provided")
+        self.keys = [KeyState(key, max_concurrency, requests_per_minute, chars_per_minute) for key in api_keys]
+        self.budget = None
+        self._cond = threading.Condition()
+
+    @property
+    def total_concurrency(self) -> int:
+        """Upper bound on useful worker threads across all keys"""
+        return sum(state.max_concurrency for state in self.keys if not state.disabled)
+
+    def refresh_quota(self):
+        """Fetch remaining character quota for every key"""
+        for state in self.keys:
+            try:
+                response = http_pool.get(SUBSCRIPTION_URL, headers={"xi-api-key": state.api_key})
+            except Exception as e:
+                log.warning("Could not fetch quota for key %s: %s", state.label, e)
+                continue
+            if response.status_code == 200:
+                data = response.json()
+                remaining = data.get('character_limit', 0) - data.get('character_count', 0)
+                with self._cond:
+                    state.remaining_chars = max(0, remaining)
+                log.info("Key %s: %d characters remaining", state.label, state.remaining_chars)
+            elif response.status_code == 401:
+                with self._cond:
+                    state.disabled = True
+                log.warning("Key %s was rejected (%s), disabling it", state.label, response.status_code)
+            else:
+                log.warning("Could not fetch quota for key %s: %s", state.label, response.status_code)
+
+    def remaining_quota(self) -> int:
+        """Total remaining characters across keys, None if any key is unknown"""
+        total = 0
+        for state in self.keys:
+            if state.disabled:
+                continue
+            if state.remaining_chars is None:
+                return None
+            total += state.remaining_chars
+        return total
+
+    def acquire(self, chars: int) -> KeyState:
+        """Block until a key can take a chunk of `chars` characters and reserve it"""
+        with self._cond:
+            while True:
+                if self.budget is not None and not self.budget.allows(chars):
+                    raise BudgetExhausted(f"Run budget cannot cover a {chars} character chunk")
+                now = time.monotonic()
+                ready = []
+                next_wait = None
+                for state in self.keys:
+                    wait = state.wait_time(chars, now)
+                    if wait is None:
+                        continue
+                    if wait == 0 and state.in_flight < state.concurrency_limit:
+                        ready.append(state)
+                    elif wait > 0:
+                        next_wait = wait if next_wait is None else min(next_wait, wait)
+                    else:
+                        # Only blocked on a concurrency slot; release() will notify
+                        next_wait = next_wait if next_wait is not None else 1.0
+                if ready:
+                    state = max(ready, key=KeyState.headroom)
+                    state.in_flight += 1
+                    if state.request_bucket:
+                        state.request_bucket.take(1)
+                    if state.char_bucket:
+                        state.char_bucket.take(chars)
+                    state.requests += 1
+                    if self.budget is not None:
+                        self.budget.chars += chars
+                        self.budget.requests += 1
+                    return state
+                if next_wait is None:
+                    raise RuntimeError(f"No API key has enough quota left for a {chars} character chunk")
+                self._cond.wait(next_wait)
+
+    def release(self, state: KeyState, chars: int, status_code: int = None, retry_after: float = None,
+                error_text: str = '', elapsed: float = 0.0):
+        """Return a key after a request and adapt its limits to the outcome.
+
+        status_code is None when the request failed without a response. A 200
+        counts against the budget and the key's quota even if reading the audio
+        then failed, since the characters were billed.
+        """
+        with self._cond:
+            state.in_flight -= 1
+            state.busy_seconds += elapsed
+            if self.budget is not None and status_code != 200:
+                self.budget.chars -= chars
+            if status_code == 200:
+                state.chars_sent += chars
+                state.consecutive_failures = 0
+                if state.remaining_chars is not None:
+                    state.remaining_chars = max(0, state.remaining_chars - chars)
+                if state.concurrency_limit < state.max_concurrency:
+                    state.concurrency_limit += 1
+            elif status_code == 429 or 'quota_exceeded' in error_text:
+                if 'quota_exceeded' in error_text:
+                    log.warning("Key %s is out of quota, routing work to other keys", state.label)
+                    state.remaining_chars = 0
+                else:
+                    state.rate_limited += 1
+                    state.consecutive_failures += 1
+                    state.concurrency_limit = max(1, state.concurrency_limit // 2)
+                    delay = random.uniform(0, min(60.0, 2 ** state.consecutive_failures))
+                    if retry_after is not None:
+                        delay = max(delay, retry_after)
+                    state.backoff_until = time.monotonic() + delay
+            elif status_code == 401:
+                log.warning("Key %s was rejected, disabling it", state.label)
+                state.disabled = True
+            else:
+                state.errors += 1
+                state.consecutive_failures += 1
+                state.backoff_until = time.monotonic() + random.uniform(0, min(60.0, 2 ** state.consecutive_failures))
+            self._cond.notify_all()
+
+    def print_stats(self):
+        for state in self.keys:
+            status = 'disabled' if state.disabled else f"limit {state.concurrency_limit}/{state.max_concurrency}"
+            quota = 'unknown' if state.remaining_chars is None else state.remaining_chars
+            print(f"Key {state.label}: {state.requests} requests, {state.chars_sent} chars, "
+                  f"{state.rate_limited} rate limited, {state.errors} errors, "
+                  f"{state.busy_seconds:.0f}s busy, quota left {quota}, {status}")
@@ -1,52 +1,33 @@
 import argparse
 import os
 import json
-from datetime import datetime
-from blog_reader import BlogReader
-from text_to_speech import TextToSpeech
+import logging
+from email.utils import parsedate_to_datetime
+from engine import Engine
 from podcast_generator import PodcastGenerator
 
-def process_blog_post(url: str, title: str, output_dir: str, voice: str, podcast: PodcastGenerator):
+def add_episodes(engine: Engine, blog_posts: list, podcast: PodcastGenerator) -> int:
     """
-    Process a single blog post and add it to the podcast feed.
+    Add every recorded episode of the given blog posts to the podcast feed.
     """
-    print(f"\nProcessing blog post: {title}")
-    print(f"URL: {url}")
-    
-    # Initialize components
-    blog_reader = BlogReader()
-    tts = TextToSpeech()
-    
-    # Fetch and process blog content
-    print(f"Fetching content from {url}...")
-    content = blog_reader.fetch_content(url)
-    if not content:
-        print(f"Failed to fetch blog content for {title}")
-        return False
-    
-    print(f"Successfully fetched content, length: {len(content)} characters")
-    
-    # Clean the text
-    content = blog_reader.clean_text(content)
-    
-    # Generate audio file
-    audio_path = os.path.join(output_dir, f"{title.lower().replace(' ', '_')}.mp3")
-    print(f"Generating audio for {title}...")
-    if not tts.generate_audio(content, audio_path, voice):
-        print(f"Failed to generate audio for {title}")
-        return False
-    
-    print(f"Successfully generated audio at: {audio_path}")
-    
-    # Add the episode to the podcast feed
-    podcast.add_episode(
-        title=title,
-        description=f"Audio version of: {title}",
-        audio_url=audio_path,
-        pub_date=datetime.utcnow()
-    )
-    
-    return True
+    titles = {post['url']: post.get('title') for post in blog_posts}
+    added = 0
+    # add_episode puts each episode at the top of the feed, so go oldest first
+    for episode in reversed(engine.manifest.feed_entries()):
+        if episode.get('url') not in titles:
+            continue
+        audio_path = os.path.join(engine.output_dir, episode['audio_file'])
+        podcast.add_episode(
+            title=titles[episode['url']] or episode['title'],
+            description=episode['description'],
+            audio_url=audio_path,
+            pub_date=parsedate_to_datetime(episode['pub_date']),
+            audio_path=audio_path,
+            length=episode.get('audio_size'),
+            duration=episode.get('duration')
+        )
+        added += 1
+    return added
 
 def main():
     parser = argparse.ArgumentParser(description='Convert blog posts to podcast episodes')
@@ -56,8 +37,10 @@ def main():
     parser.add_argument('--podcast-title', default='Blog to Podcast', help='Title of the podcast')
     parser.add_argument('--podcast-description', default='Converted blog posts to audio', help='Description of the podcast')
     parser.add_argument('--website-url', default='https://example.com', help='Website URL for the podcast')
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging verbosity')
     
     args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s')
     
     print(f"Starting script with input file: {args.input_file}")
     
@@ -87,25 +70,27 @@ def main():
         website_url=args.website_url
     )
     
-    # Process each blog post
-    successful_posts = 0
+    # Keys, connection pool, caches and worker pool are set up once for every post
+    engine = Engine.from_env(voice=args.voice, catalog_path=args.input_file, output_dir=args.output_dir)
+    
+    # Every post goes through the same pipelined run: fetch, chunk, synthesize and assemble overlap
     for post in blog_posts:
-        url = post.get('url')
-        title = post.get('title')
-        
-        if not url or not title:
+        if not post.get('url'):
             print(f"Skipping invalid blog post entry: {post}")
-            continue
-        
-        if process_blog_post(url, title, args.output_dir, args.voice, podcast):
-            successful_posts += 1
+    blog_posts = [post for post in blog_posts if post.get('url')]
+    try:
+        new_episodes = engine.run_backlog([post['url'] for post in blog_posts])
+        engine.print_stats()
+    finally:
+        engine.close()
+    print(f"Generated {len(new_episodes)} new episodes")
     
-    if successful_posts > 0:
+    if add_episodes(engine, blog_posts, podcast) > 0:
         # Save the feed
         feed_path = os.path.join(args.output_dir, "feed.xml")
         if podcast.generate_feed(feed_path):
             print(f"Successfully generated podcast feed at {feed_path}")
-            print(f"Processed {successful_posts} out of {len(blog_posts)} blog posts")
+            print(f"{len(podcast.episodes)} out of {len(blog_posts)} blog posts have episodes")
         else:
             print("Failed to generate podcast feed")
     else:
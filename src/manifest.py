@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from feed_writer import page_filename
+from mp3 import inspect
+
+AUDIO_BASE_URL = "https://raw.githubusercontent.com/victorlazarte/pgpod/main/output/"
+DEFAULT_MANIFEST_PATH = os.path.join('output', 'episodes.json')
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _pub_timestamp(episode: dict) -> float:
+    """Seconds since the epoch of an episode's pub_date; undated episodes sort as oldest"""
+    try:
+        published = parsedate_to_datetime(episode['pub_date'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    if published.tzinfo is None:
+        published = published.replace(tzinfo=timezone.utc)
+    return published.timestamp()
+
+
+class EpisodeManifest:
+    """Persistent record of every produced episode.
+
+    Written when an episode's audio is finalized, so the feed (and anything
+    else that lists episodes) can be rebuilt offline. pub_date is set once,
+    when the episode is first recorded, and never changes afterwards.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.episodes = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.episodes = {episode['audio_file']: episode for episode in data.get('episodes', [])}
+
+    def __contains__(self, audio_file: str) -> bool:
+        return audio_file in self.episodes
+
+    def get(self, audio_file: str) -> dict:
+        return self.episodes.get(audio_file)
+
+    def record(self, url: str, title: str, text: str, audio_path: str, pub_date: str = None,
+               description: str = None) -> dict:
+        """Add or update the episode for audio_path and save the manifest"""
+        audio_file = os.path.basename(audio_path)
+        info = inspect(audio_path)
+        with self._lock:
+            previous = self.episodes.get(audio_file, {})
+            if description is None:
+                description = text[:500] + '...' if len(text) > 500 else text
+            episode = {
+                'title': title,
+                'url': url,
+                'audio_file': audio_file,
+                'audio_url': AUDIO_BASE_URL + audio_file,
+                'audio_size': info['bytes'],
+                'duration': round(info['duration'], 3),
+                'bitrate': info['bitrate'],
+                'text_hash': text_hash(text) if text else previous.get('text_hash'),
+                'description': description,
+                'pub_date': previous.get('pub_date') or pub_date or format_datetime(datetime.now(timezone.utc)),
+            }
+            self.episodes[audio_file] = episode
+            self._save()
+        return episode
+
+    def remove(self, audio_file: str):
+        with self._lock:
+            if self.episodes.pop(audio_file, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'episodes': list(self.episodes.values())}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def feed_entries(self) -> list:
+        """Episodes in feed order: newest pub_date first, later recordings first on ties"""
+        with self._lock:
+            episodes = list(self.episodes.values())
+        order = sorted(range(len(episodes)), key=lambda i: (_pub_timestamp(episodes[i]), i), reverse=True)
+        return [episodes[i] for i in order]
+
+    def import_feed(self, feed_path: str, output_dir: str = 'output', urls: dict = None) -> int:
+        """Seed the manifest from an existing RSS feed, keeping its pub dates.
+
+        Archive pages (feed-page2.xml, ...) are read after the first page.
+        Only items whose audio exists in output_dir are imported; `urls` maps
+        audio file names to essay URLs. Returns the number of episodes added.
+        """
+        feed_dir, filename = os.path.split(feed_path)
+        added = 0
+        page = 1
+        while os.path.exists(os.path.join(feed_dir, page_filename(filename, page))):
+            added += self._import_page(os.path.join(feed_dir, page_filename(filename, page)), output_dir, urls)
+            page += 1
+        return added
+
+    def _import_page(self, page_path: str, output_dir: str, urls: dict) -> int:
+        added = 0
+        for item in ET.parse(page_path).getroot().iter('item'):
+            enclosure = item.find('enclosure')
+            if enclosure is None:
+                continue
+            audio_file = os.path.basename(enclosure.get('url', ''))
+            audio_path = os.path.join(output_dir, audio_file)
+            if audio_file in self.episodes or not os.path.exists(audio_path):
+                continue
+            self.record(
+                url=(urls or {}).get(audio_file),
+                title=(item.findtext('title') or '').strip(),
+                text=None,
+                audio_path=audio_path,
+                pub_date=(item.findtext('pubDate') or '').strip() or None,
+                description=item.findtext('description') or '',
+            )
+            added += 1
+        return added
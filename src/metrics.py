@@ -0,0 +1,184 @@
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Pipeline stages timed by the run, in order
+STAGES = ('fetch', 'extract', 'normalize', 'chunk', 'synthesize', 'stitch', 'render', 'feed', 'site')
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram, as Prometheus exposes them"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class Metrics:
+    """Counters, per-stage timers and per-key latency histograms for one run.
+
+    Safe to update from any thread. Stage timers accumulate wall time and
+    call counts; counters are plain totals (characters sent, bytes received,
+    retries, cache hits, ...). A snapshot can be appended to a JSON-lines run
+    report or written as a Prometheus textfile for node_exporter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = {}
+            self.stages = {}
+            self.key_latency = {}
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {'calls': 0, 'seconds': 0.0, 'max': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def observe_key_latency(self, key: str, seconds: float):
+        with self._lock:
+            self.key_latency.setdefault(key, Histogram()).observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed': time.time() - self.started,
+                'stages': {stage: dict(entry) for stage, entry in self.stages.items()},
+                'counters': dict(self.counters),
+                'key_latency': {key: hist.to_dict() for key, hist in self.key_latency.items()},
+            }
+
+    def write_report(self, path: str, **extra) -> dict:
+        """Append this run's snapshot (plus `extra` fields) as one JSON line"""
+        report = dict(self.snapshot(), **extra)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(json.dumps(report, sort_keys=True) + '\n')
+        return report
+
+    def write_prometheus(self, path: str, prefix: str = 'pgpod'):
+        """Write the snapshot in the Prometheus text exposition format, atomically"""
+        s = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_run_start_time_seconds Unix time the run started",
+            f"# TYPE {prefix}_run_start_time_seconds gauge",
+            f"{prefix}_run_start_time_seconds {s['started']:.3f}",
+            f"# HELP {prefix}_stage_seconds_total Wall time spent in each pipeline stage",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        for stage, entry in sorted(s['stages'].items()):
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{_label(stage)}"}} {entry["seconds"]:.6f}')
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Times each pipeline stage ran",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        for stage, entry in sorted(s['stages'].items()):
+            lines.append(f'{prefix}_stage_calls_total{{stage="{_label(stage)}"}} {entry["calls"]}')
+        for name, value in sorted(s['counters'].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        if s['key_latency']:
+            metric = f"{prefix}_key_request_seconds"
+            lines += [f"# HELP {metric} TTS request latency per API key", f"# TYPE {metric} histogram"]
+            for key, hist in sorted(s['key_latency'].items()):
+                cumulative = 0
+                for bound, count in hist['buckets'].items():
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{key="{_label(key)}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{key="{_label(key)}"}} {hist["sum"]:.6f}')
+                lines.append(f'{metric}_count{{key="{_label(key)}"}} {hist["count"]}')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        s = self.snapshot()
+        stages = ', '.join(
+            f"{stage} {s['stages'][stage]['seconds']:.1f}s/{s['stages'][stage]['calls']}"
+            for stage in STAGES if stage in s['stages']
+        )
+        print(f"Stages: {stages or 'none'}")
+        if s['counters']:
+            print("Counters: " + ', '.join(f"{name} {value}" for name, value in sorted(s['counters'].items())))
+        for key, hist in sorted(s['key_latency'].items()):
+            print(f"Key {key}: {hist['count']} requests, mean {hist['sum'] / hist['count']:.2f}s, "
+                  f"p50 <= {hist['p50']}s, p95 <= {hist['p95']}s, p99 <= {hist['p99']}s")
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process-wide registry, shared like http_pool's session
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def incr(name: str, value: float = 1):
+    _metrics.incr(name, value)
+
+
+def timer(stage: str):
+    return _metrics.timer(stage)
+
+
+def observe_key_latency(key: str, seconds: float):
+    _metrics.observe_key_latency(key, seconds)
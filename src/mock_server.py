@@ -0,0 +1,284 @@
+"""Local stand-in for the ElevenLabs API, for benchmarks and dry runs.
+
+Serves
+  POST /v1/text-to-speech/{voice_id}  silent but valid MP3, duration proportional to the text
+  GET  /v1/user/subscription          per-key character quota
+  GET  /v1/voices                     a few of the premade voices
+  GET  /essays/{n}.html               synthetic pages shaped like paulgraham.com essays
+
+with configurable latency, injected 429s and 5xx errors, per-key quotas and
+per-key concurrency limits. Point the pipeline at it with
+
+    python3 src/mock_server.py --port 8765 --latency-ms 800 --rate-429 0.05
+    ELEVENLABS_API_BASE=http://127.0.0.1:8765 python3 src/blog_reader.py --generate-audio
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# MPEG-1 Layer III, 64 kbps, 44.1 kHz, mono, no CRC: 208-byte frames of 1152
+# samples. An all-zero body is a valid frame that decodes to silence.
+FRAME_HEADER = b'\xff\xfb\x50\xc4'
+FRAME_LENGTH = 208
+FRAME_SECONDS = 1152 / 44100
+SILENT_FRAME = FRAME_HEADER + bytes(FRAME_LENGTH - len(FRAME_HEADER))
+# Roughly how fast a narrator reads
+CHARS_PER_SECOND = 15
+
+VOICES = {
+    'Rachel': '21m00Tcm4TlvDq8ikWAM',
+    'Domi': 'AZnzlk1XvdvUeBnXmlld',
+    'Antoni': 'ErXwobaYiN019PkySvjV',
+    'Josh': 'TxGEqnHWrfWFTfGW9XjX',
+    'Adam': 'pNInz6obpgDQGcFmaJgB',
+}
+_TTS_PATH = re.compile(r'^/v1/text-to-speech/[^/?]+')
+_ESSAY_PATH = re.compile(r'^/essays/(\d+)\.html$')
+_WORDS = (
+    'the startup founders work on something users want and most people think that a good idea '
+    'is hard to find but in practice you notice problems by living in the future then you build '
+    'what is missing which is why the best ideas often seem like bad ideas at first'
+).split()
+
+
+def silent_mp3(chars: int) -> bytes:
+    """Valid MP3 audio lasting about as long as `chars` characters take to read"""
+    frames = max(1, round(chars / CHARS_PER_SECOND / FRAME_SECONDS))
+    return SILENT_FRAME * frames
+
+
+def essay_html(number: int, chars: int) -> str:
+    """Deterministic essay page of roughly `chars` characters"""
+    rng = random.Random(number)
+    paragraphs = []
+    length = 0
+    while length < chars:
+        sentences = []
+        for _ in range(rng.randint(3, 7)):
+            words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 24))]
+            sentences.append(' '.join(words).capitalize() + '.')
+        paragraph = ' '.join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    body = '<br><br>'.join(paragraphs)
+    return (f'<html><head><title>Essay {number}</title></head><body>'
+            f'<table width="435"><tr><td><font size="2" face="verdana">{body}</font></td></tr></table>'
+            f'</body></html>')
+
+
+class MockElevenLabs:
+    """Threaded HTTP server imitating the parts of the API the pipeline uses.
+
+    Latency per request is `latency_ms` (fixed, uniform in [0, 2x] or
+    lognormal around it) plus `ms_per_char` for every character. Each key may
+    have at most `max_concurrent` requests in flight (more get a 429 like the
+    real API) and `quota_chars` characters in total (then a 401
+    quota_exceeded). Every request is logged for stats().
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 500.0,
+                 latency_dist: str = 'lognormal', ms_per_char: float = 0.0, rate_429: float = 0.0,
+                 rate_5xx: float = 0.0, quota_chars: int = None, max_concurrent: int = None,
+                 essay_chars: int = 20000, seed: int = None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.ms_per_char = ms_per_char
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.quota_chars = quota_chars
+        self.max_concurrent = max_concurrent
+        self.essay_chars = essay_chars
+        self.random = random.Random(seed)
+        self.keys = {}
+        self.log = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock = self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def essay_url(self, number: int) -> str:
+        return f"{self.base_url}/essays/{number}.html"
+
+    def start(self) -> 'MockElevenLabs':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'MockElevenLabs':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _key(self, api_key: str) -> dict:
+        return self.keys.setdefault(api_key, {'in_flight': 0, 'chars_used': 0, 'requests': 0, 'statuses': {}})
+
+    def latency(self, chars: int) -> float:
+        """Seconds to spend on a request for `chars` characters"""
+        with self._lock:
+            if self.latency_dist == 'fixed':
+                base = self.latency_ms
+            elif self.latency_dist == 'uniform':
+                base = self.random.uniform(0, 2 * self.latency_ms)
+            else:
+                # sigma 0.5 gives the long right tail real TTS latencies have
+                base = self.random.lognormvariate(0, 0.5) * self.latency_ms / 1.133
+            return (base + chars * self.ms_per_char) / 1000
+
+    def admit(self, api_key: str, chars: int):
+        """Decide a request's fate up front: (status, error body) or (200, None)"""
+        with self._lock:
+            key = self._key(api_key)
+            key['requests'] += 1
+            if self.quota_chars is not None and key['chars_used'] + chars > self.quota_chars:
+                return 401, {'detail': {'status': 'quota_exceeded', 'message': 'This request exceeds your quota.'}}
+            if self.max_concurrent is not None and key['in_flight'] >= self.max_concurrent:
+                return 429, {'detail': {'status': 'too_many_concurrent_requests', 'message': 'Too many concurrent requests.'}}
+            roll = self.random.random()
+            if roll < self.rate_429:
+                return 429, {'detail': {'status': 'too_many_requests', 'message': 'Rate limited.'}}
+            if roll < self.rate_429 + self.rate_5xx:
+                return self.random.choice((500, 502, 503)), {'detail': {'status': 'server_error'}}
+            key['in_flight'] += 1
+            key['chars_used'] += chars
+            return 200, None
+
+    def finish(self, api_key: str, chars: int, status: int, started: float, admitted: bool):
+        with self._lock:
+            key = self._key(api_key)
+            if admitted:
+                key['in_flight'] -= 1
+            key['statuses'][status] = key['statuses'].get(status, 0) + 1
+            self.log.append((api_key, chars, status, time.monotonic() - started))
+
+    def stats(self) -> dict:
+        """Request counts, status mix and latency percentiles (seconds) per key and overall"""
+        with self._lock:
+            log = list(self.log)
+            keys = {api_key: dict(key, statuses=dict(key['statuses'])) for api_key, key in self.keys.items()}
+        latencies = sorted(elapsed for _, _, status, elapsed in log if status == 200)
+        statuses = {}
+        for _, _, status, _ in log:
+            statuses[status] = statuses.get(status, 0) + 1
+        return {
+            'requests': len(log),
+            'statuses': statuses,
+            'chars': sum(chars for _, chars, status, _ in log if status == 200),
+            'latency': percentiles(latencies),
+            'keys': keys,
+        }
+
+
+def percentiles(values: list) -> dict:
+    """p50/p95/p99 and max of a list of numbers"""
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    if len(values) == 1:
+        return {'p50': values[0], 'p95': values[0], 'p99': values[0], 'max': values[0]}
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98], 'max': max(values)}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict, headers: dict = None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        mock = self.server.mock
+        match = _ESSAY_PATH.match(self.path)
+        if match:
+            self._send(200, essay_html(int(match.group(1)), mock.essay_chars).encode('utf-8'), 'text/html')
+        elif self.path.startswith('/v1/user/subscription'):
+            api_key = self.headers.get('xi-api-key', '')
+            with mock._lock:
+                used = mock._key(api_key)['chars_used']
+            limit = mock.quota_chars if mock.quota_chars is not None else 10 ** 9
+            self._send_json(200, {'character_count': used, 'character_limit': limit})
+        elif self.path.startswith('/v1/voices'):
+            self._send_json(200, {'voices': [{'voice_id': voice_id, 'name': name} for name, voice_id in VOICES.items()]})
+        else:
+            self._send_json(404, {'detail': 'not found'})
+
+    def do_POST(self):
+        mock = self.server.mock
+        started = time.monotonic()
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not _TTS_PATH.match(self.path):
+            self._send_json(404, {'detail': 'not found'})
+            return
+        api_key = self.headers.get('xi-api-key', '')
+        try:
+            text = json.loads(body)['text']
+        except (ValueError, KeyError):
+            self._send_json(422, {'detail': 'text is required'})
+            return
+        status, error = mock.admit(api_key, len(text))
+        try:
+            if error is not None:
+                # Errors come back fast, as they do from the real API
+                time.sleep(mock.latency(0) / 10)
+                headers = {'Retry-After': '1'} if status == 429 else None
+                self._send_json(status, error, headers)
+            else:
+                time.sleep(mock.latency(len(text)))
+                self._send(200, silent_mp3(len(text)), 'audio/mpeg')
+        finally:
+            mock.finish(api_key, len(text), status, started, error is None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a local stand-in for the ElevenLabs API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=500.0, help='Mean latency per request')
+    parser.add_argument('--latency-dist', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--ms-per-char', type=float, default=0.0, help='Extra latency per character')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help='Fraction of requests answered with a 5xx')
+    parser.add_argument('--quota-chars', type=int, help='Character quota per key')
+    parser.add_argument('--max-concurrent', type=int, help='Concurrent requests allowed per key')
+    parser.add_argument('--essay-chars', type=int, default=20000, help='Length of synthetic essay pages')
+    args = parser.parse_args()
+
+    mock = MockElevenLabs(args.host, args.port, args.latency_ms, args.latency_dist, args.ms_per_char,
+                          args.rate_429, args.rate_5xx, args.quota_chars, args.max_concurrent, args.essay_chars)
+    print(f"Mock ElevenLabs API listening on {mock.base_url}")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(mock.stats(), indent=2))
@@ -0,0 +1,339 @@
+import os
+import struct
+from array import array
+from typing import NamedTuple
+
+# Bitrates in kbps indexed by [version_is_mpeg1][layer][bitrate_index]
+_BITRATES = {
+    True: {
+        1: [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+        2: [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+        3: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    },
+    False: {
+        1: [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+        2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+        3: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    },
+}
+# Sample rates indexed by version bits (0 = MPEG2.5, 2 = MPEG2, 3 = MPEG1)
+_SAMPLE_RATES = {
+    0: [11025, 12000, 8000],
+    2: [22050, 24000, 16000],
+    3: [44100, 48000, 32000],
+}
+_XING_FLAGS_FRAMES = 0x1
+_XING_FLAGS_BYTES = 0x2
+_XING_FLAGS_TOC = 0x4
+_READ_SIZE = 1024 * 1024
+
+
+class FrameHeader(NamedTuple):
+    version_bits: int
+    layer: int
+    bitrate: int
+    sample_rate: int
+    padding: int
+    channel_mode: int
+    frame_length: int
+
+    @property
+    def mpeg1(self) -> bool:
+        return self.version_bits == 3
+
+    @property
+    def samples(self) -> int:
+        """Number of PCM samples per channel encoded in this frame"""
+        if self.layer == 1:
+            return 384
+        if self.layer == 3 and not self.mpeg1:
+            return 576
+        return 1152
+
+    @property
+    def side_info_length(self) -> int:
+        """Bytes between the header and a Xing/Info tag in a Layer III frame"""
+        mono = self.channel_mode == 3
+        if self.mpeg1:
+            return 17 if mono else 32
+        return 9 if mono else 17
+
+    def same_stream(self, other: 'FrameHeader') -> bool:
+        return (self.version_bits, self.layer, self.sample_rate, self.channel_mode == 3) == \
+            (other.version_bits, other.layer, other.sample_rate, other.channel_mode == 3)
+
+
+def parse_frame_header(data: bytes, offset: int = 0) -> FrameHeader:
+    """Decode the 4-byte frame header at offset, or return None if invalid"""
+    if len(data) < offset + 4:
+        return None
+    b1, b2, b3, b4 = data[offset], data[offset + 1], data[offset + 2], data[offset + 3]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b2 >> 3) & 0x3
+    layer_bits = (b2 >> 1) & 0x3
+    bitrate_index = (b3 >> 4) & 0xF
+    sample_rate_index = (b3 >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    layer = 4 - layer_bits
+    mpeg1 = version_bits == 3
+    bitrate = _BITRATES[mpeg1][layer][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b3 >> 1) & 0x1
+    if layer == 1:
+        frame_length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and not mpeg1:
+        frame_length = 72 * bitrate // sample_rate + padding
+    else:
+        frame_length = 144 * bitrate // sample_rate + padding
+    return FrameHeader(version_bits, layer, bitrate, sample_rate, padding, (b4 >> 6) & 0x3, frame_length)
+
+
+def id3v2_length(data: bytes) -> int:
+    """Return the total size of an ID3v2 tag at the start of data, else 0"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def is_vbr_header_frame(header: FrameHeader, frame: bytes) -> bool:
+    """True if the frame carries a Xing/Info or VBRI tag instead of audio"""
+    tag_offset = 4 + header.side_info_length
+    if frame[tag_offset:tag_offset + 4] in (b'Xing', b'Info'):
+        return True
+    return frame[36:40] == b'VBRI'
+
+
+def iter_frames(path: str, include_vbr_header: bool = False):
+    """Yield (FrameHeader, frame_bytes) for every audio frame in an MP3 file.
+
+    ID3v2/ID3v1/APE tags and any junk between frames are skipped; the
+    Xing/Info/VBRI frame is skipped unless include_vbr_header is set. Only
+    one read buffer is held at a time, so memory stays flat regardless of
+    file size.
+    """
+    with open(path, 'rb') as f:
+        buf = f.read(_READ_SIZE)
+        pos = id3v2_length(buf)
+        while pos > len(buf):
+            pos -= len(buf)
+            buf = f.read(_READ_SIZE)
+            if not buf:
+                return
+        eof = False
+        first = True
+        while True:
+            # Keep at least one maximum-sized frame (plus the next header) buffered
+            if not eof and len(buf) - pos < 8192:
+                more = f.read(_READ_SIZE)
+                buf = buf[pos:] + more
+                pos = 0
+                eof = not more
+            if len(buf) - pos < 4:
+                return
+            header = parse_frame_header(buf, pos)
+            if header is None or pos + header.frame_length > len(buf):
+                if header is not None and eof:
+                    return  # truncated final frame
+                if eof and (buf[pos:pos + 3] == b'TAG' or buf[pos:pos + 8] == b'APETAGEX'):
+                    return
+                pos += 1
+                continue
+            end = pos + header.frame_length
+            # Guard against false sync words: the next frame must also line up
+            if len(buf) - end >= 4 and parse_frame_header(buf, end) is None \
+                    and buf[end:end + 3] != b'TAG' and buf[end:end + 8] != b'APETAGEX':
+                pos += 1
+                continue
+            frame = buf[pos:end]
+            pos = end
+            if first:
+                first = False
+                if not include_vbr_header and header.layer == 3 and is_vbr_header_frame(header, frame):
+                    continue
+            yield header, frame
+
+
+def _vbr_header_frame(template: FrameHeader, template_bytes: bytes, frame_count: int,
+                      total_bytes: int, toc: bytes, cbr: bool) -> bytes:
+    """Build a Xing/Info frame matching the stream described by template"""
+    mpeg1 = template.mpeg1
+    tag_offset = 4 + template.side_info_length
+    needed = tag_offset + 4 + 4 + 4 + 4 + 100
+    # Pick the smallest bitrate whose frame can hold the tag
+    for bitrate_index in range(1, 15):
+        bitrate = _BITRATES[mpeg1][3][bitrate_index] * 1000
+        if mpeg1:
+            length = 144 * bitrate // template.sample_rate
+        else:
+            length = 72 * bitrate // template.sample_rate
+        if length >= needed:
+            break
+    b2 = template_bytes[1] | 0x01  # no CRC
+    b3 = (bitrate_index << 4) | (template_bytes[2] & 0x0C)  # keep sample rate, no padding
+    b4 = template_bytes[3]
+    frame = bytearray(length)
+    frame[0:4] = bytes((0xFF, b2, b3, b4))
+    flags = _XING_FLAGS_FRAMES | _XING_FLAGS_BYTES | _XING_FLAGS_TOC
+    frame[tag_offset:needed] = (b'Info' if cbr else b'Xing') + \
+        struct.pack('>III', flags, frame_count, total_bytes) + toc
+    return bytes(frame)
+
+
+def concat_mp3(input_paths: list, output_path: str) -> dict:
+    """Concatenate MP3 files frame by frame without decoding.
+
+    Tags and per-file Xing/Info headers are dropped, audio frames are streamed
+    into a temporary file in the given order, and a Xing/Info header covering
+    the whole stream is written in front before the file is atomically moved
+    to output_path. input_paths may be any iterable, including a generator
+    that yields chunks as they finish, so stitching can overlap synthesis.
+    Returns frame count, byte size, duration and the byte span each input
+    occupies in the output.
+    """
+    tmp_path = f"{output_path}.tmp"
+    offsets = array('L')
+    frame_count = 0
+    audio_bytes = 0
+    total_samples = 0
+    first_header = None
+    first_bytes = None
+    bitrates = set()
+    placeholder_length = 0
+    spans = []
+    try:
+        with open(tmp_path, 'wb') as out:
+            for path in input_paths:
+                start = audio_bytes
+                for header, frame in iter_frames(path):
+                    if first_header is None:
+                        first_header, first_bytes = header, frame[:4]
+                        placeholder_length = len(_vbr_header_frame(header, first_bytes, 0, 0, bytes(100), True))
+                        out.write(bytes(placeholder_length))
+                    elif not header.same_stream(first_header):
+                        raise ValueError(f"{path} has a different sample rate or channel layout than earlier chunks")
+                    offsets.append(audio_bytes)
+                    out.write(frame)
+                    frame_count += 1
+                    audio_bytes += len(frame)
+                    total_samples += header.samples
+                    bitrates.add(header.bitrate)
+                spans.append((start, audio_bytes - start))
+            if first_header is None:
+                raise ValueError("No MP3 frames found in input files")
+
+            total_bytes = placeholder_length + audio_bytes
+            toc = bytearray(100)
+            for i in range(100):
+                offset = placeholder_length + offsets[min(frame_count - 1, i * frame_count // 100)]
+                toc[i] = min(255, offset * 256 // total_bytes)
+            xing = _vbr_header_frame(first_header, first_bytes, frame_count, total_bytes,
+                                     bytes(toc), len(bitrates) == 1)
+            out.seek(0)
+            out.write(xing)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {
+        'frames': frame_count,
+        'bytes': total_bytes,
+        'duration': total_samples / first_header.sample_rate,
+        # (offset, length) of each input's frames in the output file
+        'spans': [(placeholder_length + offset, length) for offset, length in spans],
+    }
+
+
+def audio_info(path: str) -> dict:
+    """Frame count, byte size and duration of an MP3 file, from frame headers only"""
+    frame_count = 0
+    total_samples = 0
+    sample_rate = None
+    for header, _ in iter_frames(path):
+        frame_count += 1
+        total_samples += header.samples
+        sample_rate = header.sample_rate
+    return {
+        'frames': frame_count,
+        'bytes': os.path.getsize(path),
+        'duration': total_samples / sample_rate if sample_rate else 0.0,
+    }
+
+
+def _id3v1_length(f, file_size: int) -> int:
+    """Size of ID3v1/APE tags at the end of the file"""
+    if file_size < 128:
+        return 0
+    f.seek(file_size - 128)
+    return 128 if f.read(3) == b'TAG' else 0
+
+
+def inspect(path: str, exact: bool = False) -> dict:
+    """Duration, bitrate and size of an MP3 file without decoding or scanning it.
+
+    Reads only the first audio frame: a Xing/Info or VBRI header gives the
+    exact frame count, otherwise the stream is treated as constant bitrate
+    and the frame count is derived from the audio byte size. With exact=True
+    files without such a header fall back to walking every frame header.
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(10)
+        start = id3v2_length(head)
+        f.seek(start)
+        buf = f.read(16 * 1024)
+        offset = 0
+        header = None
+        while offset + 4 <= len(buf):
+            header = parse_frame_header(buf, offset)
+            if header is not None and parse_frame_header(buf, offset + header.frame_length) is not None:
+                break
+            header = None
+            offset += 1
+        if header is None:
+            return {'frames': 0, 'bytes': file_size, 'duration': 0.0, 'bitrate': 0, 'sample_rate': 0, 'vbr': False}
+        frame = buf[offset:offset + header.frame_length]
+        audio_start = start + offset
+        audio_end = file_size - _id3v1_length(f, file_size)
+
+    frame_count = None
+    vbr = False
+    tag_offset = 4 + header.side_info_length
+    tag = frame[tag_offset:tag_offset + 4]
+    if header.layer == 3 and tag in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', frame[tag_offset + 4:tag_offset + 8])[0]
+        if flags & _XING_FLAGS_FRAMES:
+            frame_count = struct.unpack('>I', frame[tag_offset + 8:tag_offset + 12])[0]
+        vbr = tag == b'Xing'
+        audio_start += header.frame_length
+    elif frame[36:40] == b'VBRI':
+        frame_count = struct.unpack('>I', frame[50:54])[0]
+        vbr = True
+        audio_start += header.frame_length
+
+    audio_bytes = audio_end - audio_start
+    if frame_count is None:
+        if exact:
+            return dict(audio_info(path), bitrate=header.bitrate, sample_rate=header.sample_rate, vbr=False)
+        frame_count = round(audio_bytes * header.sample_rate / (header.bitrate / 8 * header.samples))
+    duration = frame_count * header.samples / header.sample_rate
+    return {
+        'frames': frame_count,
+        'bytes': file_size,
+        'duration': duration,
+        'bitrate': round(audio_bytes * 8 / duration) if duration else header.bitrate,
+        'sample_rate': header.sample_rate,
+        'vbr': vbr,
+    }
+
+
+def format_duration(seconds: float) -> str:
+    """HH:MM:SS for itunes:duration"""
+    total = int(round(seconds))
+    return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
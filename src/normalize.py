@@ -0,0 +1,101 @@
+import re
+from typing import NamedTuple
+
+FOOTNOTE_MODES = ('drop', 'expand', 'keep')
+
+# Trailers PG essays end with: a "Notes" heading followed by "[1] ..." entries,
+# then "Thanks to ... for reading drafts of this." and sometimes related links
+_NOTES_HEADING = re.compile(r'(?:End)?notes?:?', re.I)
+_NOTE_ENTRY = re.compile(r'\[(\d+)\]\s*')
+_THANKS = re.compile(r'(?:Many )?(?:Thanks|Thank you)(?: also)? to\b.*\b(?:drafts?|read|reading|comments?|feedback|help|suggestions?|looking)\b',
+                     re.I | re.S)
+# A thanks paragraph this close to the end is the acknowledgements, not prose
+_THANKS_WINDOW = 4
+
+_QUOTES = {
+    '“': '"', '”': '"', '„': '"', '‟': '"', '«': '"', '»': '"', '″': '"',
+    '‘': "'", '’': "'", '‚': "'", '‛': "'", '′': "'",
+}
+
+
+class NormalizeRules(NamedTuple):
+    """What Normalizer removes or rewrites before text is sent to TTS"""
+    strip_notes: bool = True
+    strip_thanks: bool = True
+    footnotes: str = 'drop'  # drop "[1]" markers, expand them to the note text, or keep them
+    quotes: bool = True
+    whitespace: bool = True
+
+
+class Normalizer:
+    """Single-pass text cleanup that cuts billed characters.
+
+    The trailers are cut on paragraph boundaries, then one precompiled
+    alternation handles footnote markers, curly quotes and stray whitespace
+    in a single re.sub over what is left. Only the branches the rules enable
+    are compiled in, so disabled rules cost nothing.
+    """
+
+    def __init__(self, rules: NormalizeRules = NormalizeRules()):
+        if rules.footnotes not in FOOTNOTE_MODES:
+            raise ValueError(f"footnotes must be one of {', '.join(FOOTNOTE_MODES)}")
+        self.rules = rules
+        branches = []
+        if rules.footnotes != 'keep':
+            # Take the space before the marker with it so no double space is left
+            branches.append(r'(?P<ref>[ \t]*\[(?P<note>\d+)\])')
+        if rules.quotes:
+            branches.append('(?P<quote>[' + ''.join(_QUOTES) + '])')
+        if rules.whitespace:
+            branches.append(r'(?P<space>[ \t\u00a0\u2009\u202f]{2,}|[\t\u00a0\u2009\u202f])')
+            branches.append(r'(?P<invisible>[\u200b\u200c\u200d\u2060\ufeff\u00ad])')
+        self._pattern = re.compile('|'.join(branches)) if branches else None
+
+    def _trailer_start(self, paragraphs: list) -> int:
+        """Index of the first paragraph of the notes/acknowledgements trailer"""
+        cut = len(paragraphs)
+        if self.rules.strip_notes:
+            for i in range(len(paragraphs) - 1, 0, -1):
+                if _NOTES_HEADING.fullmatch(paragraphs[i]):
+                    cut = i
+                    break
+        if self.rules.strip_thanks:
+            for i in range(max(1, len(paragraphs) - _THANKS_WINDOW), len(paragraphs)):
+                if _THANKS.match(paragraphs[i]):
+                    cut = min(cut, i)
+                    break
+        return cut
+
+    @staticmethod
+    def _notes(paragraphs: list) -> dict:
+        """Note number -> note text, from "[1] ..." paragraphs"""
+        notes = {}
+        for paragraph in paragraphs:
+            match = _NOTE_ENTRY.match(paragraph)
+            if match:
+                notes[match.group(1)] = paragraph[match.end():]
+        return notes
+
+    def normalize(self, paragraphs: list) -> str:
+        """Normalized text of an essay's paragraphs, joined by blank lines"""
+        cut = self._trailer_start(paragraphs)
+        body = '\n\n'.join(paragraphs[:cut])
+        if self._pattern is None:
+            return body
+        notes = self._notes(paragraphs[cut:] or paragraphs) if self.rules.footnotes == 'expand' else {}
+
+        def replace(match) -> str:
+            kind = match.lastgroup
+            if kind == 'ref':
+                note = notes.get(match.group('note'))
+                return f" (Note: {note})" if note else ''
+            if kind == 'quote':
+                return _QUOTES[match.group()]
+            if kind == 'space':
+                return ' '
+            return ''
+
+        return self._pattern.sub(replace, body)
+
+
+DEFAULT_NORMALIZER = Normalizer()
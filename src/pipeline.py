@@ -0,0 +1,242 @@
+import concurrent.futures
+import logging
+import os
+import queue
+import threading
+
+import http_pool
+import metrics
+from blog_reader import (
+    combine_chunks,
+    essay_entry,
+    extract_essay,
+    fetch_page,
+    split_text_into_chunks,
+    synthesize_chunk,
+)
+from chunk_cache import ChunkCache
+from crawler import Crawler
+from key_scheduler import KeyScheduler
+from journal import EssayJournal
+from manifest import EpisodeManifest
+from normalize import DEFAULT_NORMALIZER, Normalizer
+from segmenter import DEFAULT_CHUNKING
+from voices import Voice
+
+log = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class EssayJob:
+    """An essay in one voice moving through the synthesize and assemble stages"""
+
+    def __init__(self, url: str, title: str, text: str, chunks: list, chunking: str = None, voice: Voice = Voice(),
+                 output_dir: str = 'output'):
+        self.url = url
+        self.title = title
+        self.text = text
+        self.chunks = chunks
+        self.voice = voice
+        self.output_path = voice.output_path(url, output_dir)
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        self.journal = EssayJournal.open(self.output_path, url, text, chunks, chunking, voice.key)
+        self.pending = self.journal.pending()
+        self.remaining = len(self.pending)
+        self.lock = threading.Lock()
+
+
+class CorpusPipeline:
+    """Staged pipeline that keeps the TTS API busy across a whole corpus.
+
+    fetch -> extract/chunk -> synthesize -> assemble, connected by bounded
+    queues. Fetching runs on its own small thread pool, every chunk of every
+    essay goes to one shared synthesis pool sized to the key scheduler, and at
+    most `essays_in_flight` essays are between chunking and assembly at once,
+    which bounds memory and temporary files. Finished episodes are recorded in
+    the manifest, which the caller builds the feed from. Pass `executor` to
+    synthesize on a long-lived pool instead of one created for the run.
+
+    Each essay is fetched, extracted and chunked once and then synthesized in
+    every voice of `voices`: the first is the podcast's own, the others
+    become extra episodes under <output_dir>/voices/. Every voice is its own job
+    with its own journal, and all of them share the synthesis pool.
+    """
+
+    def __init__(self, scheduler: KeyScheduler, cache: ChunkCache = None, voices: list = (Voice(),),
+                 essays_in_flight: int = 4, fetch_workers: int = 4, manifest: EpisodeManifest = None,
+                 crawler: Crawler = None, executor: concurrent.futures.Executor = None,
+                 normalizer: Normalizer = DEFAULT_NORMALIZER, chunking: str = DEFAULT_CHUNKING,
+                 output_dir: str = 'output'):
+        self.scheduler = scheduler
+        self.cache = cache
+        self.voices = list(voices)
+        self.essays_in_flight = essays_in_flight
+        self.fetch_workers = fetch_workers
+        self.manifest = manifest
+        self.crawler = crawler
+        self.executor = executor
+        self.normalizer = normalizer
+        self.chunking = chunking
+        self.output_dir = output_dir
+
+    def run(self, urls: list, update: bool = False) -> list:
+        """Process every URL without audio yet; return feed entries for new episodes.
+
+        With update, essays that already have audio are processed too; their
+        unchanged chunks come from the published episode.
+        """
+        pending = [url for url in urls
+                   if update or any(not os.path.exists(voice.output_path(url, self.output_dir)) for voice in self.voices)]
+        log.info("%d of %d essays need audio", len(pending), len(urls))
+        if not pending:
+            return []
+
+        url_queue = queue.Queue()
+        for url in pending:
+            url_queue.put(url)
+        page_queue = queue.Queue(maxsize=self.fetch_workers * 2)
+        assemble_queue = queue.Queue()
+        in_flight = threading.Semaphore(self.essays_in_flight)
+        workers = max(1, self.scheduler.total_concurrency)
+        http_pool.get_session(workers + self.fetch_workers)
+
+        synth_pool = self.executor or concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        try:
+            fetchers = [
+                threading.Thread(target=self._fetch_stage, args=(url_queue, page_queue), daemon=True)
+                for _ in range(self.fetch_workers)
+            ]
+            for thread in fetchers:
+                thread.start()
+            chunker = threading.Thread(
+                target=self._chunk_stage,
+                args=(page_queue, assemble_queue, in_flight, synth_pool, update),
+                daemon=True,
+            )
+            chunker.start()
+            entries = self._assemble_stage(assemble_queue, in_flight)
+            chunker.join()
+        finally:
+            if synth_pool is not self.executor:
+                synth_pool.shutdown()
+        return entries
+
+    def _fetch_stage(self, url_queue: queue.Queue, page_queue: queue.Queue):
+        while True:
+            try:
+                url = url_queue.get_nowait()
+            except queue.Empty:
+                page_queue.put(_DONE)
+                return
+            try:
+                log.debug("Fetching %s...", url)
+                page_queue.put((url, fetch_page(url, self.crawler)))
+            except Exception as e:
+                log.error("Error fetching %s: %s", url, e)
+
+    def _chunk_stage(self, page_queue: queue.Queue, assemble_queue: queue.Queue,
+                     in_flight: threading.Semaphore, synth_pool, update: bool = False):
+        finished_fetchers = 0
+        try:
+            while finished_fetchers < self.fetch_workers:
+                item = page_queue.get()
+                if item is _DONE:
+                    finished_fetchers += 1
+                    continue
+                url, html = item
+                # One essay failing must not end the stage and drop the rest of the queue
+                try:
+                    self._chunk_essay(url, html, assemble_queue, in_flight, synth_pool, update)
+                except Exception as e:
+                    log.error("Error preparing %s: %s", url, e)
+        finally:
+            # Every essay slot free again means every essay has been assembled
+            for _ in range(self.essays_in_flight):
+                in_flight.acquire()
+            assemble_queue.put(_DONE)
+
+    def _chunk_essay(self, url: str, html, assemble_queue: queue.Queue, in_flight: threading.Semaphore,
+                     synth_pool, update: bool):
+        """Extract and chunk one essay once and start a job for every voice that needs it"""
+        essay = extract_essay(html, url, self.normalizer)
+        if not essay:
+            return
+        title, text = essay
+        chunks = split_text_into_chunks(text, chunking=self.chunking)
+        if not chunks:
+            return
+        for voice in self.voices:
+            if not update and os.path.exists(voice.output_path(url, self.output_dir)):
+                continue
+            self._start_job(url, title, text, chunks, voice, assemble_queue, in_flight, synth_pool)
+
+    def _start_job(self, url: str, title: str, text: str, chunks: list, voice: Voice,
+                   assemble_queue: queue.Queue, in_flight: threading.Semaphore, synth_pool):
+        """Queue the synthesis of one essay in one voice"""
+        # Backpressure: wait for an essay slot before queueing more synthesis work
+        in_flight.acquire()
+        # Checked once the essays ahead have drawn on the budget, so the run
+        # stops cleanly instead of starting essays it cannot pay for
+        budget = self.scheduler.budget
+        if budget is not None and not budget.allows(min(len(chunk) for chunk in chunks)):
+            log.info("Run budget spent; leaving %s for a later run", title)
+            in_flight.release()
+            return
+        try:
+            job = EssayJob(url, title, text, chunks, self.chunking, voice, self.output_dir)
+        except Exception:
+            # The stage waits for every slot at the end; a leaked one would hang it
+            in_flight.release()
+            raise
+        if job.journal.reused:
+            log.info("Reusing %d of %d chunks of %s from the published episode",
+                     job.journal.reused, len(job.chunks), title)
+            metrics.incr('chunks_reused', job.journal.reused)
+        log.info("Synthesizing %s%s (%d of %d chunks)", title, f" in {voice.label}" if voice.label else '',
+                 len(job.pending), len(job.chunks))
+        if not job.pending:
+            assemble_queue.put(job)
+        for index in job.pending:
+            future = synth_pool.submit(synthesize_chunk, job.journal, index, job.chunks[index],
+                                       voice.voice_id, self.cache, self.scheduler, voice.model_id)
+            future.add_done_callback(
+                lambda f, job=job, index=index: self._chunk_done(job, index, f, assemble_queue))
+
+    def _chunk_done(self, job: EssayJob, index: int, future, assemble_queue: queue.Queue):
+        try:
+            future.result()
+        except Exception as e:
+            log.error("Error processing chunk %d of %s: %s", index + 1, job.title, e)
+            job.journal.mark_failed(index, str(e))
+        with job.lock:
+            job.remaining -= 1
+            done = job.remaining == 0
+        if done:
+            assemble_queue.put(job)
+
+    def _assemble_stage(self, assemble_queue: queue.Queue, in_flight: threading.Semaphore) -> list:
+        entries = []
+        while True:
+            job = assemble_queue.get()
+            if job is _DONE:
+                return entries
+            try:
+                # Never publish an essay with holes; the journal lets a rerun resume
+                if job.journal.complete:
+                    info = combine_chunks(job.journal.paths(), job.output_path)
+                    job.journal.finalize(job.output_path, info['spans'])
+                    # Only the podcast's own voice is published in the feed
+                    if job.voice.label is None:
+                        episode = None
+                        if self.manifest is not None:
+                            episode = self.manifest.record(job.url, job.title, job.text, job.output_path)
+                        entries.append(essay_entry(job.url, job.title, job.text, episode))
+                    else:
+                        log.info("Saved %s in %s to %s", job.title, job.voice.label, job.output_path)
+                else:
+                    log.warning("%d chunks of %s failed; rerun to resume", len(job.journal.pending()), job.title)
+            except Exception as e:
+                log.error("Error assembling %s: %s", job.title, e)
+            finally:
+                in_flight.release()
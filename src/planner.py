@@ -0,0 +1,239 @@
+import concurrent.futures
+import json
+import logging
+import os
+from typing import NamedTuple
+
+from blog_reader import VOICE_SETTINGS, extract_essay, fetch_page, split_text_into_chunks
+from chunk_cache import ChunkCache
+from crawler import Crawler
+from journal import EssayJournal
+from key_scheduler import KeyScheduler
+from normalize import DEFAULT_NORMALIZER, Normalizer
+from segmenter import DEFAULT_CHUNKING
+from voices import Voice
+
+log = logging.getLogger(__name__)
+
+# Runs in the metrics report used to estimate throughput
+HISTORY_RUNS = 10
+
+
+class EssayPlan(NamedTuple):
+    """What synthesizing one essay will cost"""
+    url: str
+    title: str
+    chars: int
+    # Chunks over every voice the essay is still missing
+    chunks: int
+    # Chunks still to be sent: not in an earlier run's journal or the chunk cache
+    pending_sizes: tuple
+
+    @property
+    def pending_chars(self) -> int:
+        return sum(self.pending_sizes)
+
+    @property
+    def requests(self) -> int:
+        return len(self.pending_sizes)
+
+    @property
+    def partially_done(self) -> bool:
+        """Some chunks are already synthesized, so finishing costs less than starting"""
+        return self.requests < self.chunks
+
+
+def plan_essay(url: str, html, normalizer: Normalizer = DEFAULT_NORMALIZER, chunking: str = DEFAULT_CHUNKING,
+               cache: ChunkCache = None, voices: list = (Voice(),), output_dir: str = 'output') -> EssayPlan:
+    """Extract and chunk one essay exactly as a run would, without synthesizing anything.
+
+    Costs are summed over the `voices` the essay has no episode in yet.
+    """
+    essay = extract_essay(html, url, normalizer)
+    if not essay:
+        return None
+    title, text = essay
+    chunks = split_text_into_chunks(text, chunking=chunking)
+    planned = 0
+    pending = []
+    for voice in voices:
+        output_path = voice.output_path(url, output_dir)
+        if os.path.exists(output_path):
+            continue
+        planned += len(chunks)
+        done = EssayJournal.done_chunks(output_path, chunks, voice.key)
+        for index, chunk in enumerate(chunks):
+            if index in done:
+                continue
+            if cache is not None and cache.contains(cache.key_for(chunk, voice.voice_id, voice.model_id, VOICE_SETTINGS)):
+                continue
+            pending.append(len(chunk))
+    return EssayPlan(url, title, len(text), planned, tuple(pending))
+
+
+def assign_keys(chunk_sizes: list, scheduler: KeyScheduler) -> tuple:
+    """Spread chunks over keys the way KeyScheduler does.
+
+    Each chunk goes to the key with the least work per concurrency slot
+    among those with quota left for it. Returns ({key label: {'requests',
+    'chars'}}, characters no key has quota for).
+    """
+    keys = [state for state in scheduler.keys if not state.disabled]
+    load = {state.label: {'requests': 0, 'chars': 0} for state in keys}
+    remaining = {state.label: state.remaining_chars for state in keys}
+    unassigned = 0
+    for size in chunk_sizes:
+        candidates = [state for state in keys if remaining[state.label] is None or remaining[state.label] >= size]
+        if not candidates:
+            unassigned += size
+            continue
+        state = min(candidates, key=lambda s: (load[s.label]['chars'] / s.max_concurrency,
+                                               -(remaining[s.label] if remaining[s.label] is not None else float('inf'))))
+        load[state.label]['requests'] += 1
+        load[state.label]['chars'] += size
+        if remaining[state.label] is not None:
+            remaining[state.label] -= size
+    return load, unassigned
+
+
+def throughput_history(report_path: str, runs: int = HISTORY_RUNS) -> dict:
+    """Characters per second per concurrency slot over the last runs that synthesized anything.
+
+    Read from the JSON-lines report Engine.write_metrics appends to. Returns
+    None if there is no usable history.
+    """
+    reports = []
+    try:
+        with open(report_path, 'r') as f:
+            for line in f:
+                try:
+                    report = json.loads(line)
+                except ValueError:
+                    continue
+                if report.get('counters', {}).get('chars_sent') and report.get('elapsed'):
+                    reports.append(report)
+    except (FileNotFoundError, TypeError):
+        return None
+    reports = reports[-runs:]
+    if not reports:
+        return None
+    chars = sum(report['counters']['chars_sent'] for report in reports)
+    # Older reports don't record their concurrency; count them as one slot per second of wall time
+    slot_seconds = sum(report['elapsed'] * report.get('concurrency', 1) for report in reports)
+    return {'runs': len(reports), 'chars': chars, 'chars_per_slot_second': chars / slot_seconds}
+
+
+class BacklogPlan:
+    """Dry-run estimate for synthesizing a list of essays"""
+
+    def __init__(self, essays: list, failed: list, scheduler: KeyScheduler = None, history: dict = None):
+        self.essays = essays
+        self.failed = failed
+        self.scheduler = scheduler
+        self.history = history
+        sizes = [size for essay in essays for size in essay.pending_sizes]
+        self.keys, self.unassigned = assign_keys(sizes, scheduler) if scheduler else ({}, sum(sizes))
+
+    @property
+    def chars(self) -> int:
+        return sum(essay.pending_chars for essay in self.essays)
+
+    @property
+    def requests(self) -> int:
+        return sum(essay.requests for essay in self.essays)
+
+    def shortfall(self) -> int:
+        """Characters beyond the keys' remaining quota; None if quota is unknown"""
+        if self.scheduler is None:
+            return None
+        quota = self.scheduler.remaining_quota()
+        if quota is None:
+            return None
+        return max(0, self.chars - quota)
+
+    def eta_seconds(self) -> float:
+        """Projected synthesis time at historical throughput, capped by configured rate limits"""
+        if self.scheduler is None or not self.history or not self.chars:
+            return None
+        rate = self.history['chars_per_slot_second'] * self.scheduler.total_concurrency
+        limits = [state.char_bucket.rate for state in self.scheduler.keys if state.char_bucket and not state.disabled]
+        if limits and len(limits) == len([s for s in self.scheduler.keys if not s.disabled]):
+            rate = min(rate, sum(limits))
+        return self.chars / rate if rate else None
+
+    def to_dict(self) -> dict:
+        return {
+            'essays': [
+                {'url': essay.url, 'title': essay.title, 'chars': essay.chars, 'chunks': essay.chunks,
+                 'pending_chars': essay.pending_chars, 'requests': essay.requests}
+                for essay in self.essays
+            ],
+            'failed': self.failed,
+            'chars': self.chars,
+            'requests': self.requests,
+            'keys': self.keys,
+            'unassigned_chars': self.unassigned,
+            'shortfall': self.shortfall(),
+            'eta_seconds': self.eta_seconds(),
+            'history': self.history,
+        }
+
+    def print_report(self):
+        print(f"\n{'Essay':50} {'Chars':>8} {'Chunks':>7} {'To send':>8}")
+        for essay in self.essays:
+            print(f"{essay.title[:50]:50} {essay.chars:8} {essay.chunks:7} {essay.pending_chars:8}")
+        for url in self.failed:
+            print(f"{url[:50]:50} {'could not be fetched or extracted':>25}")
+        total_chars = sum(essay.chars for essay in self.essays)
+        print(f"\n{len(self.essays)} essays, {total_chars} characters in "
+              f"{sum(essay.chunks for essay in self.essays)} chunks; "
+              f"{self.chars} characters in {self.requests} requests still to send")
+        for label, load in self.keys.items():
+            print(f"Key {label}: {load['requests']} requests, {load['chars']} characters")
+        if self.scheduler is None:
+            print("No API keys: quota and per-key load not projected")
+        else:
+            quota = self.scheduler.remaining_quota()
+            shortfall = self.shortfall()
+            if quota is None:
+                print("Remaining quota unknown (use --check-quota)")
+            elif shortfall:
+                print(f"Quota: {quota} characters remaining, {shortfall} short; "
+                      f"{self.unassigned} characters fit on no key")
+            else:
+                print(f"Quota: {quota} characters remaining, {quota - self.chars} left after this run")
+        eta = self.eta_seconds()
+        if eta is not None:
+            print(f"ETA: {eta / 60:.0f} min at {self.history['chars_per_slot_second'] * self.scheduler.total_concurrency:.0f}"
+                  f" chars/s (from the last {self.history['runs']} runs)")
+        elif self.chars:
+            print("ETA unknown: no throughput history (record runs with --metrics-report)")
+
+
+def plan_backlog(urls: list, crawler: Crawler, normalizer: Normalizer = DEFAULT_NORMALIZER,
+                 chunking: str = DEFAULT_CHUNKING, cache: ChunkCache = None, scheduler: KeyScheduler = None,
+                 report_path: str = None, fetch_workers: int = 4, voices: list = (Voice(),),
+                 output_dir: str = 'output') -> BacklogPlan:
+    """Plan synthesizing `urls` without making any TTS calls.
+
+    Pages come from the HTML cache when present and are downloaded (and
+    cached) otherwise.
+    """
+    def page(url: str):
+        return crawler.cached(url) or fetch_page(url, crawler)
+
+    essays = []
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as pool:
+        futures = [(url, pool.submit(page, url)) for url in urls]
+        for url, future in futures:
+            try:
+                essay = plan_essay(url, future.result(), normalizer, chunking, cache, voices, output_dir)
+            except Exception as e:
+                log.error("Error planning %s: %s", url, e)
+                essay = None
+            if essay is None:
+                failed.append(url)
+            else:
+                essays.append(essay)
+    return BacklogPlan(essays, failed, scheduler, throughput_history(report_path) if report_path else None)
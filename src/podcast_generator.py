@@ -1,41 +1,59 @@
-from feedgen.feed import FeedGenerator
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime
+import logging
 import os
-from dateutil import tz
+from feed_writer import write_paged_feed
+from mp3 import inspect
+
+log = logging.getLogger(__name__)
 
 class PodcastGenerator:
     def __init__(self, title: str, description: str, website_url: str):
-        self.fg = FeedGenerator()
-        self.fg.title(title)
-        self.fg.description(description)
-        self.fg.link(href=website_url)
-        self.fg.language('en')
-        self.fg.lastBuildDate(datetime.now(tz.UTC))
+        self.channel = {
+            'title': title,
+            'description': description,
+            'link': website_url,
+            'language': 'en',
+        }
+        self.episodes = []
 
-    def add_episode(self, title: str, description: str, audio_url: str, pub_date: datetime = None):
+    def add_episode(self, title: str, description: str, audio_url: str, pub_date: datetime = None,
+                    audio_path: str = None, length: int = None, duration: float = None):
         """
         Add an episode to the podcast feed.
+
+        Enclosure length and itunes:duration come from the local MP3 at
+        audio_path (read from its headers) unless given explicitly.
         """
-        fe = self.fg.add_entry()
-        fe.title(title)
-        fe.description(description)
-        fe.enclosure(audio_url, 0, 'audio/mpeg')
-        fe.pubdate(pub_date or datetime.now(tz.UTC))
+        if audio_path and os.path.exists(audio_path) and (length is None or duration is None):
+            info = inspect(audio_path)
+            length = info['bytes'] if length is None else length
+            duration = info['duration'] if duration is None else duration
+        pub_date = pub_date or datetime.now(timezone.utc)
+        if pub_date.tzinfo is None:
+            pub_date = pub_date.replace(tzinfo=timezone.utc)
+        # Newest first, as podcast clients expect
+        self.episodes.insert(0, {
+            'title': title,
+            'description': description,
+            'audio_url': audio_url,
+            'pub_date': format_datetime(pub_date),
+            'audio_size': length,
+            'duration': duration,
+        })
 
-    def generate_feed(self, output_path: str) -> str:
+    def generate_feed(self, output_path: str, page_size: int = 0, base_url: str = '') -> str:
         """
         Generate the RSS feed and save it to a file.
+
+        With a page_size, older episodes go to archive pages next to
+        output_path, linked from the feed (RFC 5005).
         """
         try:
-            # Create the feed
-            feed = self.fg.rss_str(pretty=True)
-            
-            # Save to file
-            with open(output_path, 'wb') as f:
-                f.write(feed)
-            
+            output_dir, filename = os.path.split(output_path)
+            write_paged_feed(self.episodes, output_dir or '.', base_url, self.channel, page_size, filename)
             return output_path
-            
+
         except Exception as e:
-            print(f"Error generating feed: {e}")
-            return None 
\ No newline at end of file
+            log.error("Error generating feed: %s", e)
+            return None
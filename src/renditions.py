@@ -0,0 +1,171 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+from typing import NamedTuple
+
+import metrics
+from mp3 import inspect
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RENDITION_DIR = os.path.join('output', 'renditions')
+# EBU R128 single-pass loudness normalization to the usual spoken-word podcast target
+LOUDNORM_FILTER = 'loudnorm=I=-16:TP=-1.5:LRA=11'
+
+
+class Rendition(NamedTuple):
+    """An encoding of an episode for publishing"""
+    name: str
+    extension: str
+    mime_type: str
+    container: str
+    codec_args: tuple
+
+    def settings_hash(self, normalize: bool) -> str:
+        """Changes whenever the encoder settings do, so outdated renditions are rebuilt"""
+        payload = json.dumps([self.container, list(self.codec_args), LOUDNORM_FILTER if normalize else None])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+RENDITIONS = {rendition.name: rendition for rendition in (
+    # Speech needs neither stereo nor high bitrates; these are a third to a half of the source size
+    Rendition('mp3-64k-mono', '.mp3', 'audio/mpeg', 'mp3',
+              ('-c:a', 'libmp3lame', '-b:a', '64k', '-ac', '1', '-ar', '44100')),
+    Rendition('mp3-48k-mono', '.mp3', 'audio/mpeg', 'mp3',
+              ('-c:a', 'libmp3lame', '-b:a', '48k', '-ac', '1', '-ar', '32000')),
+    Rendition('opus-32k', '.opus', 'audio/ogg', 'ogg',
+              ('-c:a', 'libopus', '-b:a', '32k', '-ac', '1', '-application', 'voip')),
+)}
+
+
+def file_hash(path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ffmpeg_command(source: str, dest: str, rendition: Rendition, normalize: bool = True) -> list:
+    command = ['ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', source, '-vn', '-map_metadata', '-1']
+    if normalize:
+        command += ['-af', LOUDNORM_FILTER]
+    return command + list(rendition.codec_args) + ['-f', rendition.container, dest]
+
+
+def encode(source: str, dest: str, rendition: Rendition, normalize: bool = True) -> dict:
+    """Encode one rendition with ffmpeg; dest only appears once complete"""
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.tmp"
+    result = subprocess.run(ffmpeg_command(source, tmp_path, rendition, normalize), capture_output=True, text=True)
+    if result.returncode != 0:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise RuntimeError(f"ffmpeg failed for {source}: {result.stderr.strip()[-500:]}")
+    os.replace(tmp_path, dest)
+    info = {'size': os.path.getsize(dest), 'duration': None}
+    if rendition.container == 'mp3':
+        info['duration'] = round(inspect(dest)['duration'], 3)
+    return info
+
+
+class RenditionIndex:
+    """output/renditions/index.json: what each rendition was built from.
+
+    Keyed by "<rendition>/<audio file>", each entry records the source file's
+    hash and the encoder settings, so unchanged episodes are skipped.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_RENDITION_DIR):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, 'index.json')
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def dest_path(self, rendition: Rendition, audio_file: str) -> str:
+        return os.path.join(self.output_dir, rendition.name, os.path.splitext(audio_file)[0] + rendition.extension)
+
+    def get(self, rendition_name: str, audio_file: str) -> dict:
+        return self.entries.get(f"{rendition_name}/{audio_file}")
+
+    def is_current(self, rendition: Rendition, audio_file: str, source_hash: str, normalize: bool) -> bool:
+        entry = self.get(rendition.name, audio_file)
+        return (entry is not None
+                and entry['source_hash'] == source_hash
+                and entry['settings'] == rendition.settings_hash(normalize)
+                and os.path.exists(self.dest_path(rendition, audio_file)))
+
+    def put(self, rendition: Rendition, audio_file: str, source_hash: str, normalize: bool, info: dict):
+        dest = self.dest_path(rendition, audio_file)
+        with self._lock:
+            self.entries[f"{rendition.name}/{audio_file}"] = {
+                'file': os.path.relpath(dest, os.path.dirname(self.output_dir)).replace(os.sep, '/'),
+                'mime_type': rendition.mime_type,
+                'source_hash': source_hash,
+                'settings': rendition.settings_hash(normalize),
+                'size': info['size'],
+                'duration': info['duration'],
+            }
+            self._save()
+
+    def _save(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def render_all(sources: list, rendition_names: list, output_dir: str = DEFAULT_RENDITION_DIR,
+               workers: int = None, normalize: bool = True) -> dict:
+    """Build every requested rendition of every source MP3 that is missing or outdated.
+
+    Each encode is its own ffmpeg process, so `workers` (default: one per
+    core) encodes run in parallel on every core; the threads here only
+    launch and wait on them. Sources are hashed in the same pool. Returns
+    counts of rendered, skipped and failed encodes.
+    """
+    if shutil.which('ffmpeg') is None:
+        raise RuntimeError("ffmpeg not found on PATH; it is needed to build renditions")
+    unknown = [name for name in rendition_names if name not in RENDITIONS]
+    if unknown:
+        raise ValueError(f"Unknown renditions: {', '.join(unknown)} (choose from {', '.join(RENDITIONS)})")
+    renditions = [RENDITIONS[name] for name in rendition_names]
+    index = RenditionIndex(output_dir)
+    counts = {'rendered': 0, 'skipped': 0, 'failed': 0}
+
+    def render(source: str, rendition: Rendition, source_hash: str):
+        audio_file = os.path.basename(source)
+        with metrics.timer('render'):
+            info = encode(source, index.dest_path(rendition, audio_file), rendition, normalize)
+        index.put(rendition, audio_file, source_hash, normalize, info)
+        log.info("Rendered %s as %s (%d KB)", audio_file, rendition.name, info['size'] // 1024)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        hashes = dict(zip(sources, pool.map(file_hash, sources)))
+        futures = []
+        for source in sources:
+            for rendition in renditions:
+                if index.is_current(rendition, os.path.basename(source), hashes[source], normalize):
+                    counts['skipped'] += 1
+                    continue
+                futures.append(pool.submit(render, source, rendition, hashes[source]))
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+                counts['rendered'] += 1
+            except Exception as e:
+                counts['failed'] += 1
+                log.error("Error rendering: %s", e)
+    return counts
@@ -0,0 +1,198 @@
+import re
+import statistics
+import zlib
+
+DEFAULT_MAX_CHARS = 4000
+
+# Words that end in a period without ending the sentence
+ABBREVIATIONS = {
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'vs', 'e.g', 'i.e', 'cf', 'al',
+    'inc', 'ltd', 'co', 'corp', 'vol', 'fig', 'approx', 'u.s', 'u.k', 'a.m', 'p.m',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+}
+# Capitalized words that usually open a sentence rather than follow an initial as a surname
+SENTENCE_STARTERS = {
+    'a', 'an', 'the', 'this', 'that', 'these', 'those', 'there', 'here', 'it', 'its', 'i', 'we', 'you',
+    'he', 'she', 'they', 'my', 'our', 'your', 'his', 'her', 'their', 'but', 'and', 'or', 'so', 'yet',
+    'if', 'when', 'while', 'then', 'next', 'now', 'once', 'after', 'before', 'because', 'although',
+    'though', 'also', 'still', 'even', 'what', 'why', 'how', 'which', 'who', 'where', 'in', 'on', 'at',
+    'for', 'of', 'to', 'as', 'by', 'with', 'not', 'no', 'yes', 'one', 'some', 'most', 'many', 'all',
+    'let', 'do', 'is', 'was',
+}
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t\r\xa0]*\n+')
+# Sentence end: terminal punctuation, optional closing quotes/brackets, then whitespace
+_SENTENCE_END = re.compile(r'[.!?]+["\'”’)\]]*(?=\s)')
+_SOFT_BREAK = re.compile(r'[,;:—-]\s')
+# The word after a candidate initial: another initial ("E. B. White") or a capitalized name
+_AFTER_INITIAL = re.compile(r'\s+([A-Z])(\.|[\w\'’-]*)')
+_MAX_ABBREVIATION = max(len(word) for word in ABBREVIATIONS) + 2
+# On average one sentence in ANCHOR_PERIOD is a content-defined chunk boundary
+ANCHOR_PERIOD = 8
+
+
+def _is_abbreviation(paragraph: str, end: int) -> bool:
+    """True if the period ending at `end` belongs to an abbreviation or initial"""
+    if paragraph[end - 1] != '.':
+        return False
+    # Walk back over the word before the period; abbreviations are short,
+    # so this stays constant time per candidate
+    start = end - 1
+    while start > 0 and end - start <= _MAX_ABBREVIATION and (paragraph[start - 1].isalnum() or paragraph[start - 1] == '.'):
+        start -= 1
+    if end - start > _MAX_ABBREVIATION:
+        return False
+    word = paragraph[start:end - 1].lower()
+    if not word:
+        return False
+    if len(word) == 1:
+        return _is_initial(paragraph, start, end)
+    # Dotted forms like "e.g" are in the list as is
+    return word in ABBREVIATIONS
+
+
+def _is_initial(paragraph: str, start: int, end: int) -> bool:
+    """True if the capital letter and period at start:end are an initial ("J. McCarthy"), not "Plan B." """
+    if not paragraph[start].isupper():
+        return False
+    following = _AFTER_INITIAL.match(paragraph, end)
+    if following is None:
+        return False
+    if following.group(2) == '.':
+        return True
+    return (following.group(1) + following.group(2)).lower() not in SENTENCE_STARTERS
+
+
+def split_sentences(paragraph: str) -> list:
+    """Split one paragraph into sentences in a single left-to-right pass"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(paragraph):
+        end = match.end()
+        if _is_abbreviation(paragraph, match.start() + 1):
+            continue
+        sentence = paragraph[start:end].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = end
+    tail = paragraph[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _split_long(sentence: str, max_chars: int) -> list:
+    """Break a sentence longer than max_chars at clause punctuation, then spaces"""
+    pieces = []
+    while len(sentence) > max_chars:
+        window = sentence[:max_chars]
+        cut = None
+        for match in _SOFT_BREAK.finditer(window):
+            cut = match.end()
+        if cut is None:
+            cut = window.rfind(' ') + 1 or max_chars
+        pieces.append(sentence[:cut].strip())
+        sentence = sentence[cut:].strip()
+    if sentence:
+        pieces.append(sentence)
+    return pieces
+
+
+def paragraphs(text: str) -> list:
+    """Blank-line separated paragraphs with internal whitespace collapsed"""
+    result = []
+    for block in _PARAGRAPH_BREAK.split(text):
+        block = ' '.join(block.split())
+        if block:
+            result.append(block)
+    return result
+
+
+def pack_chunks(text: str, max_chars: int = DEFAULT_MAX_CHARS) -> list:
+    """Pack sentences into as few chunks as possible, each at most max_chars.
+
+    Sentences are never split unless a single sentence exceeds the budget.
+    Paragraph breaks are kept inside a chunk as a blank line, and separators
+    count towards the budget. Greedy filling is optimal for the number of
+    contiguous chunks and runs in linear time.
+    """
+    chunks = []
+    current = []
+    length = 0
+    for paragraph in paragraphs(text):
+        new_paragraph = True
+        for sentence in split_sentences(paragraph):
+            for piece in _split_long(sentence, max_chars):
+                separator = '' if not current else ('\n\n' if new_paragraph else ' ')
+                new_paragraph = False
+                if current and length + len(separator) + len(piece) > max_chars:
+                    chunks.append(''.join(current))
+                    current = []
+                    length = 0
+                    separator = ''
+                current.append(separator + piece)
+                length += len(separator) + len(piece)
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+def _is_anchor(sentence: str) -> bool:
+    return zlib.crc32(sentence.encode('utf-8')) % ANCHOR_PERIOD == 0
+
+
+def anchored_chunks(text: str, max_chars: int = DEFAULT_MAX_CHARS, min_chars: int = None) -> list:
+    """Split text at boundaries chosen by content rather than position.
+
+    Once a chunk holds at least min_chars (default half the budget), it ends
+    after the next paragraph or after a sentence whose hash marks it as an
+    anchor; it is only cut by size when it would exceed max_chars. An edit
+    therefore moves the boundaries around it only until both versions reach
+    the same anchor, and every chunk after that has the same text as before,
+    so its audio can be reused. Chunks are smaller on average than with
+    pack_chunks, which costs some extra requests but no extra characters.
+    """
+    min_chars = max_chars // 2 if min_chars is None else min_chars
+    chunks = []
+    current = []
+    length = 0
+    for paragraph in paragraphs(text):
+        pieces = [piece for sentence in split_sentences(paragraph) for piece in _split_long(sentence, max_chars)]
+        for i, piece in enumerate(pieces):
+            separator = '' if not current else ('\n\n' if i == 0 else ' ')
+            if current and length + len(separator) + len(piece) > max_chars:
+                chunks.append(''.join(current))
+                current = []
+                length = 0
+                separator = ''
+            current.append(separator + piece)
+            length += len(separator) + len(piece)
+            if length >= min_chars and (i == len(pieces) - 1 or _is_anchor(piece)):
+                chunks.append(''.join(current))
+                current = []
+                length = 0
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+CHUNKING = {
+    'packed': pack_chunks,
+    'anchored': anchored_chunks,
+}
+DEFAULT_CHUNKING = 'packed'
+
+
+def chunk_stats(chunks: list, max_chars: int = DEFAULT_MAX_CHARS) -> dict:
+    """Chunk count and size distribution for a chunked essay"""
+    sizes = [len(chunk) for chunk in chunks]
+    if not sizes:
+        return {'chunks': 0, 'chars': 0, 'min': 0, 'mean': 0, 'median': 0, 'max': 0, 'fill': 0.0}
+    return {
+        'chunks': len(sizes),
+        'chars': sum(sizes),
+        'min': min(sizes),
+        'mean': statistics.mean(sizes),
+        'median': statistics.median(sizes),
+        'max': max(sizes),
+        'fill': sum(sizes) / (len(sizes) * max_chars),
+    }
@@ -0,0 +1,286 @@
+"""Preview server for the site, the feed and the episodes before publishing.
+
+Unlike `python3 -m http.server` it answers Range requests with 206 (so
+players can seek without downloading whole episodes), sends strong ETags
+derived from file contents and answers If-None-Match with 304 (so feed polls
+cost a few hundred bytes), compresses XML/HTML with brotli or gzip, and sends
+file bodies with sendfile. Run it from the repository root:
+
+    python3 src/serve.py --port 8000
+    curl -H 'Range: bytes=0-99' -o /dev/null -D - http://127.0.0.1:8000/output/foundermode.mp3
+"""
+import argparse
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import threading
+import urllib.parse
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/xml', 'application/rss+xml', 'application/json', 'application/javascript')
+# Files below this size aren't worth compressing
+MIN_COMPRESS_BYTES = 512
+_RANGE = re.compile(r'bytes=(\d*)-(\d*)$')
+# Assets named after their content hash (site_writer.write_asset) never change
+_HASHED_NAME = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+mimetypes.add_type('audio/ogg', '.opus')
+mimetypes.add_type('application/rss+xml', '.xml')
+
+
+class FileInfo:
+    """What the server knows about one version of a file: its validator and compressed bodies"""
+
+    def __init__(self, path: str, size: int, mtime_ns: int, etag: str, content_type: str):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.etag = etag
+        self.content_type = content_type
+        self.encoded = {}
+
+
+class StaticSite:
+    """Files under `root`, with content hashes and compressed variants cached per file version.
+
+    A file is hashed once per (size, mtime); a rewrite (the feed is replaced
+    atomically on every run) gets a new ETag on the next request.
+    """
+
+    def __init__(self, root: str = '.'):
+        self.root = os.path.realpath(root)
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path: str) -> str:
+        """Local file for a URL path, or None if it is missing or outside the root"""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(url_path).path)
+        local = os.path.realpath(os.path.join(self.root, path.lstrip('/')))
+        if local != self.root and not local.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(local):
+            local = os.path.join(local, 'index.html')
+        return local if os.path.isfile(local) else None
+
+    def info(self, local: str) -> FileInfo:
+        st = os.stat(local)
+        with self._lock:
+            info = self._files.get(local)
+        if info is not None and info.size == st.st_size and info.mtime_ns == st.st_mtime_ns:
+            return info
+        digest = hashlib.sha256()
+        with open(local, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        content_type = mimetypes.guess_type(local)[0] or 'application/octet-stream'
+        info = FileInfo(local, st.st_size, st.st_mtime_ns, f'"{digest.hexdigest()[:32]}"', content_type)
+        with self._lock:
+            self._files[local] = info
+        return info
+
+    def encoded(self, info: FileInfo, encoding: str) -> bytes:
+        """The file compressed with `encoding`, compressed once per file version"""
+        body = info.encoded.get(encoding)
+        if body is None:
+            with open(info.path, 'rb') as f:
+                data = f.read()
+            body = brotli.compress(data, quality=11) if encoding == 'br' else gzip.compress(data, 9)
+            info.encoded[encoding] = body
+        return body
+
+
+def compressible(info: FileInfo) -> bool:
+    return info.size >= MIN_COMPRESS_BYTES and info.content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def cache_control(local: str, info: FileInfo) -> str:
+    if _HASHED_NAME.search(local):
+        return 'public, max-age=31536000, immutable'
+    # Feeds and pages must be revalidated; the ETag makes that a 304
+    return 'no-cache' if compressible(info) else 'public, max-age=86400'
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Best content coding the client accepts: br, then gzip, else None"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        match = re.search(r'q=([\d.]+)', params)
+        if match:
+            q = float(match.group(1))
+        accepted[name.strip().lower()] = q
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+def parse_range(header: str, size: int):
+    """(start, end) inclusive for a single byte range, 'unsatisfiable', or None to send everything"""
+    match = _RANGE.match(header.strip())
+    if not match:
+        # Multiple ranges or other units: serving the whole file is always allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            return 'unsatisfiable'
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Invalid rather than unsatisfiable (RFC 9110 14.1.1): ignore the header
+        return None
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return 'unsatisfiable'
+    return start, end
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison, which RFC 9110 makes weak (W/ is ignored)"""
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, root: str = '.'):
+        super().__init__(address, _Handler)
+        self.site = StaticSite(root)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and a small body go out as separate writes; with Nagle on, the
+    # body waits for the client's delayed ACK (~40 ms on Linux)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        log.debug("%s %s", self.address_string(), format % args)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _send_empty(self, status: int, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        # A 304 has no body by definition; anything else needs the length for keep-alive
+        if status != 304:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _serve(self, head: bool):
+        site = self.server.site
+        local = site.resolve(self.path)
+        if local is None:
+            self._send_empty(404)
+            return
+        info = site.info(local)
+        headers = {
+            'ETag': info.etag,
+            'Last-Modified': formatdate(info.mtime_ns / 1e9, usegmt=True),
+            'Cache-Control': cache_control(local, info),
+            'Accept-Ranges': 'bytes',
+        }
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range', info.etag) != info.etag:
+            range_header = None
+        encoding = None
+        if compressible(info):
+            headers['Vary'] = 'Accept-Encoding'
+            if not range_header:
+                encoding = choose_encoding(self.headers.get('Accept-Encoding', ''))
+        if encoding:
+            # Each representation gets its own strong validator
+            headers['ETag'] = f'{info.etag[:-1]}-{encoding}"'
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match and etag_matches(if_none_match, headers['ETag']):
+            self._send_empty(304, headers)
+            return
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            self._send_body(200, headers, info.content_type, site.encoded(info, encoding), head)
+            return
+
+        start, end = 0, info.size - 1
+        status = 200
+        if range_header:
+            byte_range = parse_range(range_header, info.size)
+            if byte_range == 'unsatisfiable':
+                self._send_empty(416, {'Content-Range': f"bytes */{info.size}"})
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                headers['Content-Range'] = f"bytes {start}-{end}/{info.size}"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', info.content_type)
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if head or info.size == 0:
+            return
+        with open(local, 'rb') as f:
+            # Zero-copy from the page cache to the socket where the OS supports it
+            self.connection.sendfile(f, start, end - start + 1)
+
+    def _send_body(self, status: int, headers: dict, content_type: str, body: bytes, head: bool):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serve the site, feed and episodes locally for preview')
+    parser.add_argument('--root', default='.', help='Directory to serve (the repository root)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--log-level', default='INFO', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], help='Logging verbosity')
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level, format='%(message)s')
+
+    server = SiteServer((args.host, args.port), args.root)
+    log.info("Serving %s on %s (feed: %s/output/feed.xml)", server.site.root, server.base_url, server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
@@ -0,0 +1,193 @@
+import glob
+import hashlib
+import html
+import os
+from email.utils import parsedate_to_datetime
+
+from feed_writer import page_filename
+
+DEFAULT_EPISODES_PER_PAGE = 24
+ASSET_DIR = 'assets'
+
+SITE_CSS = """:root {
+    --primary-color: #2c3e50;
+    --secondary-color: #3498db;
+    --background-color: #f8f9fa;
+    --text-color: #333;
+    --card-bg: #ffffff;
+    --border-radius: 8px;
+    --box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+}
+* { margin: 0; padding: 0; box-sizing: border-box; }
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+    line-height: 1.6;
+    color: var(--text-color);
+    background-color: var(--background-color);
+    padding: 2rem;
+}
+a { color: var(--secondary-color); }
+header { text-align: center; margin-bottom: 3rem; padding: 2rem 0; border-bottom: 1px solid #eee; }
+h1 { color: var(--primary-color); font-size: 2.5rem; margin-bottom: 1rem; }
+.subtitle { color: #666; font-size: 1.2rem; font-weight: normal; }
+.episodes-grid {
+    display: grid;
+    grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
+    gap: 2rem;
+    max-width: 1200px;
+    margin: 0 auto;
+}
+.episode-card {
+    background: var(--card-bg);
+    border-radius: var(--border-radius);
+    box-shadow: var(--box-shadow);
+    padding: 1.5rem;
+    transition: transform 0.2s ease;
+    /* Offscreen cards are not laid out until scrolled to */
+    content-visibility: auto;
+    contain-intrinsic-size: auto 20rem;
+}
+.episode-card:hover { transform: translateY(-5px); }
+.episode-title { color: var(--primary-color); font-size: 1.25rem; margin-bottom: 0.5rem; }
+.episode-title a { color: inherit; text-decoration: none; }
+.episode-date { color: #666; font-size: 0.9rem; margin-bottom: 1rem; }
+.episode-description { margin-bottom: 1.5rem; color: #555; }
+.audio-player { width: 100%; margin-top: 1rem; }
+.pagination { display: flex; justify-content: center; flex-wrap: wrap; gap: 0.5rem; margin: 3rem auto 0; }
+.pagination a, .pagination span { padding: 0.25rem 0.75rem; border-radius: var(--border-radius); }
+.pagination span { background: var(--primary-color); color: #fff; }
+@media (max-width: 768px) {
+    body { padding: 1rem; }
+    .episodes-grid { grid-template-columns: 1fr; }
+    h1 { font-size: 2rem; }
+}
+"""
+
+
+def write_asset(root: str, name: str, content: str) -> str:
+    """Write a content-hashed copy of an asset and return its URL relative to root.
+
+    assets/site.css becomes assets/site.<hash>.css, so it can be cached
+    forever: any change gets a new URL. Older versions are removed.
+    """
+    data = content.encode('utf-8')
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+    asset_dir = os.path.join(root, ASSET_DIR)
+    os.makedirs(asset_dir, exist_ok=True)
+    path = os.path.join(asset_dir, filename)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    for stale in glob.glob(os.path.join(asset_dir, f"{stem}.*{ext}")):
+        if os.path.basename(stale) != filename:
+            os.remove(stale)
+    return f"{ASSET_DIR}/{filename}"
+
+
+def _text(value: str) -> str:
+    return html.escape(value, quote=False)
+
+
+def _month(pub_date: str) -> str:
+    try:
+        return parsedate_to_datetime(pub_date).strftime('%B %Y')
+    except (TypeError, ValueError):
+        return ''
+
+
+def _summary(description: str, limit: int = 200) -> str:
+    """First sentences of the description, cut at a word boundary"""
+    description = ' '.join((description or '').split()).rstrip('.')
+    if len(description) <= limit:
+        return description
+    return description[:limit].rsplit(' ', 1)[0] + '…'
+
+
+def episode_card(episode: dict, audio_prefix: str) -> str:
+    """One <article> for an episode; the player fetches nothing until played"""
+    e = html.escape
+    title = _text(episode['title'])
+    if episode.get('url'):
+        title = f'<a href="{e(episode["url"])}">{title}</a>'
+    meta = [_month(episode.get('pub_date'))]
+    if episode.get('duration'):
+        meta.append(f"{max(1, round(episode['duration'] / 60))} min")
+    if episode.get('audio_size'):
+        meta.append(f"{episode['audio_size'] / 1024 ** 2:.1f} MB")
+    audio_file = episode.get('audio_file') or os.path.basename(episode['audio_url'])
+    return (
+        '        <article class="episode-card">\n'
+        f'            <h2 class="episode-title">{title}</h2>\n'
+        f'            <p class="episode-date">{_text(" · ".join(part for part in meta if part))}</p>\n'
+        f'            <p class="episode-description">{_text(_summary(episode.get("description")))}</p>\n'
+        f'            <audio class="audio-player" controls preload="none" src="{e(audio_prefix + audio_file)}"></audio>\n'
+        '        </article>\n'
+    )
+
+
+def _pagination(filename: str, page: int, page_count: int) -> str:
+    if page_count < 2:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a href="{page_filename(filename, page - 1)}" rel="prev">Newer</a>')
+    for number in range(1, page_count + 1):
+        if number == page:
+            links.append(f'<span aria-current="page">{number}</span>')
+        else:
+            links.append(f'<a href="{page_filename(filename, number)}">{number}</a>')
+    if page < page_count:
+        links.append(f'<a href="{page_filename(filename, page + 1)}" rel="next">Older</a>')
+    return '    <nav class="pagination">\n        ' + '\n        '.join(links) + '\n    </nav>\n'
+
+
+def write_site(episodes: list, root: str = '.', title: str = 'PaulPod', subtitle: str = "Paul Graham's Essays in Audio",
+               audio_prefix: str = 'output/', feed_url: str = 'output/feed.xml',
+               page_size: int = DEFAULT_EPISODES_PER_PAGE, filename: str = 'index.html') -> list:
+    """Write the episode listing as static pages and return their paths.
+
+    `episodes` are manifest/feed entries in display order. Each page holds
+    page_size episodes (0 for one page) with durations and sizes already
+    filled in, and players use preload="none", so a visit downloads a page
+    of HTML and one stylesheet however large the catalog grows. The
+    stylesheet URL carries its content hash and can be cached indefinitely.
+    """
+    css_url = write_asset(root, 'site.css', SITE_CSS)
+    total = len(episodes)
+    page_count = max(1, -(-total // page_size)) if page_size else 1
+    per_page = page_size or max(total, 1)
+    e = html.escape
+    paths = []
+    for page in range(1, page_count + 1):
+        heading = f"{title} - {subtitle}" + (f" (page {page})" if page > 1 else '')
+        parts = [
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n',
+            '    <meta charset="UTF-8">\n',
+            '    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n',
+            f'    <title>{_text(heading)}</title>\n',
+            f'    <link rel="stylesheet" href="{e(css_url)}">\n',
+            f'    <link rel="alternate" type="application/rss+xml" title="{e(title)}" href="{e(feed_url)}">\n',
+            '</head>\n<body>\n    <header>\n',
+            f'        <h1>{_text(title)}</h1>\n',
+            f'        <p class="subtitle">{_text(subtitle)} · <a href="{e(feed_url)}">RSS feed</a></p>\n',
+            '    </header>\n\n    <main class="episodes-grid">\n',
+        ]
+        parts += [episode_card(episode, audio_prefix) for episode in episodes[(page - 1) * per_page:page * per_page]]
+        parts += ['    </main>\n', _pagination(filename, page, page_count), '</body>\n</html>\n']
+
+        path = os.path.join(root, page_filename(filename, page))
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        os.replace(tmp_path, path)
+        paths.append(path)
+
+    # Drop pages left over from a run with more pages
+    stem, ext = os.path.splitext(filename)
+    for stale in glob.glob(os.path.join(root, f"{stem}-page*{ext}")):
+        if stale not in paths:
+            os.remove(stale)
+    return paths
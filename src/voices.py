@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import NamedTuple
+
+import http_pool
+from blog_reader import ELEVENLABS_API_BASE, MODEL_ID, VOICE_ID, essay_output_path, get_essay_filename
+
+log = logging.getLogger(__name__)
+
+VOICES_URL = ELEVENLABS_API_BASE + "/v1/voices"
+DEFAULT_VOICE_CACHE = os.path.join('cache', 'voices.json')
+# Voices are rarely added or renamed; a day-old list is fine
+DEFAULT_VOICE_TTL = 24 * 3600
+# Episodes in other voices go to <output dir>/voices/<label>/, next to the main ones
+VOICE_DIR = 'voices'
+_VOICE_ID = re.compile(r'[A-Za-z0-9]{20}')
+
+
+class Voice(NamedTuple):
+    """A resolved voice and model to synthesize with"""
+    voice_id: str = VOICE_ID
+    model_id: str = MODEL_ID
+    # Directory name for its episodes: the voice name, plus the model if not the
+    # default. None for the podcast's own voice, whose episodes are in the output directory.
+    label: str = None
+
+    @property
+    def key(self) -> str:
+        """Identifies the audio this voice produces in journals and chunk maps"""
+        return f"{self.voice_id}/{self.model_id}"
+
+    def output_path(self, url: str, output_dir: str = 'output') -> str:
+        if self.label is None:
+            return essay_output_path(url, None, output_dir)
+        return os.path.join(output_dir, VOICE_DIR, self.label, get_essay_filename(url, None))
+
+
+def parse_voice_spec(spec: str) -> tuple:
+    """"Adam" or "Adam:eleven_multilingual_v2" -> (voice, model)"""
+    voice, _, model = spec.strip().partition(':')
+    return voice.strip(), model.strip() or MODEL_ID
+
+
+class VoiceRegistry:
+    """Voice names -> ids, fetched once and cached on disk for `ttl` seconds.
+
+    cache/voices.json holds the account's voice list and when it was
+    fetched. Lookups are case-insensitive; a name missing from a cached list
+    triggers one refresh in case the voice was added since. Anything shaped
+    like a voice id is used as is without a request. If the API can't be
+    reached, an expired list is still used.
+    """
+
+    def __init__(self, api_key: str = None, cache_path: str = DEFAULT_VOICE_CACHE, ttl: float = DEFAULT_VOICE_TTL):
+        self.api_key = api_key
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._voices = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        try:
+            with open(cache_path, 'r') as f:
+                data = json.load(f)
+            self._voices = data['voices']
+            self._fetched_at = data['fetched_at']
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    @property
+    def stale(self) -> bool:
+        return self._voices is None or time.time() - self._fetched_at > self.ttl
+
+    def refresh(self) -> bool:
+        """Fetch the voice list and save it; False if it could not be fetched"""
+        headers = {"xi-api-key": self.api_key} if self.api_key else {}
+        try:
+            response = http_pool.get(VOICES_URL, headers=headers)
+        except Exception as e:
+            log.warning("Could not fetch voices: %s", e)
+            return False
+        if response.status_code != 200:
+            log.warning("Could not fetch voices: %s", response.status_code)
+            return False
+        self._voices = {voice['name']: voice['voice_id'] for voice in response.json().get('voices', [])}
+        self._fetched_at = time.time()
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fetched_at': self._fetched_at, 'voices': self._voices}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.cache_path)
+        log.info("Cached %d voices in %s", len(self._voices), self.cache_path)
+        return True
+
+    def _lookup(self, name: str) -> str:
+        for voice_name, voice_id in (self._voices or {}).items():
+            if voice_name.lower() == name.lower():
+                return voice_id
+        return None
+
+    def resolve(self, voice: str) -> str:
+        """Voice id for a voice name or id"""
+        with self._lock:
+            voice_id = self._lookup(voice)
+            if voice_id is None and _VOICE_ID.fullmatch(voice):
+                return voice
+            # An expired list, or one that predates the voice
+            if voice_id is None or self.stale:
+                self.refresh()
+                voice_id = self._lookup(voice)
+        if voice_id is None:
+            raise ValueError(f"Unknown voice {voice!r}")
+        return voice_id
+
+    def voice(self, spec: str) -> Voice:
+        """Voice for a "name[:model]" spec"""
+        name, model = parse_voice_spec(spec)
+        label = re.sub(r'[^a-z0-9_-]+', '-', name.lower()).strip('-')
+        if model != MODEL_ID:
+            label = f"{label}-{model}"
+        return Voice(self.resolve(name), model, label)
@@ -0,0 +1,37 @@
+import os
+
+import chunk_cache
+from chunk_cache import LOW_WATER, ChunkCache
+
+
+def store_chunks(cache: ChunkCache, tmp_path, first: int, count: int, size: int = 1000):
+    """Store `count` chunks of `size` bytes, each older than the next"""
+    for n in range(first, first + count):
+        src = tmp_path / f"chunk{n}.mp3"
+        src.write_bytes(b'\0' * size)
+        key = cache.key_for(f"text {n}", 'voice', 'model', {})
+        cache.store(key, str(src))
+        os.utime(cache._path(key), (n, n))
+
+
+def test_eviction_trims_to_low_water_and_keeps_newest(tmp_path):
+    cache = ChunkCache(str(tmp_path / 'cache'), max_bytes=10_000)
+    store_chunks(cache, tmp_path, 0, 11)
+
+    assert cache.stats()['size_bytes'] <= 10_000 * LOW_WATER
+    assert cache.evictions == 2
+    assert not cache.contains(cache.key_for("text 0", 'voice', 'model', {}))
+    assert cache.contains(cache.key_for("text 10", 'voice', 'model', {}))
+
+
+def test_store_below_budget_after_eviction_does_not_rescan(tmp_path, monkeypatch):
+    cache = ChunkCache(str(tmp_path / 'cache'), max_bytes=10_000)
+    store_chunks(cache, tmp_path, 0, 11)
+    scans = []
+    real = ChunkCache._entries
+    monkeypatch.setattr(chunk_cache.ChunkCache, '_entries', lambda self: scans.append(1) or real(self))
+
+    store_chunks(cache, tmp_path, 11, 1)
+
+    assert scans == []
+    assert cache.stats()['size_bytes'] == 10_000
@@ -0,0 +1,44 @@
+import os
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from feed_writer import write_paged_feed
+from manifest import EpisodeManifest
+from mock_server import silent_mp3
+from site_writer import write_site
+
+CHANNEL = {'title': 'Test', 'description': 'Test feed', 'link': 'https://example.com'}
+
+
+def record_episodes(tmp_path, count: int) -> EpisodeManifest:
+    """A manifest with `count` episodes recorded oldest first, a day apart"""
+    manifest = EpisodeManifest(str(tmp_path / 'episodes.json'))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for n in range(count):
+        audio_path = tmp_path / f"essay{n}.mp3"
+        audio_path.write_bytes(silent_mp3(100))
+        manifest.record(f"https://example.com/essay{n}.html", f"Essay {n}", 'text', str(audio_path),
+                        pub_date=format_datetime(start + timedelta(days=n)))
+    return manifest
+
+
+def test_newest_episode_is_on_the_first_feed_page(tmp_path):
+    manifest = record_episodes(tmp_path, 60)
+    paths = write_paged_feed(manifest.feed_entries(), str(tmp_path), 'https://example.com/', CHANNEL, page_size=50)
+
+    assert [os.path.basename(path) for path in paths] == ['feed.xml', 'feed-page2.xml']
+    first_page = [item.findtext('title') for item in ET.parse(paths[0]).getroot().iter('item')]
+    assert len(first_page) == 50
+    assert first_page[0] == 'Essay 59'
+    assert 'Essay 0' not in first_page
+
+
+def test_newest_episode_is_on_the_first_site_page(tmp_path):
+    manifest = record_episodes(tmp_path, 30)
+    paths = write_site(manifest.feed_entries(), str(tmp_path), page_size=24)
+
+    with open(paths[0], encoding='utf-8') as f:
+        first_page = f.read()
+    assert first_page.index('Essay 29') < first_page.index('Essay 28')
+    assert 'Essay 0<' not in first_page
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import blog_reader
+from blog_reader import generate_audio_for_text, split_text_into_chunks
+from journal import EssayJournal, chunk_map_path
+from key_scheduler import KeyScheduler
+from mock_server import MockElevenLabs
+
+
+def essay_text(paragraphs: int = 40, edited: int = None) -> str:
+    """Distinct sentences in paragraphs of about 700 characters; `edited` rewrites one paragraph"""
+    text = []
+    for p in range(paragraphs):
+        sentences = [f"Paragraph {p} sentence {s} says something about startups and essays number {p * 10 + s}."
+                     for s in range(8)]
+        if p == edited:
+            sentences[3] = "This sentence was rewritten after the episode was published."
+        text.append(' '.join(sentences))
+    return '\n\n'.join(text)
+
+
+@pytest.fixture
+def mock(monkeypatch):
+    with MockElevenLabs(latency_ms=1, latency_dist='fixed') as mock:
+        monkeypatch.setattr(blog_reader, 'ELEVENLABS_TTS_URL', mock.base_url + "/v1/text-to-speech/{voice_id}")
+        yield mock
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Texts of the chunks that reached the API with a 200"""
+    texts = []
+    post = blog_reader.http_pool.post
+
+    def recording_post(url, **kwargs):
+        response = post(url, **kwargs)
+        if response.status_code == 200:
+            texts.append(kwargs['json']['text'])
+        return response
+
+    monkeypatch.setattr(blog_reader.http_pool, 'post', recording_post)
+    return texts
+
+
+def synthesize(text: str, output_path: str, key: str, chunking: str = 'packed'):
+    # One request at a time, so the quota runs out at a predictable chunk
+    generate_audio_for_text(text, output_path, [key], scheduler=KeyScheduler([key], 1), chunking=chunking)
+
+
+def test_rerun_after_partial_failure_requests_only_missing_chunks(tmp_path, mock, sent):
+    text = essay_text()
+    chunks = split_text_into_chunks(text)
+    output_path = str(tmp_path / 'essay.mp3')
+    assert len(chunks) > 3
+
+    # The first key's quota covers only some of the chunks
+    mock.quota_chars = 9000
+    with pytest.raises(RuntimeError):
+        synthesize(text, output_path, 'first-key-aaaa')
+    done = set(sent)
+    assert 0 < len(done) < len(chunks)
+    assert not os.path.exists(output_path)
+    assert len(EssayJournal.load(output_path).pending()) == len(chunks) - len(done)
+
+    sent.clear()
+    mock.quota_chars = None
+    synthesize(text, output_path, 'second-key-bbbb')
+
+    assert sorted(sent) == sorted(chunk for chunk in chunks if chunk not in done)
+    assert os.path.exists(output_path)
+    assert EssayJournal.load(output_path) is None
+    assert os.path.exists(chunk_map_path(output_path))
+
+
+def test_edit_resynthesizes_only_changed_anchored_chunks(tmp_path, mock, sent):
+    output_path = str(tmp_path / 'essay.mp3')
+    synthesize(essay_text(), output_path, 'first-key-aaaa', 'anchored')
+    published = split_text_into_chunks(essay_text(), chunking='anchored')
+    assert sorted(sent) == sorted(published)
+
+    sent.clear()
+    edited = split_text_into_chunks(essay_text(edited=20), chunking='anchored')
+    synthesize(essay_text(edited=20), output_path, 'second-key-bbbb', 'anchored')
+
+    changed = [chunk for chunk in edited if chunk not in published]
+    assert 0 < len(changed) < len(edited) / 2
+    assert sorted(sent) == sorted(changed)
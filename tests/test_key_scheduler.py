@@ -0,0 +1,155 @@
+import pytest
+
+import key_scheduler
+from key_scheduler import BudgetExhausted, KeyScheduler, RunBudget
+
+QUOTA_EXCEEDED = '{"detail": {"status": "quota_exceeded", "message": "This request exceeds your quota."}}'
+
+
+@pytest.fixture(autouse=True)
+def fixed_jitter(monkeypatch):
+    # Backoff delays take the top of their jitter range, so tests don't depend on chance
+    monkeypatch.setattr(key_scheduler.random, 'uniform', lambda low, high: high)
+
+
+def scheduler(keys=('key-one-aaaa', 'key-two-bbbb'), concurrency: int = 4) -> KeyScheduler:
+    return KeyScheduler(list(keys), concurrency)
+
+
+def test_acquire_prefers_the_key_with_most_headroom():
+    s = scheduler()
+    first = s.acquire(100)
+    second = s.acquire(100)
+
+    assert first is not second
+    assert first.in_flight == second.in_flight == 1
+
+
+def test_429_halves_concurrency_and_backs_off_the_key():
+    s = scheduler()
+    limited, other = s.keys
+    key = s.acquire(100)
+    assert key is limited
+
+    s.release(key, 100, 429, retry_after=30)
+
+    assert limited.concurrency_limit == 2
+    assert limited.rate_limited == 1
+    assert limited.wait_time(100, key_scheduler.time.monotonic()) > 25
+    # Work goes to the other key while this one backs off
+    assert [s.acquire(100) for _ in range(3)] == [other] * 3
+
+
+def test_success_grows_concurrency_back_one_slot_at_a_time():
+    s = scheduler(keys=('key-one-aaaa',), concurrency=8)
+    state = s.keys[0]
+    for _ in range(2):
+        s.release(s.acquire(100), 100, 429)
+        state.backoff_until = 0.0
+    assert state.concurrency_limit == 2
+
+    s.release(s.acquire(100), 100, 200)
+
+    assert state.concurrency_limit == 3
+    assert state.consecutive_failures == 0
+
+
+def test_success_charges_the_keys_quota():
+    s = scheduler(keys=('key-one-aaaa',))
+    s.keys[0].remaining_chars = 1000
+
+    s.release(s.acquire(300), 300, 200)
+
+    assert s.keys[0].remaining_chars == 700
+    assert s.keys[0].chars_sent == 300
+
+
+def test_quota_exceeded_routes_work_to_other_keys():
+    s = scheduler()
+    exhausted, other = s.keys
+    s.release(s.acquire(100), 100, 401, error_text=QUOTA_EXCEEDED)
+
+    assert exhausted.remaining_chars == 0
+    assert not exhausted.disabled
+    assert s.acquire(100) is other
+
+
+def test_chunk_larger_than_a_keys_quota_goes_elsewhere():
+    s = scheduler()
+    small, large = s.keys
+    small.remaining_chars = 50
+    large.remaining_chars = 5000
+
+    assert s.acquire(100) is large
+    assert s.acquire(10) is small
+
+
+def test_no_key_with_quota_left_raises():
+    s = scheduler()
+    for state in s.keys:
+        state.remaining_chars = 10
+
+    with pytest.raises(RuntimeError):
+        s.acquire(100)
+
+
+def test_401_disables_the_key():
+    s = scheduler()
+    rejected, other = s.keys
+    s.release(s.acquire(100), 100, 401, error_text='{"detail": {"status": "invalid_api_key"}}')
+
+    assert rejected.disabled
+    assert s.total_concurrency == 4
+    assert [s.acquire(100) for _ in range(2)] == [other] * 2
+
+
+def test_server_error_backs_off_without_shrinking_concurrency():
+    s = scheduler()
+    state = s.acquire(100)
+
+    s.release(state, 100, 500)
+
+    assert state.errors == 1
+    assert state.concurrency_limit == 4
+    assert state.backoff_until > key_scheduler.time.monotonic()
+
+
+def test_budget_reserves_on_acquire_and_refunds_unbilled_requests():
+    # A key per attempt, so no request waits out another's backoff
+    s = scheduler(keys=('key-one-aaaa', 'key-two-bbbb', 'key-three-cccc'))
+    s.budget = RunBudget(max_chars=1000, max_requests=10)
+
+    failed = s.acquire(400)
+    assert (s.budget.chars, s.budget.requests) == (400, 1)
+    s.release(failed, 400, 500)
+    assert (s.budget.chars, s.budget.requests) == (0, 1)
+
+    no_response = s.acquire(400)
+    s.release(no_response, 400, None)
+    assert (s.budget.chars, s.budget.requests) == (0, 2)
+
+    billed = s.acquire(400)
+    s.release(billed, 400, 200)
+    assert (s.budget.chars, s.budget.requests) == (400, 3)
+
+
+def test_budget_exhausted_by_characters():
+    s = scheduler()
+    s.budget = RunBudget(max_chars=1000)
+    s.release(s.acquire(800), 800, 200)
+
+    with pytest.raises(BudgetExhausted):
+        s.acquire(300)
+    assert s.acquire(200) is not None
+    assert s.budget.remaining_chars == 0
+
+
+def test_budget_exhausted_by_requests():
+    s = scheduler()
+    s.budget = RunBudget(max_requests=2)
+    for _ in range(2):
+        s.release(s.acquire(10), 10, 500)
+
+    assert s.budget.exhausted
+    with pytest.raises(BudgetExhausted):
+        s.acquire(10)
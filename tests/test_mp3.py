@@ -0,0 +1,97 @@
+import struct
+
+import pytest
+
+from mp3 import concat_mp3, inspect, iter_frames, parse_frame_header
+
+# MPEG-1 Layer III, 44.1 kHz, mono, no CRC; all-zero bodies decode to silence
+FRAME_SAMPLES = 1152
+SAMPLE_RATE = 44100
+
+
+def frames(count: int, bitrate_index: int = 5, sample_rate_index: int = 0) -> bytes:
+    header = bytes((0xFF, 0xFB, (bitrate_index << 4) | (sample_rate_index << 2), 0xC4))
+    length = parse_frame_header(header).frame_length
+    return (header + bytes(length - 4)) * count
+
+
+def id3v2_tag(body: bytes = b'\0' * 30) -> bytes:
+    size = len(body)
+    synchsafe = bytes(((size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F))
+    return b'ID3\x04\x00\x00' + synchsafe + body
+
+
+def xing_tag(path) -> tuple:
+    """(tag, frame count, byte count) from the output's first frame"""
+    data = path.read_bytes()
+    # Mono MPEG-1: 4-byte header plus 17 bytes of side info
+    tag = data[21:25]
+    flags, frame_count, byte_count = struct.unpack('>III', data[25:37])
+    return tag, frame_count, byte_count
+
+
+def test_concat_two_streams(tmp_path):
+    first = frames(3, bitrate_index=9)  # 128 kbps, 417-byte frames
+    second = frames(5)  # 64 kbps, 208-byte frames
+    (tmp_path / 'a.mp3').write_bytes(first)
+    (tmp_path / 'b.mp3').write_bytes(id3v2_tag() + second)
+    out = tmp_path / 'out.mp3'
+
+    info = concat_mp3([str(tmp_path / 'a.mp3'), str(tmp_path / 'b.mp3')], str(out))
+
+    data = out.read_bytes()
+    assert info['frames'] == 8
+    assert info['bytes'] == len(data)
+    assert info['duration'] == pytest.approx(8 * FRAME_SAMPLES / SAMPLE_RATE)
+    # Mixed bitrates get a Xing header counting every audio frame and byte
+    assert xing_tag(out) == (b'Xing', 8, len(data))
+    # Each input's frames land in its span; the ID3 tag is dropped
+    (a_offset, a_length), (b_offset, b_length) = info['spans']
+    assert data[a_offset:a_offset + a_length] == first
+    assert data[b_offset:b_offset + b_length] == second
+    assert b_offset == a_offset + a_length
+    assert b_offset + b_length == len(data)
+    assert len(list(iter_frames(str(out)))) == 8
+
+    probed = inspect(str(out))
+    assert probed['frames'] == 8
+    assert probed['bytes'] == len(data)
+    assert probed['duration'] == pytest.approx(info['duration'])
+    assert probed['vbr'] is True
+    assert probed['sample_rate'] == SAMPLE_RATE
+
+
+def test_constant_bitrate_gets_info_header(tmp_path):
+    (tmp_path / 'a.mp3').write_bytes(frames(2))
+    (tmp_path / 'b.mp3').write_bytes(frames(2))
+    out = tmp_path / 'out.mp3'
+
+    concat_mp3([str(tmp_path / 'a.mp3'), str(tmp_path / 'b.mp3')], str(out))
+
+    assert xing_tag(out)[:2] == (b'Info', 4)
+    probed = inspect(str(out))
+    assert (probed['frames'], probed['vbr']) == (4, False)
+    # Unpadded 64 kbps frames average slightly under their nominal rate
+    assert probed['bitrate'] == pytest.approx(64000, rel=0.01)
+
+
+def test_inspect_without_xing_header_derives_frames_from_size(tmp_path):
+    path = tmp_path / 'plain.mp3'
+    path.write_bytes(frames(10))
+
+    probed = inspect(str(path))
+
+    assert probed['frames'] == 10
+    assert probed['duration'] == pytest.approx(10 * FRAME_SAMPLES / SAMPLE_RATE)
+
+
+def test_mismatched_sample_rates_leave_no_output(tmp_path):
+    (tmp_path / 'a.mp3').write_bytes(frames(2))
+    (tmp_path / 'b.mp3').write_bytes(frames(2, sample_rate_index=1))  # 48 kHz
+    out = tmp_path / 'out.mp3'
+
+    with pytest.raises(ValueError):
+        concat_mp3([str(tmp_path / 'a.mp3'), str(tmp_path / 'b.mp3')], str(out))
+
+    assert not out.exists()
+    assert not (tmp_path / 'out.mp3.tmp').exists()
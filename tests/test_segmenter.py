@@ -0,0 +1,22 @@
+import pytest
+
+from segmenter import split_sentences
+
+
+@pytest.mark.parametrize('paragraph, sentences', [
+    ("Plan B. Next sentence.", ["Plan B.", "Next sentence."]),
+    ("So did I. Then we left.", ["So did I.", "Then we left."]),
+    ("It was vitamin C. The rest followed.", ["It was vitamin C.", "The rest followed."]),
+    ("We chose option B.", ["We chose option B."]),
+])
+def test_letter_before_a_new_sentence_ends_it(paragraph, sentences):
+    assert split_sentences(paragraph) == sentences
+
+
+@pytest.mark.parametrize('paragraph', [
+    "J. McCarthy invented Lisp.",
+    "E. B. White wrote it.",
+    "Harry S. Truman was president.",
+])
+def test_initials_do_not_end_a_sentence(paragraph):
+    assert split_sentences(paragraph) == [paragraph]
@@ -0,0 +1,85 @@
+import http.client
+import threading
+
+import pytest
+
+from serve import SiteServer, etag_matches, parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('bytes=0-99', (0, 99)),
+    ('bytes=900-', (900, 999)),
+    ('bytes=990-2000', (990, 999)),
+    # Suffix ranges: the last N bytes, or the whole file if N is larger
+    ('bytes=-500', (500, 999)),
+    ('bytes=-5000', (0, 999)),
+    # Valid but unsatisfiable: 416
+    ('bytes=-0', 'unsatisfiable'),
+    ('bytes=1000-', 'unsatisfiable'),
+    ('bytes=1500-1600', 'unsatisfiable'),
+    # Invalid or unsupported: ignore the header and send everything
+    ('bytes=10-5', None),
+    ('bytes=0-99,200-299', None),
+    ('items=0-5', None),
+    ('bytes=abc', None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize('header, matches', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", W/"abc"', True),
+    ('*', True),
+    ('"xyz"', False),
+    ('"ab"', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, '"abc"') is matches
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path / 'episode.mp3').write_bytes(bytes(range(256)) * 4)
+    server = SiteServer(('127.0.0.1', 0), str(tmp_path))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, headers: dict):
+    host, port = server.server_address[:2]
+    connection = http.client.HTTPConnection(host, port, timeout=5)
+    connection.request('GET', '/episode.mp3', headers=headers)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+@pytest.mark.parametrize('range_header, status, content_range, length', [
+    ('bytes=0-99', 206, 'bytes 0-99/1024', 100),
+    ('bytes=-500', 206, 'bytes 524-1023/1024', 500),
+    ('bytes=2000-', 416, 'bytes */1024', 0),
+    ('bytes=10-5', 200, None, 1024),
+])
+def test_range_requests(server, range_header, status, content_range, length):
+    response, body = get(server, {'Range': range_header})
+
+    assert response.status == status
+    assert response.getheader('Content-Range') == content_range
+    assert len(body) == length
+
+
+def test_unchanged_file_revalidates_with_304(server):
+    response, _ = get(server, {})
+    etag = response.getheader('ETag')
+
+    assert get(server, {'If-None-Match': etag})[0].status == 304
+    assert get(server, {'If-None-Match': f'W/{etag}'})[0].status == 304
+    assert get(server, {'If-None-Match': '"stale"'})[0].status == 200